@@ -0,0 +1,129 @@
+# ===========================
+# 声卡输出 (试听用的 sink)
+# ===========================
+# QAudioOutput 拉模式：声卡按自己的节奏从 PcmBuffer 取数据；StreamPlayer 的播放线程 write() 进来，
+# 缓冲超过 HIGH_WATER_MS 时阻塞，使写入速度与实际播放同步（抖动缓冲留在 engine 的 StreamPlayer 里）。
+# QtMultimedia 依赖系统音频库，缺失时 create_sink() 返回 None，界面退回为只生成试听文件。
+import threading
+
+from PyQt5.QtCore import QObject, QIODevice, pyqtSignal
+
+HIGH_WATER_MS = 200
+
+
+class PcmBuffer(QIODevice):
+    """播放线程写、声卡（GUI 线程）读的字节缓冲"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.cond = threading.Condition()
+        self.data = bytearray()
+        self.eof = False
+
+    def push(self, data, limit):
+        with self.cond:
+            while len(self.data) > limit and not self.eof:
+                self.cond.wait(0.05)
+            self.data.extend(data)
+        self.readyRead.emit()
+
+    def finish(self):
+        with self.cond:
+            self.eof = True
+            self.cond.notify_all()
+
+    def reset(self):
+        with self.cond:
+            self.data.clear()
+            self.eof = False
+
+    def clear(self):
+        with self.cond:
+            self.data.clear()
+            self.eof = True
+            self.cond.notify_all()
+
+    def drained(self):
+        with self.cond:
+            return self.eof and not self.data
+
+    # --- QIODevice 接口 ---
+    def readData(self, maxlen):
+        with self.cond:
+            chunk = bytes(self.data[:maxlen])
+            del self.data[:maxlen]
+            self.cond.notify_all()
+        return chunk
+
+    def writeData(self, data):
+        return -1
+
+    def bytesAvailable(self):
+        return len(self.data) + super().bytesAvailable()
+
+    def isSequential(self):
+        return True
+
+
+class QtAudioSink(QObject):
+    """StreamPlayer 的 sink：open / write / close 在播放线程调用，QAudioOutput 的创建与停止通过信号回到 GUI 线程"""
+    open_requested = pyqtSignal(int)
+    stop_requested = pyqtSignal()
+
+    def __init__(self, multimedia, parent=None):
+        super().__init__(parent)
+        self.multimedia = multimedia  # PyQt5.QtMultimedia 模块
+        self.output = None
+        self.buffer = PcmBuffer(self)
+        self.limit = 0
+        self.open_requested.connect(self._open)
+        self.stop_requested.connect(self._stop)
+
+    def open(self, sample_rate, channels=1, sample_width=2):
+        self.buffer.reset()
+        self.limit = sample_rate * channels * sample_width * HIGH_WATER_MS // 1000
+        self.open_requested.emit(sample_rate)
+
+    def write(self, data):
+        self.buffer.push(data, self.limit)
+
+    def close(self):
+        # 剩余数据照常播完，声卡取空后在 stateChanged 回调中停止
+        self.buffer.finish()
+
+    def stop(self):
+        """立即停止（丢弃未播放的部分）"""
+        self.buffer.clear()
+        self.stop_requested.emit()
+
+    def _open(self, sample_rate):
+        QAudio, QAudioFormat = self.multimedia.QAudio, self.multimedia.QAudioFormat
+        self._stop()
+        fmt = QAudioFormat()
+        fmt.setSampleRate(sample_rate)
+        fmt.setChannelCount(1)
+        fmt.setSampleSize(16)
+        fmt.setCodec("audio/pcm")
+        fmt.setByteOrder(QAudioFormat.LittleEndian)
+        fmt.setSampleType(QAudioFormat.SignedInt)
+        self.output = self.multimedia.QAudioOutput(fmt, self)
+        self.output.stateChanged.connect(
+            lambda state: self._stop() if state == QAudio.IdleState and self.buffer.drained() else None)
+        if not self.buffer.isOpen():
+            self.buffer.open(QIODevice.ReadOnly)
+        self.output.start(self.buffer)
+
+    def _stop(self):
+        if self.output is not None:
+            self.output.stop()
+            self.output.deleteLater()
+            self.output = None
+
+
+def create_sink(parent=None):
+    """返回声卡 sink；QtMultimedia 不可用（如缺少 libpulse）时返回 None"""
+    try:
+        from PyQt5 import QtMultimedia
+    except ImportError:
+        return None
+    return QtAudioSink(QtMultimedia, parent)
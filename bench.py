@@ -0,0 +1,263 @@
+# ===========================
+# 压测工具 (本地模拟云端)
+# ===========================
+# python main.py bench --requests 200 --concurrency 8 --latency 0.2 --error-rate 0.01
+# 通过 client.use_backend 换上 engine/mock.py 的模拟实现，走与界面/命令行完全相同的代码路径：
+#   synth / stream / cache -> SynthesisJob（SpeechSynthesisThread 的核心）
+#   preview                -> PreviewJob + StreamPlayer（试听），耗时为 time-to-audio
+#   list                   -> list_all_voices（VoiceQueryThread）
+#   enroll                 -> EnrollmentScheduler（复刻调度，引擎里的定时轮询）
+#   delete                 -> 引擎 "delete" 任务 + delete_voice（批量删除）
+# 不消耗真实调用额度，用来在上线前验证并发、缓存等改动的效果。
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from engine import (SynthesisJob, SynthesisCache, PreviewJob, StreamPlayer, NullSink, PREBUFFER_MS, EnrollmentScheduler, list_all_voices, delete_voice,
+                    get_engine, get_metrics, get_pool, get_limiter, profiled, ENDPOINT_LIMITS)
+from engine import client
+from engine.mock import MockBackend
+
+SCENARIOS = ("synth", "stream", "cache", "preview", "list", "enroll", "delete")
+BENCH_MODEL = "cosyvoice-v3.5-flash"
+BENCH_TEXT = "这是一段用于压测的合成文本，长度大约与日常使用的一句话相当。第 {} 句。"
+# 压测时缩短复刻轮询间隔，否则一次训练就要等好几秒
+BENCH_POLL_INTERVALS = {"RUNNING": (0.05, 0.2), "DEPLOYING": (0.02, 0.1)}
+MONITOR_INTERVAL = 0.05
+
+
+def current_rss():
+    """当前进程常驻内存（字节）；取不到时返回 None"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class ResourceMonitor:
+    """后台采样峰值内存与线程数"""
+
+    def __init__(self):
+        self.peak_rss = None
+        self.peak_threads = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.loop, name="bench-monitor", daemon=True)
+
+    def sample(self):
+        rss = current_rss()
+        if rss is not None:
+            self.peak_rss = max(self.peak_rss or 0, rss)
+        self.peak_threads = max(self.peak_threads, threading.active_count() - 1)  # 不算采样线程自己
+
+    def loop(self):
+        while not self.stop_event.wait(MONITOR_INTERVAL):
+            self.sample()
+
+    def __enter__(self):
+        self.sample()
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop_event.set()
+        self.thread.join()
+        self.sample()
+        return False
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def run_pool(func, count, concurrency):
+    """并发执行 func(i)，返回 (各次耗时, 失败次数)；func 返回 False 或抛异常记为失败"""
+    func = profiled(f"bench.{func.__qualname__}", func)  # --profile 时按场景汇总
+
+    def timed(i):
+        started = time.perf_counter()
+        try:
+            ok = func(i) is not False
+        except Exception:
+            ok = False
+        return time.perf_counter() - started, ok
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        results = list(pool.map(timed, range(count)))
+    return [elapsed for elapsed, _ in results], sum(1 for _, ok in results if not ok)
+
+
+# --- 各场景：返回 (请求数, 各请求耗时或 None, 失败数) ---
+def bench_synth(backend, args, workdir, stream=False, cache=None, distinct=None):
+    def one(i):
+        text = BENCH_TEXT.format(i % distinct if distinct else i)
+        job = SynthesisJob(args.api_key, text, os.path.join(workdir, f"{i}.mp3"), "bench-voice", BENCH_MODEL,
+                           50, 1.0, stream=stream, cache=cache)
+        return job.run()[0]
+    latencies, failed = run_pool(one, args.requests, args.concurrency)
+    return args.requests, latencies, failed
+
+
+def bench_cache(backend, args, workdir):
+    # 只有 10 种不同文本：首轮未命中，之后全部命中缓存
+    cache = SynthesisCache(cache_dir=os.path.join(workdir, "cache"))
+    return bench_synth(backend, args, workdir, stream=True, cache=cache, distinct=10)
+
+
+def bench_preview(backend, args, workdir):
+    # 单次耗时取 time-to-audio（从开始到第一段音频写入播放 sink），而不是整条合成耗时
+    def one(i):
+        player = StreamPlayer(NullSink(), prebuffer_ms=PREBUFFER_MS)
+        ok = PreviewJob(args.api_key, BENCH_TEXT.format(i), "bench-voice", BENCH_MODEL, 50, 1.0, player,
+                        output_path=os.path.join(workdir, f"{i}.wav")).run()[0]
+        player.wait()
+        if not ok or player.time_to_audio is None:
+            raise RuntimeError("preview failed")
+        return player.time_to_audio
+
+    results = []
+    _, failed = run_pool(lambda i: results.append(one(i)), args.requests, args.concurrency)
+    return args.requests, results, failed
+
+
+def bench_list(backend, args, workdir):
+    runs = max(1, args.requests // 50)
+    expected = len(backend.voices)
+    latencies, failed = run_pool(lambda i: len(list_all_voices(args.api_key)) == expected, runs,
+                                 min(runs, args.concurrency))
+    return runs, latencies, failed
+
+
+def run_engine(submit, count):
+    """submit(i, on_done) 提交一个引擎任务，on_done(ok) 在任务结束时回调；返回 (各次耗时, 失败次数)
+    耗时从提交算起，含在引擎里排队 / 等待轮询的时间，与界面上用户等到的一致"""
+    done = threading.Event()
+    lock = threading.Lock()
+    results = []
+
+    def finish(started, ok):
+        with lock:
+            results.append((time.perf_counter() - started, ok))
+            if len(results) == count:
+                done.set()
+
+    for i in range(count):
+        started = time.perf_counter()
+        submit(i, lambda ok, started=started: finish(started, ok))
+    done.wait()
+    return [elapsed for elapsed, _ in results], sum(1 for _, ok in results if not ok)
+
+
+def bench_enroll(backend, args, workdir):
+    # 与界面一样直接交给调度器：轮询是引擎里的定时任务，等待期间不占线程
+    count = max(1, args.requests // 10)
+    scheduler = EnrollmentScheduler(intervals=BENCH_POLL_INTERVALS, default_interval=(0.05, 0.5))
+    latencies, failed = run_engine(
+        lambda i, on_done: scheduler.enroll(args.api_key, "http://bench/audio.wav", f"b{i}", BENCH_MODEL,
+                                            on_finished=lambda ticket, success, message: on_done(success)),
+        count)
+    return count, latencies, failed
+
+
+def bench_delete(backend, args, workdir):
+    # 与界面的批量删除相同：每个音色一个引擎 "delete" 任务，并发由引擎的上限控制（--concurrency 不起作用）
+    voice_ids = [backend.add_voice(BENCH_MODEL, f"del{i}") for i in range(args.requests)]
+    engine = get_engine()
+    latencies, failed = run_engine(
+        lambda i, on_done: engine.submit("delete", delete_voice, args.api_key, voice_ids[i],
+                                         on_done=lambda result, error: on_done(error is None)),
+        len(voice_ids))
+    return len(voice_ids), latencies, failed
+
+
+BENCHES = {
+    "synth": bench_synth,
+    "stream": lambda backend, args, workdir: bench_synth(backend, args, workdir, stream=True),
+    "cache": bench_cache,
+    "preview": bench_preview,
+    "list": bench_list,
+    "enroll": bench_enroll,
+    "delete": bench_delete,
+}
+METRIC_OPS = {"synth": "synth", "stream": "synth", "cache": "synth", "preview": "synth", "list": "list_voices",
+              "enroll": "create_voice", "delete": "delete_voice"}
+
+
+def run_scenario(name, backend, args):
+    workdir = tempfile.mkdtemp(prefix=f"cosyvoice_bench_{name}_")
+    get_metrics().reset()
+    try:
+        with ResourceMonitor() as monitor:
+            started = time.perf_counter()
+            count, latencies, failed = BENCHES[name](backend, args, workdir)
+            wall = time.perf_counter() - started
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if latencies is not None:
+        latencies = sorted(latencies)
+        p50, p95, p99 = (percentile(latencies, q) for q in (0.5, 0.95, 0.99))
+    else:
+        hist = get_metrics().latency.get((METRIC_OPS[name], "-"))
+        p50, p95, p99 = (hist.quantile(q) if hist else None for q in (0.5, 0.95, 0.99))
+    return {
+        "scenario": name,
+        "requests": count,
+        "failed": failed,
+        "wall_s": round(wall, 3),
+        "rps": round(count / wall, 2) if wall > 0 else None,
+        "p50_ms": p50 and round(p50 * 1000, 1),
+        "p95_ms": p95 and round(p95 * 1000, 1),
+        "p99_ms": p99 and round(p99 * 1000, 1),
+        "peak_rss_mb": monitor.peak_rss and round(monitor.peak_rss / 1024 / 1024, 1),
+        "peak_threads": monitor.peak_threads,
+        "upstream_calls": sum(h.count for h in get_metrics().latency.values()),
+        "retries": sum(get_metrics().retries.values()),
+    }
+
+
+def run_benchmarks(args, on_result=None):
+    """按 args 配置的模拟云端依次跑各场景，返回结果列表"""
+    backend = MockBackend(connect_latency=args.connect_latency, latency=args.latency, chunks=args.chunks,
+                          chunk_interval=args.chunk_interval, api_latency=args.api_latency, jitter=args.jitter,
+                          error_rate=args.error_rate, voices=args.voices, server_qps=args.server_qps, seed=args.seed)
+    client.use_backend(backend)
+    # 客户端限流默认关闭，只测原始吞吐；模拟服务端限流时用 --client-qps 观察限流器的效果
+    for endpoint in ENDPOINT_LIMITS:
+        get_limiter().configure(endpoint, args.client_qps)
+    results = []
+    try:
+        for name in args.scenarios:
+            result = run_scenario(name, backend, args)
+            results.append(result)
+            if on_result:
+                on_result(result)
+    finally:
+        get_pool().close_idle()  # 池里都是模拟连接，不能留给真实后端复用
+        get_limiter().reset()
+        client.use_backend(None)
+    return results
+
+
+REPORT_COLUMNS = ("scenario", "requests", "failed", "wall_s", "rps", "p50_ms", "p95_ms", "p99_ms",
+                  "peak_rss_mb", "peak_threads", "upstream_calls", "retries")
+
+
+def print_header(out=sys.stdout):
+    print("  ".join(f"{c:>12}" for c in REPORT_COLUMNS), file=out)
+
+
+def print_row(result, out=sys.stdout):
+    print("  ".join(f"{'-' if result[c] is None else result[c]:>12}" for c in REPORT_COLUMNS), file=out)
@@ -0,0 +1,175 @@
+# ===========================
+# 命令行批量合成 (无界面)
+# ===========================
+# python main.py synth --manifest jobs.jsonl --workers N
+# python main.py enroll --manifest voices.csv --max-active 4
+# python main.py bench --requests 200 --concurrency 8     (本地模拟云端压测)
+# 只依赖 engine，不导入 PyQt5，可在没有显示器的服务器上运行。
+import os
+import sys
+import time
+import json
+import argparse
+
+from engine import (SynthesisCache, CACHE_MAX_MB, ENDPOINT_LIMITS, OUTPUT_FORMATS, get_limiter, get_metrics,
+                    load_manifest, run_batch, BulkEnrollment, JobQueue, write_report, BULK_MAX_ACTIVE,
+                    postprocess_options, numpy_available, SILENCE_DB)
+
+
+def print_result(done, total, result):
+    post = result.get('post')
+    print(f"[{done}/{total}] {result['status']:<7} {result['latency']:.2f}s {result['output']}"
+          + (f"  {result['error']}" if result.get('error') else "")
+          + (f"  后处理 {post['bytes_before'] / 1024:.0f} -> {post['bytes_after'] / 1024:.0f} KB "
+             f"({post['ms']:.0f} ms)" if post else "")
+          + (f"  后处理失败: {result['post_error']}" if result.get('post_error') else ""))
+
+
+def run_synth(argv):
+    parser = argparse.ArgumentParser(prog="main.py synth", description="按清单批量合成音频（无界面）")
+    parser.add_argument("--manifest", required=True, help="任务清单 (.csv / .jsonl)")
+    parser.add_argument("--workers", type=int, default=4, help="并发数")
+    parser.add_argument("--api-key", default=os.environ.get("DASHSCOPE_API_KEY"),
+                        help="API Key，默认读取环境变量 DASHSCOPE_API_KEY")
+    parser.add_argument("--model", help="清单中未填写 model 时使用的模型")
+    parser.add_argument("--results", help="结果文件 (.jsonl)，默认与清单同名")
+    parser.add_argument("--overwrite", action="store_true", help="重新合成已存在的输出文件")
+    parser.add_argument("--no-stream", action="store_true", help="使用非流式调用")
+    parser.add_argument("--no-cache", action="store_true", help="不使用合成缓存")
+    parser.add_argument("--cache-max-mb", type=int, default=CACHE_MAX_MB, help="合成缓存容量上限 (MB)")
+    parser.add_argument("--metrics", help="结束后导出调用指标：.prom 为 Prometheus textfile，其余为 JSON")
+    parser.add_argument("--format", choices=list(OUTPUT_FORMATS), metavar="FORMAT",
+                        help="输出格式 (如 WAV_16000HZ_MONO_16BIT)；默认按 output 扩展名推断，清单中的 format 字段优先")
+    parser.add_argument("--qps", type=float, default=ENDPOINT_LIMITS["synth"][0], help="合成请求每秒上限")
+    parser.add_argument("--post", action="store_true",
+                        help="合成后去首尾静音并归一响度（只处理 WAV / PCM 输出，需要 NumPy）")
+    parser.add_argument("--normalize", choices=["peak", "rms", "none"], default="peak", help="后处理的响度归一方式")
+    parser.add_argument("--silence-db", type=float, default=SILENCE_DB, help="后处理中低于满幅多少 dB 视为静音")
+    args = parser.parse_args(argv)
+
+    if not args.api_key:
+        parser.error("缺少 API Key：请使用 --api-key 或设置 DASHSCOPE_API_KEY")
+    if args.post and not numpy_available():
+        parser.error("--post 需要 NumPy：pip install numpy")
+    postprocess = postprocess_options(normalize=None if args.normalize == "none" else args.normalize,
+                                      silence_db=args.silence_db) if args.post else None
+    get_limiter().configure("synth", args.qps)
+    rows = load_manifest(args.manifest)
+    results_path = args.results or os.path.splitext(args.manifest)[0] + '.results.jsonl'
+    cache = None if args.no_cache else SynthesisCache(max_bytes=args.cache_max_mb * 1024 * 1024)
+
+    started = time.time()
+    print(f"共 {len(rows)} 条任务，并发 {args.workers}，结果写入 {results_path}")
+    counts = run_batch(rows, args.api_key, results_path, workers=args.workers, on_result=print_result,
+                       default_model=args.model, overwrite=args.overwrite, stream=not args.no_stream,
+                       cache=cache, default_format=args.format, postprocess=postprocess)
+
+    print(f"完成：成功 {counts['ok']}，跳过 {counts['skipped']}，失败 {counts['failed']}，"
+          f"耗时 {time.time() - started:.1f}s")
+    if cache is not None:
+        print(cache.stats())
+    if postprocess:
+        print(postprocess_summary(results_path))
+    if args.metrics:
+        get_metrics().export(args.metrics)
+        print(f"调用指标已导出至 {args.metrics}")
+    return 1 if counts['failed'] else 0
+
+
+def postprocess_summary(results_path):
+    before = after = processed = 0
+    with open(results_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            post = json.loads(line).get('post')
+            if post:
+                processed += 1
+                before += post['bytes_before']
+                after += post['bytes_after']
+    saved = (1 - after / before) * 100 if before else 0
+    return f"后处理 {processed} 个文件：{before / 1048576:.1f} MB -> {after / 1048576:.1f} MB（减少 {saved:.1f}%）"
+
+
+def run_enroll(argv):
+    parser = argparse.ArgumentParser(prog="main.py enroll", description="按清单批量复刻音色（无界面）")
+    parser.add_argument("--manifest", required=True,
+                        help="清单 (.csv / .jsonl)，字段 audio_url, prefix, model, language_hints")
+    parser.add_argument("--api-key", default=os.environ.get("DASHSCOPE_API_KEY"),
+                        help="API Key，默认读取环境变量 DASHSCOPE_API_KEY")
+    parser.add_argument("--model", help="清单中未填写 model 时使用的模型")
+    parser.add_argument("--max-active", type=int, default=BULK_MAX_ACTIVE, help="同时训练中的音色数上限")
+    parser.add_argument("--report", help="结果报告 (.jsonl)，默认为 清单名.enroll.jsonl")
+    args = parser.parse_args(argv)
+
+    if not args.api_key:
+        parser.error("缺少 API Key：请使用 --api-key 或设置 DASHSCOPE_API_KEY")
+    rows = load_manifest(args.manifest)
+    report_path = args.report or os.path.splitext(args.manifest)[0] + '.enroll.jsonl'
+    done = []
+
+    def on_row(result):
+        done.append(result)
+        print(f"[{len(done)}/{len(rows)}] 第 {result['row']} 行 {result['status']:<9} {result['prefix']} "
+              f"{result['voice_id'] or '-'}" + (f"  {result['message']}" if result['message'] else ""))
+
+    started = time.time()
+    print(f"共 {len(rows)} 行，同时训练上限 {args.max_active}，报告写入 {report_path}")
+    # 提交记录写入与界面共用的任务队列：下次运行（或界面）据此去重
+    bulk = BulkEnrollment(args.api_key, rows, JobQueue(), default_model=args.model, max_active=args.max_active,
+                          on_row=on_row).start()
+    bulk.wait()
+    write_report(bulk.results, report_path)
+    counts = bulk.counts()
+    print("完成：" + "，".join(f"{status} {n}" for status, n in sorted(counts.items()))
+          + f"，耗时 {time.time() - started:.1f}s")
+    return 1 if counts.get('failed') or counts.get('invalid') else 0
+
+
+def run_bench(argv):
+    import bench
+    parser = argparse.ArgumentParser(prog="main.py bench", description="用本地模拟云端压测合成 / 列表 / 复刻 / 删除")
+    parser.add_argument("--scenarios", default=",".join(bench.SCENARIOS),
+                        help=f"要跑的场景，逗号分隔（{','.join(bench.SCENARIOS)}）")
+    parser.add_argument("--requests", type=int, default=200, help="每个场景的请求数")
+    parser.add_argument("--concurrency", type=int, default=8, help="并发数")
+    parser.add_argument("--connect-latency", type=float, default=0.15, help="新建连接的模拟握手耗时 (秒)")
+    parser.add_argument("--latency", type=float, default=0.2, help="合成首包前的模拟延迟 (秒)")
+    parser.add_argument("--chunks", type=int, default=10, help="每次合成返回的分片数")
+    parser.add_argument("--chunk-interval", type=float, default=0.02, help="分片间隔 (秒)")
+    parser.add_argument("--api-latency", type=float, default=0.05, help="音色管理接口的模拟延迟 (秒)")
+    parser.add_argument("--jitter", type=float, default=0.2, help="延迟随机浮动比例")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="每次调用失败的概率")
+    parser.add_argument("--voices", type=int, default=500, help="模拟账号下已有的音色数（影响列表分页）")
+    parser.add_argument("--server-qps", type=float, default=0, help="模拟服务端每类接口的 QPS 上限，超出返回 429 (0 为不限)")
+    parser.add_argument("--client-qps", type=float, help="客户端限流器的 QPS (默认不限)")
+    parser.add_argument("--seed", type=int, help="随机种子，便于复现")
+    parser.add_argument("--json", help="结果另存为 JSON 文件")
+    args = parser.parse_args(argv)
+    args.api_key = "bench"
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(args.scenarios) - set(bench.SCENARIOS)
+    if unknown:
+        parser.error(f"未知场景: {', '.join(sorted(unknown))}")
+
+    bench.print_header()
+    results = bench.run_benchmarks(args, on_result=bench.print_row)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"config": {k: v for k, v in vars(args).items() if k not in ("api_key", "json")},
+                       "results": results}, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.json}")
+    return 0
+
+
+COMMANDS = {
+    "synth": run_synth,
+    "enroll": run_enroll,
+    "bench": run_bench,
+}
+
+
+def main(argv):
+    return COMMANDS[argv[0]](argv[1:])
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
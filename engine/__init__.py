@@ -0,0 +1,33 @@
+# ===========================
+# 无界面核心引擎
+# ===========================
+# 合成 / 复刻 / 列表 / 批量逻辑，不依赖 PyQt5；dashscope 在首次调用云端接口时才导入。
+# GUI（gui.py）与命令行（cli.py）都只是这里的薄封装。
+from .cache import SynthesisCache, CACHE_DIR, CACHE_MAX_MB
+from .catalog import VoiceCatalog, CATALOG_PATH
+from .metrics import MetricsRegistry, Histogram, get_metrics
+from .eventlog import log_event, get_event_logger, LOG_DIR
+from .ratelimit import (RateLimiter, RetryPolicy, TokenBucket, get_limiter, classify_error, retry_hint,
+                        ENDPOINT_LIMITS, DEFAULT_RETRY, FATAL)
+from .formats import (OUTPUT_FORMATS, WavStreamWriter, open_audio_file, format_for_path, format_label,
+                      format_ext, file_filter, request_format)
+from .pool import SynthesizerPool, get_pool
+from .profiling import Profiler, get_profiler, enable_profiling, profiled, PROFILE_DIR, STALL_MS
+from .runtime import (EngineLoop, CancelToken, OperationCancelled, get_engine, OPERATION_LIMITS, OPERATION_PRIORITIES,
+                      CLASS_LIMITS, INTERACTIVE_RESERVE, PRIORITY_INTERACTIVE, PRIORITY_LIST, PRIORITY_BULK,
+                      PRIORITY_POLL)
+from .synthesis import SynthesisJob, StreamingFileWriter, TaskFailed, AUDIO_FORMAT, CANCELLED_MESSAGE
+from .playback import PreviewJob, StreamPlayer, NullSink, FileSink, PREBUFFER_MS, PREVIEW_SAMPLE_RATE
+from .longtext import (LongTextSynthesisJob, split_text, mp3_payload, segment_payload, synthesize_segment,
+                       MODEL_TEXT_LIMITS, LONG_TEXT_SEGMENT_CHARS, LONG_TEXT_WORKERS)
+from .voices import (list_all_voices, iter_voice_pages, delete_voice, guess_model,
+                     parse_voice_list, parse_voice_status, voice_to_dict, STATUS_MAP)
+from .enrollment import EnrollmentScheduler, EnrollmentTicket, get_scheduler, enroll_voice
+from .jobqueue import (JobQueue, synthesis_params, make_synthesis_job, JOBS_PATH, JOB_QUEUED, JOB_RUNNING,
+                       JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+from .batch import load_manifest, run_batch, run_batch_row
+from .speculative import (Speculator, speculation_key, SPECULATIVE_IDLE_MS, SPECULATIVE_BUDGET_CHARS, SPEC_STARTED,
+                          SPEC_CACHED, SPEC_PENDING, SPEC_BUDGET, SPEC_DISABLED)
+from .postprocess import (PostProcessor, get_postprocessor, postprocess_options, numpy_available, can_postprocess,
+                          describe_postprocess, process_file, POSTPROCESS_WORKERS, SILENCE_DB)
+from .bulkenroll import BulkEnrollment, parse_language_hints, voice_matches, write_report, BULK_MAX_ACTIVE
@@ -0,0 +1,112 @@
+# ===========================
+# 清单批量合成
+# ===========================
+# 清单字段：text, voice_id, model, volume, speech_rate, output, format（可选）；支持 .csv 与 .jsonl
+import os
+import csv
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .formats import format_for_path, validate_format
+from .postprocess import get_postprocessor
+from .synthesis import SynthesisJob
+from .longtext import LongTextSynthesisJob, LONG_TEXT_SEGMENT_CHARS
+from .profiling import profiled
+
+
+def load_manifest(path):
+    if path.lower().endswith('.csv'):
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            return list(csv.DictReader(f))
+    rows = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                rows.append(json.loads(line))
+    return rows
+
+
+def run_batch_row(index, row, api_key, default_model=None, overwrite=False, stream=True, cache=None,
+                  default_format=None, postprocess=None):
+    started = time.time()
+    output = str(row.get('output') or '').strip()
+    result = {'row': index, 'voice_id': row.get('voice_id', ''), 'output': output}
+    try:
+        text = str(row.get('text') or '').strip()
+        voice_id = str(row.get('voice_id') or '').strip()
+        model = str(row.get('model') or default_model or '').strip()
+        if not (text and voice_id and model and output):
+            raise ValueError("缺少 text / voice_id / model / output 字段")
+
+        # 重跑时跳过已生成的文件（未完成的只会留下 .part，不会被误判）
+        if not overwrite and os.path.exists(output) and os.path.getsize(output) > 0:
+            result.update(status='skipped', latency=0.0)
+            return result
+
+        volume = int(row.get('volume') or 50)
+        speech_rate = float(row.get('speech_rate') or 1.0)
+        # 格式优先取清单中的 format，其次是命令行指定的，最后按输出文件扩展名推断
+        audio_format = validate_format(str(row.get('format') or '').strip() or default_format
+                                       or format_for_path(output))
+        if len(text) > LONG_TEXT_SEGMENT_CHARS:
+            job = LongTextSynthesisJob(api_key, text, output, voice_id, model, volume, speech_rate,
+                                       workers=1, cache=cache, audio_format=audio_format)
+        else:
+            job = SynthesisJob(api_key, text, output, voice_id, model, volume, speech_rate,
+                               stream=stream, cache=cache, audio_format=audio_format)
+        success, msg = job.run()
+        result['status'] = 'ok' if success else 'failed'
+        if not success:
+            result['error'] = msg
+        elif postprocess:
+            # 交给 run_batch 提交到后处理进程池，本线程接着合成下一条
+            result['_post'] = (audio_format, getattr(job, 'boundaries', None))
+    except Exception as e:
+        result.update(status='failed', error=str(e))
+    result['latency'] = round(time.time() - started, 3)
+    return result
+
+
+def run_batch(rows, api_key, results_path, workers=4, on_result=None, postprocess=None, **row_options):
+    """并发执行清单中的全部任务，结果逐行写入 results_path，返回各状态计数
+
+    postprocess 为 postprocess.postprocess_options 的结果时，合成成功的 WAV / PCM 输出再经后处理进程池处理，
+    统计写入结果的 post 字段；后处理失败只记 post_error，输出保留原样。
+    """
+    counts = {'ok': 0, 'skipped': 0, 'failed': 0}
+    run_row = profiled("batch.row", run_batch_row)
+    done = 0
+    # 结果逐行写入并立即 flush，便于无人值守时随时查看进度
+    with open(results_path, 'w', encoding='utf-8') as out, \
+            ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        pending = {pool.submit(run_row, i, row, api_key, postprocess=postprocess, **row_options): None
+                   for i, row in enumerate(rows)}
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                result = pending.pop(future)
+                if result is None:  # 合成完成
+                    result = future.result()
+                    post = result.pop('_post', None)
+                    if post is not None:
+                        try:
+                            pending[get_postprocessor().submit(result['output'], post[0], postprocess, post[1])] = result
+                            continue
+                        except (ValueError, RuntimeError) as e:
+                            result['post_error'] = str(e)
+                else:  # 后处理完成
+                    try:
+                        stats = future.result()
+                        result['post'] = {key: stats[key] for key in ('bytes_before', 'bytes_after', 'trimmed_sec')}
+                        result['post']['ms'] = round(stats['timings']['total'] * 1000, 1)
+                    except Exception as e:
+                        result['post_error'] = str(e)
+                done += 1
+                counts[result['status']] += 1
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                out.flush()
+                if on_result:
+                    on_result(done, len(rows), result)
+    return counts
@@ -0,0 +1,228 @@
+# ===========================
+# 清单批量复刻
+# ===========================
+# 清单字段：audio_url, prefix, model, language_hints（可选，逗号分隔或 JSON 列表）；支持 .csv 与 .jsonl
+# 提交前去重，保证同一素材不会被复刻两次：
+#   1. 账号里已有同前缀、同模型且未失败的音色 -> exists
+#   2. 任务队列记录过同一 音频URL + 模型 的复刻，且该音色仍在账号里 -> exists
+#   3. 清单内重复的 音频URL + 模型 -> duplicate（只复刻第一行）
+# 其余行经共享的复刻调度器提交，同时训练中的最多 max_active 个；每行结果写入报告（JSONL）。
+# cancel() 后不再提交剩余的行，训练中的停止轮询，这些行记为 cancelled。
+import re
+import json
+import threading
+from collections import Counter
+
+from .enrollment import get_scheduler
+from .jobqueue import JOB_DONE, JOB_FAILED, JOB_CANCELLED
+from .runtime import CancelToken, get_engine
+from .voices import list_all_voices, voice_to_dict, guess_model, FAILED_STATUSES
+
+BULK_MAX_ACTIVE = 4
+HINT_SPLIT_RE = re.compile(r"[,;|\s]+")
+
+
+def _noop(*args):
+    pass
+
+
+def parse_language_hints(value):
+    """清单中的 language_hints：列表或 "zh,en" 形式的字符串；为空返回 None（按模型默认规则）"""
+    if isinstance(value, (list, tuple)):
+        hints = [str(v).strip() for v in value]
+    else:
+        text = str(value or '').strip()
+        if text.startswith('['):
+            return parse_language_hints(json.loads(text))
+        hints = HINT_SPLIT_RE.split(text)
+    return [h for h in hints if h] or None
+
+
+def voice_matches(voice, prefix, model):
+    v_dict = voice_to_dict(voice)
+    voice_id = str(v_dict.get('voice_id', ''))
+    return (f"-{prefix}-" in voice_id and (v_dict.get('target_model') or guess_model(voice_id)) == model
+            and v_dict.get('status') not in FAILED_STATUSES)
+
+
+class BulkEnrollment:
+    """按清单批量复刻；start() 立即返回，wait() 阻塞到全部结束
+
+    on_row(result) 在每行有最终结果时回调，on_finished(results) 在全部结束时回调，均在引擎线程中调用。
+    result 为 dict：row / audio_url / prefix / model / language_hints / status / voice_id / message，
+    status 取值 enrolled / failed / exists / duplicate / invalid / cancelled。
+    """
+
+    def __init__(self, api_key, rows, jobs, default_model=None, max_active=BULK_MAX_ACTIVE, scheduler=None,
+                 on_row=None, on_progress=None, on_finished=None):
+        self.api_key = api_key
+        self.jobs = jobs
+        self.max_active = max(1, max_active)
+        self.scheduler = scheduler
+        self.on_row = on_row or _noop
+        self.on_progress = on_progress or _noop   # (result, percent, message)
+        self.on_finished = on_finished or _noop
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        self.finished = False
+        self.pending = []  # 待提交的行
+        self.active = 0
+        self.tickets = []  # 已提交的复刻任务，取消时一并停止轮询
+        self.planned = False
+        self.cancel_token = CancelToken()
+        self.results = [self._parse(i, row, default_model) for i, row in enumerate(rows)]
+
+    @staticmethod
+    def _parse(index, row, default_model):
+        result = {
+            'row': index,
+            'audio_url': str(row.get('audio_url') or row.get('url') or '').strip(),
+            'prefix': str(row.get('prefix') or row.get('voice_name') or '').strip(),
+            'model': str(row.get('model') or row.get('target_model') or default_model or '').strip(),
+            'language_hints': None, 'status': None, 'voice_id': None, 'message': '',
+        }
+        try:
+            result['language_hints'] = parse_language_hints(row.get('language_hints'))
+        except ValueError as e:
+            result.update(status='invalid', message=f"language_hints 格式错误: {e}")
+        if result['status'] is None and not (result['audio_url'] and result['prefix'] and result['model']):
+            result.update(status='invalid', message="缺少 audio_url / prefix / model 字段")
+        return result
+
+    def start(self):
+        # 先拉取账号下的全部音色用于去重；拉取不完整时不提交，宁可不做也不重复复刻
+        get_engine().submit("list", self._list_voices, cancel=self.cancel_token, on_done=self._plan)
+        return self
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+    def cancel(self):
+        self.cancel_token.cancel()
+        with self.lock:
+            tickets = list(self.tickets)
+        for ticket in tickets:
+            (self.scheduler or get_scheduler()).cancel(ticket)
+        if self.planned:  # 还在拉取音色列表时由 _plan 收尾
+            self._fill()
+
+    def _list_voices(self):
+        errors = []
+        voices = list_all_voices(self.api_key, on_error=errors.append, cancel=self.cancel_token)
+        if errors:
+            raise errors[0]
+        return voices
+
+    def _plan(self, voices, error):
+        if error is not None:
+            for result in self.results:
+                if result['status'] is not None:
+                    continue
+                if self.cancel_token.is_set():
+                    self._settle(result, 'cancelled', message="已取消，未提交", notify=False)
+                else:
+                    self._settle(result, 'failed', message=f"获取已有音色失败，未提交: {error}", notify=False)
+            self._finish_all()
+            return
+
+        present = {str(voice_to_dict(v).get('voice_id')): voice_to_dict(v) for v in voices}
+        # 以前提交过的同一素材：音色仍在账号里才算已复刻（被删掉或训练失败的允许重新复刻）
+        history = {}
+        for job in self.jobs.list(self.api_key, "enroll"):
+            voice = present.get(job['voice_id'])
+            if voice is not None and voice.get('status') not in FAILED_STATUSES:
+                history[(job['params'].get('audio_url'), job['params'].get('model'))] = job['voice_id']
+
+        self.planned = True
+        seen = {}
+        for result in self.results:
+            if result['status'] is not None:
+                continue
+            source = (result['audio_url'], result['model'])
+            existing = history.get(source) or next(
+                (v_id for v_id, v in present.items() if voice_matches(v, result['prefix'], result['model'])), None)
+            if existing:
+                self._settle(result, 'exists', existing, f"账号中已有音色 {existing}", notify=False)
+            elif source in seen:
+                self._settle(result, 'duplicate', message=f"与第 {seen[source]} 行素材相同", notify=False)
+            else:
+                seen[source] = result['row']
+                self.pending.append(result)
+        for result in self.results:
+            if result['status'] is not None:
+                self.on_row(result)
+        self._fill()
+
+    def _fill(self):
+        # 训练中的不超过 max_active，结束一个补一个；取消后剩余的行不再提交
+        if self.cancel_token.is_set():
+            with self.lock:
+                cancelled, self.pending = self.pending, []
+            for result in cancelled:
+                self._settle(result, 'cancelled', message="已取消，未提交")
+        while True:
+            with self.lock:
+                if not self.pending or self.active >= self.max_active:
+                    finished = not self.pending and self.active == 0
+                    break
+                result = self.pending.pop(0)
+                self.active += 1
+            self._submit(result)
+        if finished:
+            self._finish_all()
+
+    def _submit(self, result):
+        params = {"audio_url": result['audio_url'], "voice_name": result['prefix'], "model": result['model'],
+                  "language_hints": result['language_hints']}
+        job_id = self.jobs.add(self.api_key, "enroll", params)
+        self.jobs.start(job_id)
+
+        def on_submitted(ticket):
+            result['voice_id'] = ticket.voice_id
+            self.jobs.attach(job_id, ticket.voice_id)
+
+        def on_finished(ticket, success, message):
+            cancelled = not success and ticket.cancel.is_set()
+            self.jobs.finish(job_id, JOB_DONE if success else JOB_CANCELLED if cancelled else JOB_FAILED, message)
+            with self.lock:
+                self.active -= 1
+                if ticket in self.tickets:
+                    self.tickets.remove(ticket)
+            self._settle(result, 'enrolled' if success else 'cancelled' if cancelled else 'failed', ticket.voice_id,
+                         "" if success else message)
+            self._fill()
+
+        ticket = (self.scheduler or get_scheduler()).enroll(
+            self.api_key, result['audio_url'], result['prefix'], result['model'],
+            language_hints=result['language_hints'], on_submitted=on_submitted, on_finished=on_finished,
+            on_progress=lambda ticket, percent, message: self.on_progress(result, percent, message))
+        with self.lock:
+            if not ticket.done:  # 可能已经在引擎线程中结束
+                self.tickets.append(ticket)
+        if self.cancel_token.is_set():
+            (self.scheduler or get_scheduler()).cancel(ticket)
+
+    def _settle(self, result, status, voice_id=None, message='', notify=True):
+        result.update(status=status, message=message)
+        if voice_id:
+            result['voice_id'] = voice_id
+        if notify:
+            self.on_row(result)
+
+    def _finish_all(self):
+        with self.lock:
+            if self.finished:
+                return
+            self.finished = True
+        self.on_finished(self.results)
+        self.done.set()
+
+    def counts(self):
+        return Counter(result['status'] for result in self.results)
+
+
+def write_report(results, path):
+    """每行一条 JSON：清单行号 -> voice_id / 状态"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for result in results:
+            f.write(json.dumps(result, ensure_ascii=False) + "\n")
@@ -0,0 +1,178 @@
+# ===========================
+# 合成结果缓存 (磁盘 LRU)
+# ===========================
+import os
+import json
+import time
+import atexit
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+
+from .formats import commit_file
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cosyvoice_tool", "cache")
+CACHE_MAX_MB = 500
+CACHE_TMP_SUFFIX = '.cache-tmp'  # 命中时复制到输出路径旁的临时文件（前面再加线程号）
+INDEX_SAVE_DELAY = 2.0  # 命中后延后这么多秒再写索引，期间的命中合并成一次
+
+
+class SynthesisCache:
+    """按 (模型, 音色, 音量, 语速, 格式, 规范化文本) 的哈希缓存合成结果，超出容量按 LRU 淘汰"""
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, 'index.json')
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> {voice_id, size, atime}，越靠后越新
+        self.hits = 0
+        self.misses = 0
+        self.save_timer = None  # 延后写索引的定时器
+        self.load_index()
+        atexit.register(self.flush)
+
+    @staticmethod
+    def make_key(model, voice_id, volume, speech_rate, audio_format, text):
+        # 文本规范化：合并连续空白，避免仅因换行/空格不同而重复合成
+        normalized = " ".join(text.split())
+        payload = json.dumps([model, voice_id, int(volume), round(float(speech_rate), 2), audio_format, normalized],
+                             ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def path_for(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def load_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        for key, entry in sorted(data.items(), key=lambda kv: kv[1].get('atime', 0)):
+            if os.path.exists(self.path_for(key)):
+                self.entries[key] = entry
+
+    def save_index(self):
+        # 调用方需持有 self.lock；会一并写入延后的改动
+        if self.save_timer is not None:
+            self.save_timer.cancel()
+            self.save_timer = None
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.index_path)
+
+    def total_bytes(self):
+        return sum(entry['size'] for entry in self.entries.values())
+
+    def stats(self):
+        return f"缓存命中 {self.hits} / 未命中 {self.misses}，共 {len(self.entries)} 条"
+
+    def contains(self, key):
+        with self.lock:
+            return key in self.entries
+
+    def fetch(self, key, output_path):
+        # 锁内只查条目、更新 LRU 顺序；复制文件在锁外进行，命中之间、命中与写入之间互不阻塞
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False
+            entry['atime'] = time.time()
+            self.entries.move_to_end(key)
+        # 复制到临时文件，刷盘后再改名，输出路径上不会出现半截文件；
+        # 临时文件不用 .part，那是流式合成保留的半成品
+        tmp_path = f"{output_path}.{threading.get_ident()}{CACHE_TMP_SUFFIX}"
+        try:
+            shutil.copyfile(self.path_for(key), tmp_path)
+            commit_file(tmp_path, output_path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            # 缓存文件丢失或损坏（或刚被淘汰），按未命中处理
+            with self.lock:
+                if self.entries.get(key) is entry:
+                    self.entries.pop(key)
+                self.misses += 1
+            return False
+        with self.lock:
+            self.hits += 1
+            self.schedule_save()
+        return True
+
+    def schedule_save(self):
+        # 调用方需持有 self.lock；命中只改了访问时间，索引延后合并写一次，丢了也只影响淘汰顺序
+        if self.save_timer is None:
+            self.save_timer = threading.Timer(INDEX_SAVE_DELAY, self.flush)
+            self.save_timer.daemon = True
+            self.save_timer.start()
+
+    def flush(self):
+        """把延后的索引改动写到磁盘（程序退出时自动调用）"""
+        with self.lock:
+            if self.save_timer is not None:
+                self.save_timer.cancel()
+                self.save_timer = None
+                try:
+                    self.save_index()
+                except OSError:
+                    pass
+
+    def store(self, key, voice_id, source_path):
+        if self.max_bytes <= 0:
+            return False
+        path = self.path_for(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"  # 同一 key 可能被多个线程同时写入
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            shutil.copyfile(source_path, tmp_path)
+            size = os.path.getsize(tmp_path)
+            with self.lock:
+                os.replace(tmp_path, path)
+                self.entries[key] = {'voice_id': voice_id, 'size': size, 'atime': time.time()}
+                self.entries.move_to_end(key)
+                self.evict()
+                self.save_index()
+            return True
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return False
+
+    def evict(self):
+        # 调用方需持有 self.lock；从最久未使用的条目开始淘汰
+        total = self.total_bytes()
+        while total > self.max_bytes and self.entries:
+            key, entry = self.entries.popitem(last=False)
+            total -= entry['size']
+            try:
+                os.remove(self.path_for(key))
+            except OSError:
+                pass
+
+    def set_max_bytes(self, max_bytes):
+        with self.lock:
+            self.max_bytes = max_bytes
+            self.evict()
+            self.save_index()
+
+    def invalidate_voice(self, voice_id):
+        with self.lock:
+            keys = [k for k, entry in self.entries.items() if entry.get('voice_id') == voice_id]
+            for key in keys:
+                self.entries.pop(key)
+                try:
+                    os.remove(self.path_for(key))
+                except OSError:
+                    pass
+            if keys:
+                self.save_index()
+            return len(keys)
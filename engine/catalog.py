@@ -0,0 +1,124 @@
+# ===========================
+# 本地音色目录 (SQLite)
+# ===========================
+# 记录每个账号下的音色：voice_id / 状态 / 目标模型 / 创建时间 / 最后一次在云端看到的时间。
+# 启动时直接从这里填表；刷新时与云端列表做差异比对，只应用新增 / 变更 / 删除；
+# 本地复刻、删除成功后直接改目录，不必整表重拉。
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+
+from .voices import voice_to_dict, guess_model
+
+CATALOG_PATH = os.path.join(os.path.expanduser("~"), ".cosyvoice_tool", "voices.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS voices (
+    account      TEXT NOT NULL,
+    voice_id     TEXT NOT NULL,
+    status       TEXT,
+    target_model TEXT,
+    gmt_create   TEXT,
+    last_seen    REAL,
+    PRIMARY KEY (account, voice_id)
+)
+"""
+COLUMNS = ("voice_id", "status", "target_model", "gmt_create", "last_seen")
+
+
+def account_of(api_key):
+    # 不落盘 API Key，只存它的摘要用于区分账号
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]
+
+
+class VoiceCatalog:
+
+    def __init__(self, path=CATALOG_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self.conn:
+            self.conn.execute(SCHEMA)
+
+    def _rows(self, account):
+        cur = self.conn.execute(
+            "SELECT voice_id, status, target_model, gmt_create, last_seen FROM voices "
+            "WHERE account = ? ORDER BY gmt_create, voice_id", (account,))
+        return [dict(row) for row in cur]
+
+    def load(self, api_key):
+        """返回该账号下缓存的音色（dict 列表）"""
+        with self.lock:
+            return self._rows(account_of(api_key))
+
+    def last_account_rows(self):
+        """启动时还没有 API Key：取最近一次同步过的账号的音色"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT account FROM voices ORDER BY last_seen DESC LIMIT 1").fetchone()
+            return self._rows(row["account"]) if row else []
+
+    def sync(self, api_key, voices):
+        """用一次完整的云端列表更新目录，返回 (新增, 变更, 删除)；新增/变更为 dict 列表，删除为 voice_id 列表"""
+        account = account_of(api_key)
+        now = time.time()
+        with self.lock, self.conn:
+            known = {row["voice_id"]: row for row in self._rows(account)}
+            inserted, updated = [], []
+            for v in voices:
+                v_dict = voice_to_dict(v)
+                v_id = str(v_dict.get('voice_id', 'Unknown'))
+                old = known.pop(v_id, None)
+                row = {
+                    "voice_id": v_id,
+                    "status": str(v_dict.get('status', 'Unknown')),
+                    # 列表接口不一定带 target_model：优先沿用目录里已知的，最后才按 ID 猜
+                    "target_model": (v_dict.get('target_model') or (old and old["target_model"])
+                                     or guess_model(v_id)),
+                    "gmt_create": v_dict.get('gmt_create') or (old and old["gmt_create"]),
+                    "last_seen": now,
+                }
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO voices (account, voice_id, status, target_model, gmt_create, last_seen) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", (account,) + tuple(row[c] for c in COLUMNS))
+                if old is None:
+                    inserted.append(row)
+                elif old["status"] != row["status"] or old["target_model"] != row["target_model"]:
+                    updated.append(row)
+            removed = list(known)
+            self.conn.executemany("DELETE FROM voices WHERE account = ? AND voice_id = ?",
+                                  [(account, v_id) for v_id in removed])
+        return inserted, updated, removed
+
+    def upsert(self, api_key, voice_id, status, target_model=None):
+        """本地复刻成功后直接写入目录，返回写入的行"""
+        account = account_of(api_key)
+        with self.lock, self.conn:
+            old = self.conn.execute("SELECT target_model, gmt_create FROM voices WHERE account = ? AND voice_id = ?",
+                                    (account, voice_id)).fetchone()
+            row = {
+                "voice_id": voice_id,
+                "status": status,
+                "target_model": target_model or (old and old["target_model"]) or guess_model(voice_id),
+                "gmt_create": (old and old["gmt_create"]) or time.strftime('%Y-%m-%d %H:%M:%S'),
+                "last_seen": time.time(),
+            }
+            self.conn.execute(
+                "INSERT OR REPLACE INTO voices (account, voice_id, status, target_model, gmt_create, last_seen) "
+                "VALUES (?, ?, ?, ?, ?, ?)", (account,) + tuple(row[c] for c in COLUMNS))
+        return row
+
+    def remove(self, api_key, voice_ids):
+        account = account_of(api_key)
+        with self.lock, self.conn:
+            self.conn.executemany("DELETE FROM voices WHERE account = ? AND voice_id = ?",
+                                  [(account, v_id) for v_id in voice_ids])
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,155 @@
+# ===========================
+# DashScope SDK 访问层
+# ===========================
+# 所有对云端的调用都经过这里；dashscope 在第一次真正调用时才导入，
+# 这样只用到缓存、文本切分等功能的脚本不必为 SDK 付出导入开销。
+import json
+import threading
+
+from .metrics import get_metrics
+from .ratelimit import DEFAULT_RETRY
+
+_sdk_lock = threading.Lock()
+_key_lock = threading.Lock()  # SDK 构造 / 重置 Synthesizer 时读取全局 api_key，需串行化
+_tts = None
+_backend = None  # 压测时替换为本地模拟实现（见 engine/mock.py）
+
+
+def use_backend(backend):
+    """替换云端 SDK：backend 需提供 SpeechSynthesizer / VoiceEnrollmentService / AudioFormat / set_api_key；
+    传 None 恢复为 dashscope"""
+    global _backend
+    _backend = backend
+
+
+def tts():
+    """返回 dashscope.audio.tts_v2 模块（首次调用时导入）"""
+    global _tts
+    if _backend is not None:
+        return _backend
+    if _tts is None:
+        with _sdk_lock:
+            if _tts is None:
+                from dashscope.audio import tts_v2
+                _tts = tts_v2
+    return _tts
+
+
+def set_api_key(api_key):
+    if _backend is not None:
+        _backend.set_api_key(api_key)
+        return
+    import dashscope
+    dashscope.api_key = api_key
+
+
+def audio_format(name):
+    # 格式以 AudioFormat 成员名传递（如 "MP3_22050HZ_MONO_256KBPS"），避免调用方导入 SDK
+    try:
+        return getattr(tts().AudioFormat, name)
+    except AttributeError:
+        raise ValueError(f"当前 dashscope SDK 不支持音频格式 {name}，请升级 SDK 或换用其它格式")
+
+
+def new_synthesizer(api_key, model, voice_id, volume, speech_rate, format_name, callback=None):
+    # SpeechSynthesizer 在构造时读取全局 dashscope.api_key 并固化到自己的请求对象里，
+    # 持锁设置 + 构造，不同 Key 的并发任务不会串号
+    with _key_lock:
+        set_api_key(api_key)
+        return tts().SpeechSynthesizer(
+            model=model,
+            voice=voice_id,
+            format=audio_format(format_name),
+            volume=volume,
+            speech_rate=speech_rate,
+            callback=callback
+        )
+
+
+# 以下几个函数访问 SDK 的私有方法（与 SDK 自带的 SpeechSynthesizerObjectPool 做法相同），
+# 用于在任务之间复用同一条 websocket 连接；按 dashscope 1.27.7 测试过（见 requirements.txt），
+# SDK 升级后这些方法不在了就不复用，每个任务新建 Synthesizer
+REUSE_METHODS = ("_SpeechSynthesizer__is_connected", "_SpeechSynthesizer__reset",
+                 "_SpeechSynthesizer__update_params")
+
+
+def supports_reuse(synthesizer):
+    return all(hasattr(synthesizer, name) for name in REUSE_METHODS)
+
+
+def keep_connection(synthesizer):
+    """任务结束后不关闭连接"""
+    synthesizer._close_ws_after_use = False
+
+
+def is_connected(synthesizer):
+    return supports_reuse(synthesizer) and synthesizer._SpeechSynthesizer__is_connected()
+
+
+def reset_synthesizer(synthesizer, api_key, model, voice_id, volume, speech_rate, format_name, callback=None):
+    """把用过的 Synthesizer 重置为一个新任务，保留已建立的连接"""
+    with _key_lock:
+        set_api_key(api_key)
+        synthesizer._SpeechSynthesizer__reset()
+        synthesizer._SpeechSynthesizer__update_params(
+            model, voice_id, audio_format(format_name), volume, speech_rate,
+            callback=callback, close_ws_after_use=False)
+    return synthesizer
+
+
+def enrollment_service(api_key):
+    # VoiceEnrollmentService 自带 api_key，不经过全局变量
+    return tts().VoiceEnrollmentService(api_key=api_key)
+
+
+def response_bytes(resp):
+    """音色管理接口的响应大小：SDK 只交出解析后的 output，按 JSON 重新编码估算（无返回内容记 0）"""
+    if resp is None:
+        return 0
+    if isinstance(resp, (bytes, bytearray)):
+        return len(resp)
+    try:
+        return len(json.dumps(resp, ensure_ascii=False, default=str).encode('utf-8'))
+    except (TypeError, ValueError):
+        return None
+
+
+# 音色管理接口：经过共享限流器，按 retry 策略重试（默认 DEFAULT_RETRY）；
+# 每次尝试都计入 metrics（合成调用在 synthesis / longtext 中统计），含响应大小；model 已知时按模型分开统计
+def list_voices(api_key, page_index, page_size, retry=DEFAULT_RETRY, cancel=None):
+    def call():
+        with get_metrics().track("list_voices") as timer:
+            resp = enrollment_service(api_key).list_voices(page_index=page_index, page_size=page_size)
+            timer.bytes = response_bytes(resp)
+            return resp
+    return retry.call(call, api_key, "list_voices", cancel=cancel)
+
+
+def create_voice(api_key, retry=DEFAULT_RETRY, **kwargs):
+    model = kwargs.get('target_model')
+
+    def call():
+        with get_metrics().track("create_voice", model) as timer:
+            resp = enrollment_service(api_key).create_voice(**kwargs)
+            timer.bytes = response_bytes(resp)
+            return resp
+    # 创建不是幂等操作，只在被限流时重发
+    return retry.call(call, api_key, "create_voice", model, idempotent=False)
+
+
+def query_voice(api_key, voice_id, retry=DEFAULT_RETRY, model=None):
+    def call():
+        with get_metrics().track("query_voice", model) as timer:
+            resp = enrollment_service(api_key).query_voice(voice_id=voice_id)
+            timer.bytes = response_bytes(resp)
+            return resp
+    return retry.call(call, api_key, "query_voice", model)
+
+
+def delete_voice(api_key, voice_id, retry=DEFAULT_RETRY, cancel=None, model=None):
+    def call():
+        with get_metrics().track("delete_voice", model) as timer:
+            resp = enrollment_service(api_key).delete_voice(voice_id=voice_id)
+            timer.bytes = response_bytes(resp)
+            return resp
+    return retry.call(call, api_key, "delete_voice", model, cancel=cancel)
@@ -0,0 +1,261 @@
+# ===========================
+# 音色复刻调度器 (共享轮询)
+# ===========================
+# 所有复刻任务都是引擎事件循环（runtime.py）里的定时任务：按各音色的状态变化自适应调整轮询间隔
+# （状态不变时指数退避，进入新状态时回到该状态的初始间隔，并加随机抖动）。
+# 等待间隔不占线程，查询调用受 "enroll" 并发上限约束，同时跟踪上百个 voice_id 也只用几个线程。
+# 每个任务带一个 CancelToken：cancel() 后等待中的下一次轮询立即结束，任务以失败（已取消）收尾。
+import time
+import random
+import functools
+import threading
+
+from . import client
+from .metrics import get_metrics
+from .ratelimit import NO_RETRY, THROTTLED, FATAL, classify_error, retry_hint
+from .runtime import CancelToken, OperationCancelled, get_engine
+from .voices import STATUS_MAP, SUCCESS_STATUSES, FAILED_STATUSES, parse_voice_status
+
+# 各状态的 (初始间隔, 最大间隔)，单位秒
+POLL_INTERVALS = {
+    "RUNNING": (5.0, 30.0),
+    "DEPLOYING": (2.0, 10.0),   # 部署阶段通常很快结束，轮询更密
+}
+DEFAULT_POLL_INTERVAL = (5.0, 60.0)
+POLL_BACKOFF = 1.5
+POLL_JITTER = 0.2             # 间隔上下浮动 ±20%，避免多个任务同时打到接口
+ERROR_BACKOFF_MAX = 60.0
+SUBMIT_MAX_RETRY = 3          # 创建请求被限流时的重发次数
+ENROLL_TIMEOUT = 600          # 秒
+CANCELLED_MESSAGE = "已取消（云端的训练不受影响，稍后刷新列表查看）"
+EXPECTED_TRAIN_SECONDS = 120  # 仅用于估算进度
+
+
+def _noop(*args):
+    pass
+
+
+def default_language_hints(model):
+    if 'v3' in model:
+        return ['zh']
+    return None
+
+
+class EnrollmentTicket:
+    """一个复刻任务的状态；回调参数为 (ticket, percent, message) / (ticket, success, message)
+
+    on_submitted(ticket) 在服务端受理、拿到 voice_id 后立即回调（引擎线程中），用于持久化 voice_id。
+    """
+
+    def __init__(self, api_key, model, audio_url=None, voice_name=None, voice_id=None, language_hints=None,
+                 on_progress=None, on_finished=None, on_submitted=None):
+        self.api_key = api_key
+        self.model = model
+        self.audio_url = audio_url
+        self.voice_name = voice_name
+        # 为 None 时按模型默认规则（default_language_hints）
+        self.language_hints = language_hints
+        self.voice_id = voice_id
+        self.on_progress = on_progress or _noop
+        self.on_finished = on_finished or _noop
+        self.on_submitted = on_submitted or _noop
+        self.status = "SUBMITTED"
+        self.interval = 0.0
+        self.polls = 0
+        self.submits = 0
+        self.started_at = time.time()
+        self.done = False
+        self.cancel = CancelToken()
+
+    @property
+    def label(self):
+        return self.voice_id or self.voice_name
+
+    def percent(self):
+        if self.status == "DEPLOYING":
+            return 80
+        elapsed = time.time() - self.started_at
+        return 30 + int(min(elapsed / EXPECTED_TRAIN_SECONDS, 1.0) * 40)
+
+
+class EnrollmentScheduler:
+
+    def __init__(self, intervals=POLL_INTERVALS, default_interval=DEFAULT_POLL_INTERVAL, engine=None):
+        self.intervals = intervals
+        self.default_interval = default_interval
+        self.engine = engine  # 默认使用共享的 get_engine()
+        self._lock = threading.Lock()
+        self._tickets = set()
+
+    def enroll(self, api_key, audio_url, voice_name, model, language_hints=None, on_progress=None, on_finished=None,
+               on_submitted=None):
+        """提交新的复刻任务（提交本身也在引擎中完成），返回 ticket"""
+        ticket = EnrollmentTicket(api_key, model, audio_url=audio_url, voice_name=voice_name,
+                                  language_hints=language_hints, on_progress=on_progress,
+                                  on_finished=on_finished, on_submitted=on_submitted)
+        self._schedule(ticket, 0)
+        return ticket
+
+    def track(self, api_key, voice_id, model=None, on_progress=None, on_finished=None):
+        """跟踪一个已提交的 voice_id，直到训练结束"""
+        ticket = EnrollmentTicket(api_key, model, voice_id=voice_id,
+                                  on_progress=on_progress, on_finished=on_finished)
+        ticket.status = "UNKNOWN"
+        self._schedule(ticket, 0)
+        return ticket
+
+    def pending(self):
+        with self._lock:
+            return [t for t in self._tickets if not t.done]
+
+    def cancel(self, ticket):
+        """停止跟踪该任务（只停本地的提交 / 轮询，已受理的训练在云端照常进行）"""
+        ticket.cancel.cancel()
+
+    def cancel_all(self):
+        tickets = self.pending()
+        for ticket in tickets:
+            self.cancel(ticket)
+        return len(tickets)
+
+    def _schedule(self, ticket, delay):
+        with self._lock:
+            self._tickets.add(ticket)
+        (self.engine or get_engine()).submit("enroll", self._step, ticket, delay=delay, cancel=ticket.cancel,
+                                             on_done=functools.partial(self._stepped, ticket))
+
+    def _stepped(self, ticket, result, error):
+        # 排队或等待下一次轮询时被取消
+        if isinstance(error, OperationCancelled) and not ticket.done:
+            self._finish(ticket, False, CANCELLED_MESSAGE)
+
+    def _step(self, ticket):
+        try:
+            if ticket.voice_id is None:
+                self._submit(ticket)
+            else:
+                self._poll(ticket)
+        except Exception as e:
+            # 回调异常不能让任务悄无声息地停下
+            if not ticket.done:
+                self._finish(ticket, False, f"系统错误: {str(e)}")
+
+    def _submit(self, ticket):
+        ticket.on_progress(ticket, 10, f"提交复刻任务 ({ticket.model})...")
+        kwargs = {
+            'target_model': ticket.model,
+            'prefix': ticket.voice_name,
+            'url': ticket.audio_url
+        }
+        language_hints = ticket.language_hints
+        if language_hints is None:
+            language_hints = default_language_hints(ticket.model)
+        if language_hints:
+            kwargs['language_hints'] = language_hints
+        ticket.submits += 1
+        try:
+            # 不在引擎线程里阻塞等待重试：只经过限流器，被限流时重新排一个定时任务
+            ticket.voice_id = client.create_voice(ticket.api_key, retry=NO_RETRY, **kwargs)
+        except Exception as e:
+            if classify_error(e) == THROTTLED and ticket.submits <= SUBMIT_MAX_RETRY:
+                delay = retry_hint(e) or min(2.0 ** ticket.submits, ERROR_BACKOFF_MAX)
+                get_metrics().record_retry("create_voice", ticket.model)
+                ticket.on_progress(ticket, 10, f"提交被限流，{delay:.0f} 秒后重试...")
+                self._push(ticket, delay)
+                return
+            self._finish(ticket, False, f"提交任务失败: {str(e)}")
+            return
+
+        ticket.started_at = time.time()
+        ticket.status = "RUNNING"
+        ticket.on_submitted(ticket)
+        ticket.on_progress(ticket, 30, f"任务已提交，ID: {ticket.voice_id}")
+        ticket.interval = self.intervals.get("RUNNING", self.default_interval)[0]
+        self._push(ticket, ticket.interval)
+
+    def _poll(self, ticket):
+        ticket.polls += 1
+        try:
+            status = parse_voice_status(client.query_voice(ticket.api_key, ticket.voice_id, retry=NO_RETRY,
+                                                          model=ticket.model))
+        except Exception as e:
+            if classify_error(e) == FATAL:
+                self._finish(ticket, False, f"查询失败: {str(e)}")
+                return
+            if self._timed_out(ticket):
+                return
+            # 服务端给出等待时间时以其为准，否则指数退避
+            hint = retry_hint(e)
+            ticket.interval = hint if hint is not None else min(max(ticket.interval, 1.0) * 2, ERROR_BACKOFF_MAX)
+            get_metrics().record_retry("query_voice")
+            ticket.on_progress(ticket, ticket.percent(),
+                               f"查询报错: {str(e)}，{ticket.interval:.0f} 秒后重试...")
+            self._push(ticket, ticket.interval)
+            return
+
+        previous = ticket.status
+        # 无论真实状态是 DEPLOYING 还是 RUNNING，都显示为 "RUNNING" 风格
+        display_status = "RUNNING" if status == "DEPLOYING" else status
+        ticket.status = status
+        ticket.on_progress(ticket, ticket.percent(),
+                           f"训练中 [{display_status}] - {STATUS_MAP.get(status, status)}...")
+
+        if status in SUCCESS_STATUSES:
+            self._finish(ticket, True, ticket.voice_id)
+        elif status in FAILED_STATUSES:
+            self._finish(ticket, False, f"复刻失败: {status}")
+        elif not self._timed_out(ticket):
+            self._reschedule(ticket, previous)
+
+    def _reschedule(self, ticket, previous):
+        base, limit = self.intervals.get(ticket.status, self.default_interval)
+        if ticket.status != previous or ticket.interval == 0:
+            # 状态变化：回到新状态的初始间隔
+            ticket.interval = base
+        else:
+            ticket.interval = min(ticket.interval * POLL_BACKOFF, limit)
+        self._push(ticket, ticket.interval)
+
+    def _push(self, ticket, interval):
+        delay = interval * random.uniform(1 - POLL_JITTER, 1 + POLL_JITTER)
+        self._schedule(ticket, delay)
+
+    def _timed_out(self, ticket):
+        if time.time() - ticket.started_at < ENROLL_TIMEOUT:
+            return False
+        self._finish(ticket, False, f"训练超时（{ENROLL_TIMEOUT}秒），请稍后刷新列表查看")
+        return True
+
+    def _finish(self, ticket, success, message):
+        ticket.done = True
+        with self._lock:
+            self._tickets.discard(ticket)
+        ticket.on_finished(ticket, success, message)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = EnrollmentScheduler()
+        return _scheduler
+
+
+def enroll_voice(api_key, audio_url, voice_name, model, progress=_noop, scheduler=None):
+    """阻塞式复刻：提交并等待完成，返回 (是否成功, voice_id 或错误信息)"""
+    done = threading.Event()
+    result = {}
+
+    def on_finished(ticket, success, message):
+        result['value'] = (success, message)
+        done.set()
+
+    (scheduler or get_scheduler()).enroll(api_key, audio_url, voice_name, model,
+                                          on_progress=lambda ticket, percent, message: progress(percent, message),
+                                          on_finished=on_finished)
+    done.wait()
+    return result['value']
@@ -0,0 +1,70 @@
+# ===========================
+# 结构化事件日志 (JSONL, 按大小轮转)
+# ===========================
+# 每条事件一行 JSON：时间、级别、操作(op)、voice_id、耗时等字段，方便事后 grep / 统计。
+# 写文件在后台线程中完成（QueueHandler + QueueListener），调用方不会被磁盘 IO 拖慢。
+import os
+import json
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+
+LOG_DIR = os.path.join(os.path.expanduser("~"), ".cosyvoice_tool", "logs")
+LOG_FILE = "events.jsonl"
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 5
+
+_logger = None
+_listener = None
+_lock = threading.Lock()
+
+
+class JsonLineFormatter(logging.Formatter):
+
+    def format(self, record):
+        event = {
+            "ts": round(record.created, 3),
+            "time": self.formatTime(record, "%Y-%m-%d %H:%M:%S"),
+            "level": record.levelname,
+            "op": getattr(record, "op", None),
+            "voice_id": getattr(record, "voice_id", None),
+            "message": record.getMessage(),
+        }
+        event.update(getattr(record, "fields", {}))
+        return json.dumps(event, ensure_ascii=False, default=str)
+
+
+def get_event_logger(log_dir=LOG_DIR):
+    global _logger, _listener
+    with _lock:
+        if _logger is None:
+            os.makedirs(log_dir, exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                os.path.join(log_dir, LOG_FILE), maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS,
+                encoding='utf-8', delay=True)
+            handler.setFormatter(JsonLineFormatter())
+            records = queue.Queue()
+            _listener = logging.handlers.QueueListener(records, handler)
+            _listener.start()
+            atexit.register(_listener.stop)  # 退出前把队列里剩下的写完
+
+            logger = logging.getLogger("cosyvoice.events")
+            logger.setLevel(logging.DEBUG)
+            logger.propagate = False
+            logger.addHandler(logging.handlers.QueueHandler(records))
+            _logger = logger
+        return _logger
+
+
+def log_event(message, level="INFO", op=None, voice_id=None, elapsed=None, **fields):
+    """记录一条事件；elapsed 为耗时（秒），其余关键字参数原样写入 JSON"""
+    if elapsed is not None:
+        fields["elapsed"] = round(elapsed, 3)
+    try:
+        logger = get_event_logger()
+    except OSError:
+        return  # 日志目录不可写时不影响主流程
+    logger.log(getattr(logging, level, logging.INFO), message,
+               extra={"op": op, "voice_id": voice_id, "fields": fields})
@@ -0,0 +1,156 @@
+# ===========================
+# 输出格式 / 流式 WAV 写入
+# ===========================
+# 格式名沿用 SDK AudioFormat 的成员名。WAV 不直接向服务端要（分段拼接时每段都会带一个文件头），
+# 而是请求同采样率的 PCM，本地先写一个占位 RIFF 头，分片直接追加到磁盘，结束时回填头里的长度。
+import os
+import struct
+
+AUDIO_FORMAT = "MP3_22050HZ_MONO_256KBPS"  # 默认格式
+
+# 格式名 -> (容器 / 扩展名, 采样率, 码率 kbps)；PCM / WAV 均为 16bit 单声道
+OUTPUT_FORMATS = {
+    "MP3_22050HZ_MONO_256KBPS": ("mp3", 22050, 256),
+    "MP3_24000HZ_MONO_256KBPS": ("mp3", 24000, 256),
+    "MP3_44100HZ_MONO_256KBPS": ("mp3", 44100, 256),
+    "MP3_48000HZ_MONO_256KBPS": ("mp3", 48000, 256),
+    "MP3_16000HZ_MONO_128KBPS": ("mp3", 16000, 128),
+    "MP3_8000HZ_MONO_128KBPS": ("mp3", 8000, 128),
+    "WAV_8000HZ_MONO_16BIT": ("wav", 8000, 128),
+    "WAV_16000HZ_MONO_16BIT": ("wav", 16000, 256),
+    "WAV_22050HZ_MONO_16BIT": ("wav", 22050, 352.8),
+    "WAV_24000HZ_MONO_16BIT": ("wav", 24000, 384),
+    "WAV_44100HZ_MONO_16BIT": ("wav", 44100, 705.6),
+    "WAV_48000HZ_MONO_16BIT": ("wav", 48000, 768),
+    "PCM_8000HZ_MONO_16BIT": ("pcm", 8000, 128),
+    "PCM_16000HZ_MONO_16BIT": ("pcm", 16000, 256),
+    "PCM_22050HZ_MONO_16BIT": ("pcm", 22050, 352.8),
+    "PCM_24000HZ_MONO_16BIT": ("pcm", 24000, 384),
+    "PCM_44100HZ_MONO_16BIT": ("pcm", 44100, 705.6),
+    "PCM_48000HZ_MONO_16BIT": ("pcm", 48000, 768),
+    # Opus 需要较新的 SDK；SDK 没有对应成员时 client.audio_format 会报错
+    "OGG_OPUS_16KHZ_MONO_32KBPS": ("opus", 16000, 32),
+    "OGG_OPUS_24KHZ_MONO_32KBPS": ("opus", 24000, 32),
+    "OGG_OPUS_24KHZ_MONO_64KBPS": ("opus", 24000, 64),
+    "OGG_OPUS_48KHZ_MONO_64KBPS": ("opus", 48000, 64),
+}
+EXT_LABELS = {"mp3": "MP3", "wav": "WAV", "pcm": "PCM (裸数据)", "opus": "Opus"}
+# 按扩展名推断格式时使用的默认项
+EXT_DEFAULTS = {
+    "mp3": AUDIO_FORMAT,
+    "wav": "WAV_22050HZ_MONO_16BIT",
+    "pcm": "PCM_22050HZ_MONO_16BIT",
+    "opus": "OGG_OPUS_24KHZ_MONO_32KBPS",
+    "ogg": "OGG_OPUS_24KHZ_MONO_32KBPS",
+}
+PCM_SAMPLE_WIDTH = 2
+
+
+def format_ext(format_name):
+    return OUTPUT_FORMATS[format_name][0]
+
+
+def format_label(format_name):
+    ext, sample_rate, kbps = OUTPUT_FORMATS[format_name]
+    if ext in ("wav", "pcm"):
+        return f"{EXT_LABELS[ext]} {sample_rate / 1000:g} kHz 16bit"
+    return f"{EXT_LABELS[ext]} {sample_rate / 1000:g} kHz {kbps:g} kbps"
+
+
+def file_filter(format_name):
+    """QFileDialog 用的过滤器字符串"""
+    ext = format_ext(format_name)
+    return f"{EXT_LABELS[ext]} Files (*.{ext})"
+
+
+def bytes_per_sec(format_name):
+    return OUTPUT_FORMATS[format_name][2] * 1000 / 8
+
+
+def request_format(format_name):
+    """实际向服务端请求的格式：WAV 改为请求 PCM，文件头由 WavStreamWriter 本地生成"""
+    if format_ext(format_name) == "wav":
+        return "PCM" + format_name[3:]
+    return format_name
+
+
+def format_for_path(path, default=AUDIO_FORMAT):
+    """按输出文件扩展名推断格式"""
+    ext = os.path.splitext(path)[1].lstrip('.').lower()
+    return EXT_DEFAULTS.get(ext, default)
+
+
+def validate_format(format_name):
+    if format_name not in OUTPUT_FORMATS:
+        raise ValueError(f"不支持的输出格式: {format_name}（可选格式见 engine/formats.py 的 OUTPUT_FORMATS）")
+    return format_name
+
+
+def wav_header(sample_rate, data_size, channels=1, sample_width=PCM_SAMPLE_WIDTH):
+    byte_rate = sample_rate * channels * sample_width
+    riff_size = 36 + data_size + (data_size & 1)  # data 块为奇数长度时补一个字节
+    return (b'RIFF' + struct.pack('<I', riff_size) + b'WAVEfmt ' +
+            struct.pack('<IHHIIHH', 16, 1, channels, sample_rate, byte_rate, channels * sample_width,
+                        sample_width * 8) +
+            b'data' + struct.pack('<I', data_size))
+
+
+class WavStreamWriter:
+    """边写边落盘的 WAV 文件：先写占位头，PCM 分片直接追加，close() 时回填长度，不在内存中缓存音频
+
+    接口与文件对象一致（write / close / 上下文管理器），可直接交给 StreamingFileWriter。
+    """
+
+    def __init__(self, fp, sample_rate):
+        self.fp = fp
+        self.sample_rate = sample_rate
+        self.data_size = 0
+        self.closed = False
+        fp.write(wav_header(sample_rate, 0))
+
+    def write(self, data):
+        self.fp.write(data)
+        self.data_size += len(data)
+        return len(data)
+
+    def finalize(self):
+        """回填 RIFF / data 块长度；异常中断时也会调用，保留下来的部分文件同样可以播放"""
+        if self.data_size & 1:
+            self.fp.write(b'\0')
+        self.fp.seek(0)
+        self.fp.write(wav_header(self.sample_rate, self.data_size))
+        self.fp.seek(0, 2)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            try:
+                self.finalize()
+            finally:
+                self.fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def open_audio_file(path, format_name):
+    """按格式打开输出文件：WAV 返回 WavStreamWriter，其余返回普通二进制文件"""
+    fp = open(path, 'wb')
+    if format_ext(format_name) == "wav":
+        try:
+            return WavStreamWriter(fp, OUTPUT_FORMATS[format_name][1])
+        except Exception:
+            fp.close()
+            raise
+    return fp
+
+
+def commit_file(tmp_path, path):
+    """临时文件刷到磁盘后原子改名为正式输出：崩溃时 path 要么不存在，要么是完整的文件"""
+    with open(tmp_path, 'rb+') as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
@@ -0,0 +1,133 @@
+# ===========================
+# 持久化任务队列 (SQLite, WAL)
+# ===========================
+# 合成 / 复刻 / 删除任务提交前先落一条记录，状态变化随时写回；程序关闭或崩溃后，
+# 下次填入同一账号的 API Key 时可以继续未完成的任务：合成重新执行（输出是原子改名的，不会留下半截文件），
+# 已拿到 voice_id 的复刻直接接着轮询，删除重新发起。
+# 与音色目录一样不落盘 API Key，只按账号摘要区分。
+import os
+import json
+import time
+import sqlite3
+import threading
+
+from .catalog import account_of
+from .synthesis import SynthesisJob
+from .longtext import LongTextSynthesisJob, LONG_TEXT_SEGMENT_CHARS, LONG_TEXT_WORKERS
+
+JOBS_PATH = os.path.join(os.path.expanduser("~"), ".cosyvoice_tool", "jobs.db")
+
+# 任务状态
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+UNFINISHED = (JOB_QUEUED, JOB_RUNNING)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id       INTEGER PRIMARY KEY AUTOINCREMENT,
+    account  TEXT NOT NULL,
+    kind     TEXT NOT NULL,
+    state    TEXT NOT NULL,
+    params   TEXT NOT NULL,
+    voice_id TEXT,
+    result   TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created  REAL,
+    updated  REAL
+)
+"""
+INDEX = "CREATE INDEX IF NOT EXISTS jobs_state ON jobs (account, state)"
+KEEP_FINISHED_DAYS = 7  # 已结束的记录保留天数
+
+
+class JobQueue:
+
+    def __init__(self, path=JOBS_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self.conn:
+            # WAL：写入不阻塞读，崩溃时已提交的记录不会丢
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(SCHEMA)
+            self.conn.execute(INDEX)
+        self.prune()
+
+    def add(self, api_key, kind, params, voice_id=None):
+        """登记一个任务，返回任务 id"""
+        now = time.time()
+        with self.lock, self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO jobs (account, kind, state, params, voice_id, created, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (account_of(api_key), kind, JOB_QUEUED, json.dumps(params, ensure_ascii=False), voice_id, now, now))
+            return cur.lastrowid
+
+    def start(self, job_id):
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE jobs SET state = ?, attempts = attempts + 1, updated = ? WHERE id = ?",
+                              (JOB_RUNNING, time.time(), job_id))
+
+    def attach(self, job_id, voice_id):
+        """复刻任务已被服务端受理：记下 voice_id，重启后按它继续轮询"""
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE jobs SET voice_id = ?, updated = ? WHERE id = ?",
+                              (voice_id, time.time(), job_id))
+
+    def finish(self, job_id, state, result=None):
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE jobs SET state = ?, result = ?, updated = ? WHERE id = ?",
+                              (state, result, time.time(), job_id))
+
+    def list(self, api_key, kind=None, states=None):
+        """该账号下的任务（可按类别、状态过滤），按提交顺序；params 已解析为 dict"""
+        sql = "SELECT id, kind, state, params, voice_id, result, attempts FROM jobs WHERE account = ?"
+        args = [account_of(api_key)]
+        if kind is not None:
+            sql += " AND kind = ?"
+            args.append(kind)
+        if states:
+            sql += f" AND state IN ({', '.join('?' * len(states))})"
+            args.extend(states)
+        with self.lock:
+            cur = self.conn.execute(sql + " ORDER BY id", args)
+            return [dict(row, params=json.loads(row["params"])) for row in cur]
+
+    def unfinished(self, api_key):
+        return self.list(api_key, states=UNFINISHED)
+
+    def prune(self, days=KEEP_FINISHED_DAYS):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM jobs WHERE state NOT IN (?, ?) AND updated < ?",
+                              UNFINISHED + (time.time() - days * 86400,))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def synthesis_params(text, output_path, voice_id, model, volume, speech_rate, stream=True,
+                     audio_format=None, workers=LONG_TEXT_WORKERS, postprocess=None):
+    """合成任务的可恢复参数（全部可 JSON 序列化）；postprocess 为 postprocess.postprocess_options 的结果"""
+    return {"text": text, "output_path": output_path, "voice_id": voice_id, "model": model, "volume": volume,
+            "speech_rate": speech_rate, "stream": stream, "audio_format": audio_format, "workers": workers,
+            "postprocess": postprocess}
+
+
+def make_synthesis_job(api_key, params, cache=None, progress=None, cancel=None):
+    """按 synthesis_params 构造合成任务：超长文本走分段合成"""
+    args = (api_key, params["text"], params["output_path"], params["voice_id"], params["model"],
+            params["volume"], params["speech_rate"])
+    kwargs = {"cache": cache, "progress": progress, "cancel": cancel}
+    if params.get("audio_format"):
+        kwargs["audio_format"] = params["audio_format"]
+    if len(params["text"]) > LONG_TEXT_SEGMENT_CHARS:
+        return LongTextSynthesisJob(*args, workers=params.get("workers", LONG_TEXT_WORKERS), **kwargs)
+    return SynthesisJob(*args, stream=params.get("stream", True), **kwargs)
+
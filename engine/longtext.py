@@ -0,0 +1,208 @@
+# ===========================
+# 长文本分段并发合成
+# ===========================
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, CancelledError, wait
+
+from .metrics import get_metrics
+from .pool import get_pool
+from .ratelimit import RetryPolicy
+from .runtime import get_engine
+from .formats import AUDIO_FORMAT, commit_file, format_ext, open_audio_file, request_format
+from .synthesis import SynthesisJob
+
+# 各模型单次请求的文本长度上限（字符）
+MODEL_TEXT_LIMITS = {
+    "cosyvoice-v3.5-plus": 2000,
+    "cosyvoice-v3.5-flash": 2000,
+    "cosyvoice-v3-plus": 2000,
+    "cosyvoice-v3-flash": 2000,
+    "cosyvoice-v2": 2000,
+    "cosyvoice-v1": 2000,
+}
+DEFAULT_TEXT_LIMIT = 2000
+LONG_TEXT_SEGMENT_CHARS = 300  # 分段目标长度：段越短，并发度越高
+LONG_TEXT_WORKERS = 4
+SEGMENT_MAX_RETRY = 3
+SEGMENT_RETRY = RetryPolicy(max_attempts=SEGMENT_MAX_RETRY, base_delay=2.0)
+
+# 句末标点（英文句号需后接空白，避免切开小数）与句内停顿标点
+SENTENCE_SPLIT_RE = re.compile(r'(?<=[。！？!?；;…\n])|(?<=\.)(?=\s)')
+CLAUSE_SPLIT_RE = re.compile(r'(?<=[，,、：:])')
+
+
+def split_text(text, model, segment_chars=LONG_TEXT_SEGMENT_CHARS):
+    """按句子/标点边界切分文本，每段不超过模型的单次字符上限"""
+    limit = min(segment_chars, MODEL_TEXT_LIMITS.get(model, DEFAULT_TEXT_LIMIT))
+
+    pieces = []
+    for sentence in SENTENCE_SPLIT_RE.split(text):
+        if len(sentence) <= limit:
+            pieces.append(sentence)
+            continue
+        # 超长句子退化到逗号等停顿处切分，仍超长则硬切
+        for clause in CLAUSE_SPLIT_RE.split(sentence):
+            while len(clause) > limit:
+                pieces.append(clause[:limit])
+                clause = clause[limit:]
+            pieces.append(clause)
+
+    # 贪心合并相邻片段，尽量贴近目标长度
+    segments = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + len(piece) > limit:
+            segments.append(current)
+            current = ""
+        current += piece
+    if current:
+        segments.append(current)
+    return [seg for seg in (s.strip() for s in segments) if seg]
+
+
+# MPEG 帧头解析表（仅用于定位 Xing/Info 头帧）
+MP3_BITRATES = {
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],  # MPEG1 Layer III
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],      # MPEG2/2.5 Layer III
+}
+MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+def mp3_payload(data):
+    """去掉 ID3 标签和 Xing/Info 头帧，只保留音频帧，便于多段首尾相接"""
+    start, end = 0, len(data)
+    if data[:3] == b'ID3' and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        start = 10 + size
+    if end - start >= 128 and data[end - 128:end - 125] == b'TAG':
+        end -= 128
+
+    # 首帧若是 Xing/Info 头（记录的是单段时长），拼接后会误导播放器，需去掉
+    header = data[start:start + 4]
+    if len(header) == 4 and header[0] == 0xFF and (header[1] & 0xE0) == 0xE0:
+        version_bits = (header[1] >> 3) & 0x03
+        bitrate_index = header[2] >> 4
+        rate_index = (header[2] >> 2) & 0x03
+        padding = (header[2] >> 1) & 0x01
+        if version_bits != 1 and 0 < bitrate_index < 15 and rate_index < 3:
+            bitrate = MP3_BITRATES[1 if version_bits == 3 else 2][bitrate_index] * 1000
+            sample_rate = MP3_SAMPLE_RATES[version_bits][rate_index]
+            coef = 144 if version_bits == 3 else 72
+            frame_len = coef * bitrate // sample_rate + padding
+            first_frame = data[start:start + frame_len]
+            if b'Xing' in first_frame[:64] or b'Info' in first_frame[:64]:
+                start += frame_len
+    return data[start:end]
+
+
+def segment_payload(data, format_name):
+    """分段拼接时每段要写入的数据：MP3 去掉头尾标签；PCM / WAV 为裸 PCM 直接相接；
+    Opus 每段是一个完整的 Ogg 流，首尾相接即为标准的链式 Ogg"""
+    if format_ext(format_name) == "mp3":
+        return mp3_payload(data)
+    return data
+
+
+def synthesize_segment(api_key, text, voice_id, model, volume, speech_rate, audio_format=AUDIO_FORMAT):
+    # 每段从会话池借一个 Synthesizer，并发的分段各用各的连接，段与段之间复用
+    with get_pool().session(api_key, model, voice_id, volume, speech_rate,
+                            request_format(audio_format)) as synthesizer, \
+            get_metrics().track("synth", model, chars=len(text)) as call:
+        audio_data = synthesizer.call(text)
+        if not isinstance(audio_data, bytes) or len(audio_data) == 0:
+            raise ValueError(f"返回了非音频数据 ({type(audio_data)})")
+        call.bytes = len(audio_data)
+    return audio_data
+
+
+class LongTextSynthesisJob(SynthesisJob):
+    # 缓存、进度汇报沿用 SynthesisJob，仅替换 run
+
+    def __init__(self, api_key, text, output_path, voice_id, model, volume, speech_rate,
+                 workers=LONG_TEXT_WORKERS, cache=None, progress=None, audio_format=AUDIO_FORMAT, cancel=None):
+        super().__init__(api_key, text, output_path, voice_id, model, volume, speech_rate, cache=cache,
+                         progress=progress, audio_format=audio_format, cancel=cancel)
+        self.workers = max(1, workers)
+        self.percent = 0
+        self.boundaries = []  # 第 2 段起各分段在音频数据中的起始字节，供后处理按段去静音、交叉淡化
+
+    def run(self):
+        part_path = self.output_path + '.part'
+        try:
+            output_dir = os.path.dirname(self.output_path)
+            if output_dir and not os.path.exists(output_dir):
+                os.makedirs(output_dir)
+
+            if self.serve_from_cache():
+                return True, self.output_path
+
+            segments = split_text(self.text, self.model)
+            total = len(segments)
+            self.progress(5, f"长文本共 {len(self.text)} 字，切分为 {total} 段，并发 {self.workers} 路合成...")
+
+            started = time.time()
+            ready = {}        # 已完成但尚未轮到写入的分段
+            next_index = 0    # 下一个应写入文件的分段序号
+            done_count = 0
+            written = 0
+            self.boundaries = []
+            # 分段作为引擎的 "segment" 任务执行（批量优先级），受引擎的并发上限约束，不挤占交互合成的线程；
+            # 本任务同时在途的分段不超过 self.workers，完成一段再补一段
+            engine = get_engine()
+            queue = list(enumerate(segments))
+            futures = {}
+            with open_audio_file(part_path, self.audio_format) as fp:
+                try:
+                    while queue or futures:
+                        while queue and len(futures) < self.workers:
+                            index, seg = queue.pop(0)
+                            futures[engine.submit("segment", self.synthesize_with_retry, index, seg,
+                                                  cancel=self.cancel)] = index
+                        finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            index = futures.pop(future)
+                            ready[index] = future.result()
+                            done_count += 1
+                            self.percent = 5 + int(done_count / total * 90)
+                            self.progress(self.percent, f"分段 {index + 1}/{total} 完成 (已完成 {done_count}/{total})")
+                        # 按顺序把连续就绪的分段写入文件，写完即释放内存
+                        while next_index in ready:
+                            if next_index:
+                                self.boundaries.append(written)
+                            written += fp.write(segment_payload(ready.pop(next_index), self.audio_format))
+                            next_index += 1
+                except BaseException:
+                    for future in futures:
+                        future.cancel()
+                    raise
+
+            commit_file(part_path, self.output_path)
+            self.store_to_cache()
+            self.progress(100, f"✅ 长文本合成成功 ({total} 段, 耗时 {time.time() - started:.2f} s)")
+            return True, self.output_path
+
+        except (Exception, CancelledError) as e:
+            if self.cancelled():
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+                return self.cancelled_result()
+            if os.path.exists(part_path) and os.path.getsize(part_path) > 0:
+                self.progress(0, f"已保留已按序完成的部分: {part_path}")
+            self.progress(0, "❌ 发生错误")
+            return False, f"执行异常: {str(e)}"
+
+    def synthesize_with_retry(self, index, text):
+        # 失败的分段单独重试，不影响其它分段；各分段共用同一个限流桶
+        def on_retry(attempt, error, delay):
+            self.progress(self.percent, f"分段 {index + 1} 第 {attempt} 次失败: {str(error)}，{delay:.1f} 秒后重试...")
+
+        self.check_cancelled()
+        try:
+            return SEGMENT_RETRY.call(
+                lambda: synthesize_segment(self.api_key, text, self.voice_id, self.model, self.volume,
+                                           self.speech_rate, self.audio_format),
+                self.api_key, "synth", self.model, cancel=self.cancel, on_retry=on_retry)
+        except Exception as e:
+            raise RuntimeError(f"分段 {index + 1} 合成失败: {str(e)}")
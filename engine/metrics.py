@@ -0,0 +1,213 @@
+# ===========================
+# 云端调用指标 (延迟 / 首包 / 大小 / 错误 / 重试)
+# ===========================
+# client.py 与合成任务在每次上游调用外包一层 track()，按 (操作, 模型) 累计直方图；
+# 可导出为 Prometheus textfile（node_exporter textfile collector）或 JSON 快照，
+# 便于对比不同模型版本（如 cosyvoice-v3.5-flash 与 -plus）。
+import os
+import json
+import time
+import threading
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+CPS_BUCKETS = (5, 10, 20, 50, 100, 200, 500)
+NO_MODEL = "-"
+
+
+class Histogram:
+    """固定分桶直方图；桶上界与 Prometheus 一致（le，含上界）"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 最后一个是 +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def quantile(self, q):
+        """按桶内线性插值估算分位数"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else lower
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+    def to_dict(self):
+        return {"buckets": list(self.buckets), "counts": list(self.counts), "sum": self.total, "count": self.count}
+
+
+class CallTimer:
+    """track() 返回的上下文对象；调用方在块内填写 bytes / chars / ttfb / error"""
+
+    def __init__(self, registry, op, model, chars=None):
+        self.registry = registry
+        self.op = op
+        self.model = model or NO_MODEL
+        self.chars = chars
+        self.bytes = None
+        self.ttfb = None
+        self.error = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        self.registry.observe_call(self, elapsed)
+        return False
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = {}   # (op, model) -> Histogram
+        self.ttfb = {}      # (op, model) -> Histogram
+        self.size = {}      # (op, model) -> Histogram
+        self.cps = {}       # (op, model) -> Histogram，每秒合成字数
+        self.errors = {}    # (op, model, 错误类名) -> 次数
+        self.retries = {}   # (op, model) -> 次数
+
+    def track(self, op, model=None, chars=None):
+        return CallTimer(self, op, model, chars)
+
+    @staticmethod
+    def _hist(table, key, buckets):
+        hist = table.get(key)
+        if hist is None:
+            hist = table[key] = Histogram(buckets)
+        return hist
+
+    def observe_call(self, call, elapsed):
+        key = (call.op, call.model)
+        with self.lock:
+            self._hist(self.latency, key, LATENCY_BUCKETS).observe(elapsed)
+            if call.error:
+                error_key = key + (call.error,)
+                self.errors[error_key] = self.errors.get(error_key, 0) + 1
+                return
+            if call.ttfb is not None:
+                self._hist(self.ttfb, key, LATENCY_BUCKETS).observe(call.ttfb)
+            if call.bytes is not None:
+                self._hist(self.size, key, BYTES_BUCKETS).observe(call.bytes)
+            if call.chars and elapsed > 0:
+                self._hist(self.cps, key, CPS_BUCKETS).observe(call.chars / elapsed)
+
+    def observe_duration(self, op, elapsed, model=None):
+        """记录一次不经过 track() 的耗时（如在子进程里测得的后处理各阶段）"""
+        key = (op, model or NO_MODEL)
+        with self.lock:
+            self._hist(self.latency, key, LATENCY_BUCKETS).observe(elapsed)
+
+    def record_retry(self, op, model=None):
+        key = (op, model or NO_MODEL)
+        with self.lock:
+            self.retries[key] = self.retries.get(key, 0) + 1
+
+    def reset(self):
+        with self.lock:
+            for table in (self.latency, self.ttfb, self.size, self.cps, self.errors, self.retries):
+                table.clear()
+
+    # --- 汇总 / 导出 ---
+    def summary(self):
+        """每个 (操作, 模型) 一行，供界面表格 / 命令行打印"""
+        with self.lock:
+            keys = sorted(set(self.latency) | set(self.retries))
+            rows = []
+            for key in keys:
+                latency = self.latency.get(key)
+                ttfb, size, cps = self.ttfb.get(key), self.size.get(key), self.cps.get(key)
+                rows.append({
+                    "op": key[0],
+                    "model": key[1],
+                    "count": latency.count if latency else 0,
+                    "errors": sum(n for k, n in self.errors.items() if k[:2] == key),
+                    "retries": self.retries.get(key, 0),
+                    "p50": latency.quantile(0.5) if latency else None,
+                    "p95": latency.quantile(0.95) if latency else None,
+                    "ttfb_p50": ttfb.quantile(0.5) if ttfb else None,
+                    "avg_bytes": size.mean() if size else None,
+                    "chars_per_sec": cps.mean() if cps else None,
+                })
+            return rows
+
+    def snapshot(self):
+        with self.lock:
+            def dump(table):
+                return [{"op": k[0], "model": k[1], **hist.to_dict()} for k, hist in sorted(table.items())]
+            return {
+                "time": time.time(),
+                "latency_seconds": dump(self.latency),
+                "ttfb_seconds": dump(self.ttfb),
+                "response_bytes": dump(self.size),
+                "chars_per_second": dump(self.cps),
+                "errors": [{"op": k[0], "model": k[1], "error": k[2], "count": n}
+                           for k, n in sorted(self.errors.items())],
+                "retries": [{"op": k[0], "model": k[1], "count": n} for k, n in sorted(self.retries.items())],
+            }
+
+    def to_prometheus(self):
+        lines = []
+        with self.lock:
+            for name, table, help_text in (
+                    ("cosyvoice_request_duration_seconds", self.latency, "上游调用耗时"),
+                    ("cosyvoice_ttfb_seconds", self.ttfb, "流式合成首包耗时"),
+                    ("cosyvoice_response_bytes", self.size, "返回数据大小"),
+                    ("cosyvoice_chars_per_second", self.cps, "每秒合成字数")):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for (op, model), hist in sorted(table.items()):
+                    labels = f'op="{op}",model="{model}"'
+                    cumulative = 0
+                    for bound, n in zip(list(hist.buckets) + ["+Inf"], hist.counts):
+                        cumulative += n
+                        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                    lines.append(f"{name}_sum{{{labels}}} {hist.total}")
+                    lines.append(f"{name}_count{{{labels}}} {hist.count}")
+            lines.append("# HELP cosyvoice_errors_total 上游调用失败次数（按异常类名）")
+            lines.append("# TYPE cosyvoice_errors_total counter")
+            for (op, model, error), n in sorted(self.errors.items()):
+                lines.append(f'cosyvoice_errors_total{{op="{op}",model="{model}",error="{error}"}} {n}')
+            lines.append("# HELP cosyvoice_retries_total 重试次数")
+            lines.append("# TYPE cosyvoice_retries_total counter")
+            for (op, model), n in sorted(self.retries.items()):
+                lines.append(f'cosyvoice_retries_total{{op="{op}",model="{model}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        """按扩展名导出：.prom 为 Prometheus textfile，其余为 JSON 快照；先写临时文件再原子替换"""
+        content = self.to_prometheus() if path.endswith('.prom') else json.dumps(
+            self.snapshot(), ensure_ascii=False, indent=2)
+        output_dir = os.path.dirname(path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+
+_metrics = MetricsRegistry()
+
+
+def get_metrics():
+    return _metrics
@@ -0,0 +1,235 @@
+# ===========================
+# 本地模拟云端 (压测 / 离线调试)
+# ===========================
+# 在进程内模拟 tts_v2 的 SpeechSynthesizer 与 VoiceEnrollmentService：
+# 延迟、分片节奏、错误率、分页、训练耗时均可配置，不消耗真实调用额度。
+# 用法：client.use_backend(MockBackend(latency=0.2, error_rate=0.01))
+import time
+import random
+import itertools
+import threading
+from collections import deque
+from functools import partial
+
+from .ratelimit import OP_ENDPOINTS
+
+
+class MockError(Exception):
+    """模拟 SDK 抛出的异常，带 status_code 以便重试逻辑区分可重试错误"""
+
+    def __init__(self, status_code, message):
+        super().__init__(f"[{status_code}] {message}")
+        self.status_code = status_code
+
+
+class MockAudioFormat:
+    # 只需支持按成员名取值
+    def __getattr__(self, name):
+        return name
+
+
+class MockSynthesizer:
+
+    def __init__(self, backend, model, voice, format=None, volume=50, speech_rate=1.0, callback=None, **kwargs):
+        self.backend = backend
+        self.model = model
+        self.callback = callback
+        self.text = ""
+        self.connected = False
+        self.cancelled = False
+        self._close_ws_after_use = True
+
+    def connect(self):
+        # 首次使用时模拟建连 / 握手
+        if not self.connected:
+            self.backend.sleep(self.backend.connect_latency)
+            self.connected = True
+
+    def finish(self):
+        if self._close_ws_after_use:
+            self.connected = False
+
+    # 与 SDK 同名的私有方法，供会话池复用连接
+    def _SpeechSynthesizer__is_connected(self):
+        return self.connected
+
+    def _SpeechSynthesizer__reset(self):
+        self.text = ""
+        self.cancelled = False
+
+    def _SpeechSynthesizer__update_params(self, model, voice, format=None, volume=50, speech_rate=1.0, *args,
+                                          callback=None, close_ws_after_use=True, **kwargs):
+        self.model = model
+        self.callback = callback
+        self._close_ws_after_use = close_ws_after_use
+
+    def call(self, text):
+        backend = self.backend
+        backend.admit("synth")
+        self.connect()
+        backend.sleep(backend.latency)
+        backend.maybe_fail("synth")
+        time.sleep(backend.chunk_interval * backend.chunks)
+        self.finish()
+        return backend.audio(text)
+
+    def streaming_call(self, text):
+        self.text += text
+
+    def streaming_complete(self, complete_timeout_millis=600000):
+        backend = self.backend
+        try:
+            backend.admit("synth")
+            self.connect()
+            backend.sleep(backend.latency)
+            backend.maybe_fail("synth")
+        except MockError as e:
+            self.finish()
+            self.callback.on_error(str(e))
+            return
+        data = backend.audio(self.text)
+        size = max(1, len(data) // backend.chunks)
+        for i in range(0, len(data), size):
+            if self.cancelled:
+                # 与 SDK 相同：中止后连接关闭，不再回调 on_complete
+                self.connected = False
+                return
+            self.callback.on_data(data[i:i + size])
+            time.sleep(backend.chunk_interval)
+        self.finish()
+        self.callback.on_complete()
+
+    def streaming_cancel(self, *args, **kwargs):
+        self.cancelled = True
+
+    def close(self):
+        self.connected = False
+
+
+class MockEnrollmentService:
+
+    def __init__(self, backend, api_key=None):
+        self.backend = backend
+
+    def list_voices(self, page_index=0, page_size=10, prefix=None):
+        backend = self.backend
+        backend.admit("list_voices")
+        backend.sleep(backend.api_latency)
+        backend.maybe_fail("list_voices")
+        with backend.lock:
+            voices = list(backend.voices.values())
+        return [dict(v) for v in voices[page_index * page_size:(page_index + 1) * page_size]]
+
+    def create_voice(self, target_model, prefix, url, language_hints=None, **kwargs):
+        backend = self.backend
+        backend.admit("create_voice")
+        backend.sleep(backend.api_latency)
+        backend.maybe_fail("create_voice")
+        return backend.add_voice(target_model, prefix, status="RUNNING")
+
+    def query_voice(self, voice_id):
+        backend = self.backend
+        backend.admit("query_voice")
+        backend.sleep(backend.api_latency)
+        backend.maybe_fail("query_voice")
+        with backend.lock:
+            voice = backend.voices.get(voice_id)
+            if voice is None:
+                raise MockError(404, f"voice {voice_id} not found")
+            # 训练按查询次数推进：RUNNING -> DEPLOYING -> OK
+            voice['polls'] = voice.get('polls', 0) + 1
+            if voice['status'] == "RUNNING" and voice['polls'] >= backend.enroll_polls:
+                voice['status'] = "DEPLOYING"
+            elif voice['status'] == "DEPLOYING":
+                voice['status'] = "OK"
+            return {'voice_id': voice_id, 'status': voice['status'], 'target_model': voice['target_model']}
+
+    def delete_voice(self, voice_id):
+        backend = self.backend
+        backend.admit("delete_voice")
+        backend.sleep(backend.api_latency)
+        backend.maybe_fail("delete_voice")
+        with backend.lock:
+            backend.voices.pop(voice_id, None)
+
+
+class MockBackend:
+    """connect_latency: 新连接的建连 / 握手耗时；latency: 合成首包前的等待；chunks / chunk_interval: 分片数与间隔；
+    api_latency: 音色管理接口延迟；jitter: 延迟随机浮动比例；error_rate: 每次调用失败的概率（503）；
+    enroll_polls: 训练完成前需要的查询次数；server_qps: 服务端每类接口每秒受理的请求数，超出返回 429（0 为不限）"""
+
+    def __init__(self, connect_latency=0.15, latency=0.2, chunks=10, chunk_interval=0.02, chunk_bytes=4096,
+                 api_latency=0.05, jitter=0.2, error_rate=0.0, voices=0, enroll_polls=2,
+                 server_qps=0, seed=None):
+        self.connect_latency = connect_latency
+        self.latency = latency
+        self.chunks = max(1, chunks)
+        self.chunk_interval = chunk_interval
+        self.chunk_bytes = chunk_bytes
+        self.api_latency = api_latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.enroll_polls = enroll_polls
+        self.server_qps = server_qps
+        self.windows = {}  # 接口类别 -> 最近 1 秒内受理请求的时间
+        self.throttled = 0
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.voices = {}  # voice_id -> dict，按插入顺序分页
+        self.seq = itertools.count()
+        self.calls = 0
+        for i in range(voices):
+            self.add_voice("cosyvoice-v3.5-flash", f"bench{i}", status="OK")
+
+        # 与 tts_v2 模块同名的属性，供 client.tts() 使用
+        self.SpeechSynthesizer = partial(MockSynthesizer, self)
+        self.VoiceEnrollmentService = partial(MockEnrollmentService, self)
+        self.AudioFormat = MockAudioFormat()
+
+    def set_api_key(self, api_key):
+        pass
+
+    def sleep(self, seconds):
+        with self.lock:
+            self.calls += 1
+            factor = self.random.uniform(1 - self.jitter, 1 + self.jitter)
+        time.sleep(max(0.0, seconds * factor))
+
+    def over_quota(self, op):
+        # 滑动窗口：最近 1 秒内已受理 server_qps 个请求则拒绝（调用方需持有 self.lock）
+        window = self.windows.setdefault(OP_ENDPOINTS.get(op, op), deque())
+        now = time.monotonic()
+        while window and window[0] <= now - 1.0:
+            window.popleft()
+        if len(window) >= self.server_qps:
+            self.throttled += 1
+            return True
+        window.append(now)
+        return False
+
+    def admit(self, op):
+        """请求到达服务端时按 server_qps 计数，超出返回 429"""
+        if self.server_qps <= 0:
+            return
+        with self.lock:
+            throttled = self.over_quota(op)
+        if throttled:
+            raise MockError(429, f"Throttling.RateQuota: mock {op} exceeded {self.server_qps} QPS")
+
+    def maybe_fail(self, op):
+        with self.lock:
+            failed = self.random.random() < self.error_rate
+        if failed:
+            raise MockError(503, f"mock {op} unavailable")
+
+    def audio(self, text):
+        # 不是有效 MP3，只模拟大小（与文本长度大致成正比）
+        size = max(self.chunk_bytes, len(text) * 1000)
+        return (b"\xff\xf3" + text.encode('utf-8'))[:size].ljust(size, b"\0")
+
+    def add_voice(self, model, prefix, status="OK"):
+        with self.lock:
+            voice_id = f"{model}-{prefix}-{next(self.seq):06d}"
+            self.voices[voice_id] = {'voice_id': voice_id, 'status': status, 'target_model': model,
+                                     'gmt_create': time.strftime('%Y-%m-%d %H:%M:%S')}
+        return voice_id
@@ -0,0 +1,192 @@
+# ===========================
+# 边合成边播放 (试听)
+# ===========================
+# SDK 回调线程把 PCM 分片 feed() 进抖动缓冲，播放线程攒够 prebuffer_ms 后开始写入 sink；
+# 中途缓冲被取空（网络抖动）时暂停写入，重新攒够再继续，避免断断续续。
+# sink 可替换：界面用声卡输出（audio_output.py），无界面 / 压测用 NullSink 或 FileSink。
+import os
+import time
+import tempfile
+import threading
+from collections import deque
+
+from .formats import WavStreamWriter
+from .synthesis import SynthesisJob
+
+PREVIEW_SAMPLE_RATE = 24000
+PREBUFFER_MS = 300
+PREVIEW_DIR = os.path.join(tempfile.gettempdir(), "cosyvoice_preview")
+SAMPLE_WIDTH = 2  # 16bit 单声道
+
+
+class NullSink:
+    """丢弃音频；realtime=True 时按实际时长阻塞，模拟声卡的消耗速度"""
+
+    def __init__(self, realtime=False):
+        self.realtime = realtime
+        self.bytes_per_sec = 0
+        self.bytes_written = 0
+
+    def open(self, sample_rate, channels=1, sample_width=SAMPLE_WIDTH):
+        self.bytes_per_sec = sample_rate * channels * sample_width
+
+    def write(self, data):
+        self.bytes_written += len(data)
+        if self.realtime and self.bytes_per_sec:
+            time.sleep(len(data) / self.bytes_per_sec)
+
+    def close(self):
+        pass
+
+
+class FileSink:
+    """把“播放”的内容写成 WAV 文件，用于无界面测试时核对实际播出的音频"""
+
+    def __init__(self, path):
+        self.path = path
+        self.writer = None
+
+    def open(self, sample_rate, channels=1, sample_width=SAMPLE_WIDTH):
+        self.writer = WavStreamWriter(open(self.path, 'wb'), sample_rate)
+
+    def write(self, data):
+        self.writer.write(data)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class StreamPlayer:
+    """抖动缓冲 + 播放线程；sink 需提供 open(sample_rate) / write(data) / close()，可选 stop()
+
+    on_started(time_to_audio) 在第一段音频写入 sink 时回调（秒，自 start() 起算）；
+    on_finished(player) 在播放线程结束（播完或被 stop）时回调。两者都在播放线程中调用。
+    """
+
+    def __init__(self, sink, prebuffer_ms=PREBUFFER_MS, on_started=None, on_finished=None):
+        self.sink = sink
+        self.prebuffer_ms = prebuffer_ms
+        self.on_started = on_started
+        self.on_finished = on_finished
+        self.cond = threading.Condition()
+        self.chunks = deque()
+        self.buffered = 0
+        self.eof = False
+        self.stopped = False
+        self.sample_rate = PREVIEW_SAMPLE_RATE
+        self.started_at = None
+        self.time_to_audio = None
+        self.underruns = 0
+        self.bytes_played = 0
+        self.thread = None
+
+    @property
+    def prebuffer_bytes(self):
+        return int(self.sample_rate * SAMPLE_WIDTH * self.prebuffer_ms / 1000)
+
+    def start(self, sample_rate=PREVIEW_SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.started_at = time.perf_counter()
+        self.thread = threading.Thread(target=self._play, name="preview-player", daemon=True)
+        self.thread.start()
+
+    def feed(self, data):
+        if not data:
+            return
+        with self.cond:
+            self.chunks.append(data)
+            self.buffered += len(data)
+            self.cond.notify()
+
+    def finish(self):
+        """数据已全部送达；缓冲中剩余的音频照常播完"""
+        with self.cond:
+            self.eof = True
+            self.cond.notify()
+
+    def stop(self):
+        """立即停止播放，丢弃缓冲"""
+        with self.cond:
+            self.stopped = True
+            self.chunks.clear()
+            self.buffered = 0
+            self.cond.notify()
+        stop_sink = getattr(self.sink, 'stop', None)
+        if stop_sink:
+            stop_sink()
+
+    def wait(self, timeout=None):
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def stats(self):
+        return {"time_to_audio": self.time_to_audio, "underruns": self.underruns, "bytes_played": self.bytes_played}
+
+    def _next_chunk(self, rebuffer):
+        # 缓冲不足时等待；rebuffer 为 True 表示需要重新攒够预缓冲量
+        with self.cond:
+            while not self.stopped:
+                if self.chunks and (not rebuffer or self.eof or self.buffered >= self.prebuffer_bytes):
+                    data = self.chunks.popleft()
+                    self.buffered -= len(data)
+                    return data
+                if self.eof and not self.chunks:
+                    return None
+                self.cond.wait()
+            return None
+
+    def _play(self):
+        self.sink.open(self.sample_rate)
+        try:
+            rebuffer = True
+            while True:
+                data = self._next_chunk(rebuffer)
+                if data is None:
+                    break
+                if self.time_to_audio is None:
+                    self.time_to_audio = time.perf_counter() - self.started_at
+                    if self.on_started:
+                        self.on_started(self.time_to_audio)
+                self.sink.write(data)
+                self.bytes_played += len(data)
+                with self.cond:
+                    rebuffer = not self.chunks and not self.eof
+                if rebuffer and not self.stopped:
+                    self.underruns += 1
+        finally:
+            self.sink.close()
+            if self.on_finished:
+                self.on_finished(self)
+
+
+class PreviewJob(SynthesisJob):
+    """试听：流式合成 PCM，分片边到边送入 StreamPlayer；同时写一份 WAV 到临时目录，便于重复播放"""
+
+    def __init__(self, api_key, text, voice_id, model, volume, speech_rate, player,
+                 sample_rate=PREVIEW_SAMPLE_RATE, cache=None, progress=None, output_path=None, cancel=None):
+        if output_path is None:
+            os.makedirs(PREVIEW_DIR, exist_ok=True)
+            output_path = os.path.join(PREVIEW_DIR, f"preview_{os.getpid()}.wav")
+        super().__init__(api_key, text, output_path, voice_id, model, volume, speech_rate, stream=True,
+                         cache=cache, progress=progress, audio_format=f"WAV_{sample_rate}HZ_MONO_16BIT", cancel=cancel)
+        self.player = player
+        self.sample_rate = sample_rate
+        self.tee = player.feed
+
+    def run(self):
+        self.player.start(self.sample_rate)
+        try:
+            return super().run()
+        finally:
+            self.player.finish()
+
+    def serve_from_cache(self):
+        if not super().serve_from_cache():
+            return False
+        # 命中缓存：直接把缓存的 WAV（跳过 44 字节文件头）送入播放器
+        with open(self.output_path, 'rb') as f:
+            f.seek(44)
+            for data in iter(lambda: f.read(self.sample_rate // 10 * SAMPLE_WIDTH), b''):
+                self.player.feed(data)
+        return True
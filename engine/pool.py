@@ -0,0 +1,154 @@
+# ===========================
+# Synthesizer 会话池
+# ===========================
+# 按 (api_key, 模型, 音色, 格式) 缓存已建立 websocket 连接的 SpeechSynthesizer，
+# 下一次合成直接复用，省掉建连 / 握手；连接断开的不再复用，空闲超时的由后台线程关闭。
+import time
+import threading
+from contextlib import contextmanager
+
+from . import client
+
+POOL_IDLE_TIMEOUT = 30.0    # 秒；服务端会断开长时间空闲的连接，留一些余量
+POOL_MAX_IDLE_PER_KEY = 4
+POOL_REAP_INTERVAL = 5.0
+
+
+class SynthesizerPool:
+
+    def __init__(self, idle_timeout=POOL_IDLE_TIMEOUT, max_idle_per_key=POOL_MAX_IDLE_PER_KEY):
+        self.idle_timeout = idle_timeout
+        self.max_idle_per_key = max_idle_per_key
+        self.lock = threading.Lock()
+        self.idle = {}      # key -> [(归还时间, synthesizer)]，越靠后越新
+        self.borrowed = {}  # id(synthesizer) -> key
+        self.created = 0
+        self.reused = 0
+        self._reaper = None
+        self._stop = threading.Event()
+
+    @staticmethod
+    def make_key(api_key, model, voice_id, format_name):
+        return (api_key, model, voice_id, format_name)
+
+    def acquire(self, api_key, model, voice_id, volume, speech_rate, format_name, callback=None):
+        key = self.make_key(api_key, model, voice_id, format_name)
+        synthesizer = None
+        while True:
+            with self.lock:
+                sessions = self.idle.get(key)
+                if not sessions:
+                    break
+                _, candidate = sessions.pop()
+            # 健康检查：连接已断开的直接丢弃
+            if self._healthy(candidate):
+                synthesizer = candidate
+                break
+            self._close(candidate)
+
+        if synthesizer is not None:
+            client.reset_synthesizer(synthesizer, api_key, model, voice_id, volume, speech_rate, format_name,
+                                     callback=callback)
+            with self.lock:
+                self.reused += 1
+        else:
+            synthesizer = client.new_synthesizer(api_key, model, voice_id, volume, speech_rate, format_name,
+                                                 callback=callback)
+            if client.supports_reuse(synthesizer):
+                client.keep_connection(synthesizer)
+            with self.lock:
+                self.created += 1
+        with self.lock:
+            self.borrowed[id(synthesizer)] = key
+        return synthesizer
+
+    def release(self, synthesizer):
+        with self.lock:
+            key = self.borrowed.pop(id(synthesizer), None)
+            if key is not None and self.max_idle_per_key > 0 and client.supports_reuse(synthesizer):
+                sessions = self.idle.setdefault(key, [])
+                if len(sessions) < self.max_idle_per_key:
+                    sessions.append((time.time(), synthesizer))
+                    self._start_reaper()
+                    return
+        if key is not None:
+            self._close(synthesizer)
+
+    def discard(self, synthesizer):
+        """任务出错的会话不再复用"""
+        with self.lock:
+            known = self.borrowed.pop(id(synthesizer), None) is not None
+        if known:
+            self._close(synthesizer)
+
+    @contextmanager
+    def session(self, api_key, model, voice_id, volume, speech_rate, format_name, callback=None):
+        synthesizer = self.acquire(api_key, model, voice_id, volume, speech_rate, format_name, callback=callback)
+        try:
+            yield synthesizer
+        except BaseException:
+            self.discard(synthesizer)
+            raise
+        self.release(synthesizer)
+
+    def stats(self):
+        with self.lock:
+            idle = sum(len(sessions) for sessions in self.idle.values())
+            return f"会话池: 新建 {self.created}，复用 {self.reused}，空闲 {idle}"
+
+    def close_idle(self, older_than=0.0):
+        """关闭空闲超过 older_than 秒的会话，返回关闭数量"""
+        deadline = time.time() - older_than
+        expired = []
+        with self.lock:
+            for key in list(self.idle):
+                sessions = self.idle[key]
+                keep = [(t, s) for t, s in sessions if t > deadline]
+                expired.extend(s for t, s in sessions if t <= deadline)
+                if keep:
+                    self.idle[key] = keep
+                else:
+                    del self.idle[key]
+        for synthesizer in expired:
+            self._close(synthesizer)
+        return len(expired)
+
+    def shutdown(self):
+        self._stop.set()
+        self.close_idle()
+
+    def _start_reaper(self):
+        # 调用方需持有 self.lock
+        if self._reaper is None:
+            self._reaper = threading.Thread(target=self._reap, name="synthesizer-pool-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reap(self):
+        while not self._stop.wait(POOL_REAP_INTERVAL):
+            self.close_idle(self.idle_timeout)
+
+    @staticmethod
+    def _healthy(synthesizer):
+        try:
+            return client.is_connected(synthesizer)
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close(synthesizer):
+        try:
+            synthesizer.close()
+        except Exception:
+            pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SynthesizerPool()
+        return _pool
@@ -0,0 +1,259 @@
+# ===========================
+# 音频后处理 (去静音 / 响度归一 / 淡入淡出 / 分段交叉淡化)
+# ===========================
+# 合成结果写出后可选的一道工序，直接在 PCM 上用 NumPy 向量化处理，不再逐个文件解码、重新编码：
+#   1. 去掉首尾静音（按 10 ms 一帧算 RMS，低于阈值的帧视为静音，两端各保留一小段）
+#   2. 长文本分段合成时，每段分别去掉首尾静音，段与段之间交叉淡化拼接，不再是生硬的静音间隔
+#   3. 峰值或 RMS 响度归一（RMS 归一后仍不超过满幅）
+#   4. 首尾短淡入淡出，避免裁切处的爆音
+# 只处理 WAV / PCM（16bit 单声道）；MP3 / Opus 需要解码器，不在这里处理，需要时改用 WAV 输出。
+# 重采样不做：服务端本身就能输出 8k ~ 48k 各档采样率，直接选对应的输出格式即可。
+# 处理放在独立的进程池里（spawn），CPU 密集的计算不占合成线程，也不受 GIL 影响；
+# 结果先写临时文件再原子替换原文件，每个阶段的耗时记入 metrics（op 为 post.<阶段>）。
+# NumPy 是可选依赖，只在子进程里导入；未安装时界面上的后处理选项不可用。
+import os
+import time
+import threading
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor
+
+from .formats import OUTPUT_FORMATS, PCM_SAMPLE_WIDTH, commit_file, format_ext, wav_header
+from .metrics import get_metrics
+
+POSTPROCESS_WORKERS = max(1, min(4, (os.cpu_count() or 2) // 2))
+SUPPORTED_EXTS = ("wav", "pcm")
+FRAME_MS = 10              # 判断静音的帧长
+SILENCE_DB = -45.0         # 帧 RMS 低于满幅的这么多 dB 视为静音
+KEEP_SILENCE_MS = 120      # 去静音后两端保留的长度
+PEAK_TARGET_DB = -1.0
+RMS_TARGET_DB = -20.0
+FADE_MS = 8
+CROSSFADE_MS = 30
+NORMALIZE_MODES = ("peak", "rms")
+FULL_SCALE = 32767.0
+WAV_HEADER_BYTES = 44      # 本工具写出的 WAV 都是标准 44 字节文件头（见 formats.WavStreamWriter）
+
+
+def numpy_available():
+    return importlib.util.find_spec("numpy") is not None
+
+
+def can_postprocess(format_name):
+    return format_ext(format_name) in SUPPORTED_EXTS
+
+
+def postprocess_options(trim=True, normalize="peak", target_db=None, silence_db=SILENCE_DB,
+                        keep_ms=KEEP_SILENCE_MS, fade_ms=FADE_MS, crossfade_ms=CROSSFADE_MS):
+    """后处理参数（可 JSON 序列化，随合成任务一起持久化）；normalize 为 None 时不做响度归一"""
+    if normalize is not None and normalize not in NORMALIZE_MODES:
+        raise ValueError(f"不支持的归一方式: {normalize}（可选 {', '.join(NORMALIZE_MODES)}）")
+    if target_db is None and normalize is not None:
+        target_db = PEAK_TARGET_DB if normalize == "peak" else RMS_TARGET_DB
+    return {"trim": trim, "normalize": normalize, "target_db": target_db, "silence_db": silence_db,
+            "keep_ms": keep_ms, "fade_ms": fade_ms, "crossfade_ms": crossfade_ms}
+
+
+# --- 以下在子进程中执行 ---
+def _samples(ms, sample_rate):
+    return int(sample_rate * ms / 1000)
+
+
+def trim_silence(np, x, sample_rate, silence_db, keep_ms):
+    """返回去掉首尾静音后的切片；整段都低于阈值时原样返回"""
+    frame = max(1, _samples(FRAME_MS, sample_rate))
+    count = len(x) // frame
+    if count == 0:
+        return x
+    frames = x[:count * frame].reshape(count, frame)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    loud = np.flatnonzero(rms > FULL_SCALE * 10 ** (silence_db / 20))
+    if loud.size == 0:
+        return x
+    keep = _samples(keep_ms, sample_rate)
+    return x[max(0, loud[0] * frame - keep):min(len(x), (loud[-1] + 1) * frame + keep)]
+
+
+def crossfade_join(np, pieces, sample_rate, crossfade_ms):
+    """相邻两段重叠 crossfade_ms 相加；两段互不相关，用等功率曲线，重叠处响度不塌陷"""
+    pieces = [p for p in pieces if len(p)]
+    if not pieces:
+        return np.zeros(0, dtype=np.float32)
+    overlap = _samples(crossfade_ms, sample_rate)
+    out = [pieces[0]]
+    for piece in pieces[1:]:
+        tail = out.pop()
+        n = min(overlap, len(tail), len(piece))
+        if n == 0:
+            out.extend((tail, piece))
+            continue
+        ramp = np.linspace(0.0, 1.0, n, dtype=np.float32)
+        mixed = tail[-n:] * np.sqrt(1.0 - ramp) + piece[:n] * np.sqrt(ramp)
+        out.extend((tail[:-n], mixed, piece[n:]))
+    return np.concatenate(out)
+
+
+def normalize(np, x, mode, target_db):
+    """返回 (归一后的数据, 增益 dB)"""
+    if not len(x):
+        return x, 0.0
+    peak = float(np.max(np.abs(x)))
+    if peak == 0:
+        return x, 0.0
+    target = FULL_SCALE * 10 ** (target_db / 20)
+    if mode == "peak":
+        gain = target / peak
+    else:
+        gain = min(target / float(np.sqrt(np.mean(x * x))), FULL_SCALE / peak)
+    return x * np.float32(gain), 20 * float(np.log10(gain))
+
+
+def apply_fades(np, x, sample_rate, fade_ms):
+    n = min(_samples(fade_ms, sample_rate), len(x) // 2)
+    if n > 0:
+        ramp = np.linspace(0.0, 1.0, n, dtype=np.float32)
+        x[:n] *= ramp
+        x[-n:] *= ramp[::-1]
+    return x
+
+
+def process_file(path, format_name, options, boundaries=None):
+    """就地处理一个 WAV / PCM 文件，返回统计与各阶段耗时
+
+    boundaries 为长文本第 2 段起各分段在 PCM 数据中的起始字节，按它切开后逐段去静音再交叉淡化拼接。
+    """
+    import numpy as np
+    timings = {}
+    started = last = time.perf_counter()
+
+    def lap(stage):
+        nonlocal last
+        now = time.perf_counter()
+        timings[stage] = timings.get(stage, 0.0) + now - last
+        last = now
+
+    sample_rate = OUTPUT_FORMATS[format_name][1]
+    is_wav = format_ext(format_name) == "wav"
+    bytes_before = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        data = f.read()
+    if is_wav:
+        data = data[WAV_HEADER_BYTES:]
+    data = data[:len(data) - len(data) % PCM_SAMPLE_WIDTH]
+    x = np.frombuffer(data, dtype='<i2').astype(np.float32)
+    original = len(x)
+    lap("decode")
+
+    if options.get("trim"):
+        cuts = sorted({b // PCM_SAMPLE_WIDTH for b in boundaries or () if 0 < b // PCM_SAMPLE_WIDTH < len(x)})
+        pieces = np.split(x, cuts) if cuts else [x]
+        pieces = [trim_silence(np, p, sample_rate, options["silence_db"], options["keep_ms"]) for p in pieces]
+        lap("trim")
+        if len(pieces) > 1:
+            x = crossfade_join(np, pieces, sample_rate, options["crossfade_ms"])
+            lap("join")
+        else:
+            x = pieces[0]
+    segments = len(pieces) if options.get("trim") else 1
+
+    gain_db = 0.0
+    if options.get("normalize"):
+        x, gain_db = normalize(np, x, options["normalize"], options["target_db"])
+        lap("normalize")
+    if options.get("fade_ms"):
+        x = apply_fades(np, x, sample_rate, options["fade_ms"])
+        lap("fade")
+
+    pcm = np.clip(np.rint(x), -32768, 32767).astype('<i2').tobytes()
+    tmp_path = path + '.post'
+    with open(tmp_path, 'wb') as f:
+        if is_wav:
+            f.write(wav_header(sample_rate, len(pcm)))
+        f.write(pcm)
+        if is_wav and len(pcm) & 1:
+            f.write(b'\0')
+    commit_file(tmp_path, path)
+    lap("encode")
+    timings["total"] = time.perf_counter() - started
+    return {
+        "bytes_before": bytes_before,
+        "bytes_after": os.path.getsize(path),
+        "trimmed_sec": (original - len(x)) / sample_rate,
+        "duration_sec": len(x) / sample_rate,
+        "segments": segments,
+        "gain_db": gain_db,
+        "timings": timings,
+    }
+
+
+# --- 主进程 ---
+def describe_postprocess(stats):
+    """一行摘要，供日志 / 命令行输出"""
+    text = (f"去掉静音 {stats['trimmed_sec']:.2f} s，文件 {stats['bytes_before'] / 1024:.1f} KB -> "
+            f"{stats['bytes_after'] / 1024:.1f} KB")
+    if stats["gain_db"]:
+        text += f"，增益 {stats['gain_db']:+.1f} dB"
+    if stats["segments"] > 1:
+        text += f"，{stats['segments']} 段交叉淡化拼接"
+    return text + f"，耗时 {stats['timings']['total'] * 1000:.0f} ms"
+
+
+class PostProcessor:
+
+    def __init__(self, workers=POSTPROCESS_WORKERS):
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.executor = None
+
+    def pool(self):
+        # 第一次使用时才启动进程；spawn 不复制父进程里的线程和 Qt 状态
+        with self.lock:
+            if self.executor is None:
+                import multiprocessing
+                self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                    mp_context=multiprocessing.get_context("spawn"))
+            return self.executor
+
+    def submit(self, path, format_name, options, boundaries=None, on_done=None):
+        """提交一个文件的后处理，返回 Future（结果为 process_file 的统计）；
+        on_done(stats, error) 在完成时回调（进程池的管理线程中），成功时 error 为 None"""
+        if not can_postprocess(format_name):
+            raise ValueError(f"后处理只支持 WAV / PCM 输出，当前格式为 {format_name}")
+        if not numpy_available():
+            raise RuntimeError("后处理需要 NumPy：pip install numpy")
+        future = self.pool().submit(process_file, path, format_name, options, list(boundaries or ()))
+        future.add_done_callback(lambda f: self._done(f, on_done))
+        return future
+
+    def run(self, path, format_name, options, boundaries=None):
+        """阻塞版本，返回统计"""
+        return self.submit(path, format_name, options, boundaries).result()
+
+    @staticmethod
+    def _done(future, on_done):
+        try:
+            stats, error = future.result(), None
+        except BaseException as e:
+            stats, error = None, e
+        if stats is not None:
+            for stage, seconds in stats["timings"].items():
+                get_metrics().observe_duration(f"post.{stage}", seconds)
+        if on_done is not None:
+            on_done(stats, error)
+
+    def shutdown(self):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+_postprocessor = None
+_postprocessor_lock = threading.Lock()
+
+
+def get_postprocessor():
+    global _postprocessor
+    with _postprocessor_lock:
+        if _postprocessor is None:
+            _postprocessor = PostProcessor()
+        return _postprocessor
@@ -0,0 +1,342 @@
+# ===========================
+# 性能剖析 (可选开启)
+# ===========================
+# python main.py --profile [目录] [--stall-ms 200]   (界面与 synth / enroll / bench 子命令都适用)
+# 开启后：
+#   1. 引擎任务（合成 / 列表 / 删除 / 复刻轮询…）、命令行批量合成的每一行、界面槽函数都在 cProfile 下执行，
+#      按操作名汇总；同时用 tracemalloc 跟踪内存，退出时按分配时的调用栈把仍占用的内存归到各操作名下。
+#   2. 界面主线程与引擎事件循环定时打心跳，看门狗线程发现心跳停顿超过阈值即记为卡顿，
+#      并抓取被卡线程当时的调用栈（卡在哪一行）写入事件日志。
+#   3. 退出时把结果写到目录：summary.txt、每个操作的 .prof（可用 snakeviz / pstats 打开）与 .txt 热点表、
+#      .alloc.txt 分配排行、allocations.txt 全局内存排行、stalls.jsonl 卡顿记录。
+# 未开启时 get_profiler() 返回 None，各处包装直接跳过，没有额外开销。
+import io
+import os
+import re
+import sys
+import json
+import time
+import atexit
+import inspect
+import pstats
+import linecache
+import cProfile
+import functools
+import threading
+import traceback
+import tracemalloc
+from collections import Counter, defaultdict
+
+from .eventlog import log_event
+
+PROFILE_DIR = os.path.join(os.path.expanduser("~"), ".cosyvoice_tool", "profiles")
+STALL_MS = 200         # 心跳停顿超过这么久记为卡顿
+PROFILE_TOP = 40       # 热点表 / 分配排行的行数
+TRACE_FRAMES = 25      # tracemalloc 记录的调用栈深度，要足够深才能从分配处回溯到所属操作的入口函数
+IGNORED_FILES = {__file__, tracemalloc.__file__, pstats.__file__, cProfile.__file__, traceback.__file__,
+                 linecache.__file__}
+
+
+def _safe_name(op):
+    return re.sub(r"[^\w.-]+", "_", op)[:120]
+
+
+def _own_allocation(frame):
+    # 剖析工具自身（cProfile 统计、快照、抓栈）与导入机制的分配不计入排行
+    return frame.filename in IGNORED_FILES or frame.filename.startswith("<frozen importlib")
+
+
+def _code_span(func):
+    """func 的源码位置 (文件, 起始行, 结束行)，用于把内存分配归到操作；取不到时返回 None"""
+    func = inspect.unwrap(getattr(func, "__func__", func))
+    code = getattr(func, "__code__", None)
+    if code is None:
+        return None
+    lines = [line for _, _, line in code.co_lines() if line]
+    return code.co_filename, code.co_firstlineno, max(lines, default=code.co_firstlineno)
+
+
+def _arity(func):
+    """func 最多接受的位置参数个数；带 *args 时返回 None"""
+    try:
+        params = inspect.signature(func).parameters.values()
+    except (TypeError, ValueError):
+        return None
+    if any(p.kind == p.VAR_POSITIONAL for p in params):
+        return None
+    return sum(1 for p in params if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD))
+
+
+class Watch:
+    """一个被监视的线程：该线程定时调用 beat()"""
+
+    def __init__(self, name, thread_id):
+        self.name = name
+        self.thread_id = thread_id
+        self.last_beat = time.perf_counter()
+        self.stall = None  # 进行中的卡顿记录
+
+    def beat(self):
+        self.last_beat = time.perf_counter()
+
+
+class Profiler:
+
+    def __init__(self, out_dir, stall_ms=STALL_MS, memory=True):
+        self.out_dir = out_dir
+        self.stall_ms = stall_ms
+        self.memory = memory
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.calls = Counter()            # op -> 调用次数
+        self.profiled = Counter()         # op -> 实际在 cProfile 下执行的次数
+        self.wall = defaultdict(float)    # op -> 累计耗时（秒）
+        self.worst = defaultdict(float)   # op -> 单次最长耗时
+        self.stats = {}                   # op -> pstats.Stats
+        self.spans = defaultdict(set)     # 文件 -> {(起始行, 结束行, op)}，操作入口函数的源码位置
+        self.stalls = []
+        self.watches = []
+        self.watchdog = None
+        self.tracing = False
+        self.closing = False
+
+    def start_tracing(self):
+        # 第一次剖析调用时才开始跟踪内存：启动阶段导入模块产生的几万个内存块不进快照
+        with self.lock:
+            if not self.tracing:
+                tracemalloc.start(TRACE_FRAMES)
+                self.tracing = True
+
+    # --- 调用剖析 ---
+    def wrap(self, op, func, trim_args=False):
+        """返回在剖析下执行 func 的版本；trim_args=True 时丢弃多余的位置参数（Qt 信号会多传 checked 等参数）"""
+        arity = _arity(func) if trim_args else None
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if arity is not None:
+                args = args[:arity]
+            return self.call(op, func, *args, **kwargs)
+        wrapper.profiled_op = op
+        return wrapper
+
+    def call(self, op, func, *args, **kwargs):
+        if self.memory and not self.tracing:
+            self.start_tracing()
+        with self.lock:
+            first = self.calls[op] == 0
+            self.calls[op] += 1
+        if first:
+            span = _code_span(func)
+            if span is not None:
+                with self.lock:
+                    self.spans[span[0]].add((span[1], span[2], op))
+        # 同一线程里嵌套的调用（如桥接回调再调槽函数）只算最外层，避免两个 cProfile 互相覆盖
+        if getattr(self.local, "active", False):
+            return func(*args, **kwargs)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  # Python 3.12+ 同一时间只能有一个 cProfile 在运行
+            return func(*args, **kwargs)
+        self.local.active = True
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            profile.disable()
+            self.local.active = False
+            self._record(op, profile, elapsed)
+
+    def _record(self, op, profile, elapsed):
+        with self.lock:
+            self.profiled[op] += 1
+            self.wall[op] += elapsed
+            self.worst[op] = max(self.worst[op], elapsed)
+            if op in self.stats:
+                self.stats[op].add(profile)
+            else:
+                self.stats[op] = pstats.Stats(profile)
+
+    # --- 卡顿检测 ---
+    def watch(self, name):
+        """监视当前线程，返回 beat 函数，由该线程定时调用"""
+        watch = Watch(name, threading.get_ident())
+        with self.lock:
+            self.watches.append(watch)
+            if self.watchdog is None:
+                self.watchdog = threading.Thread(target=self._watchdog, name="profile-watchdog", daemon=True)
+                self.watchdog.start()
+        return watch.beat
+
+    def watch_loop(self, loop):
+        """监视 asyncio 事件循环：在循环里定时打心跳"""
+        interval = self.beat_interval()
+
+        def setup():
+            beat = self.watch("engine-loop")
+
+            def tick():
+                beat()
+                loop.call_later(interval, tick)
+            tick()
+        loop.call_soon_threadsafe(setup)
+
+    def beat_interval(self):
+        return max(0.02, self.stall_ms / 4000)
+
+    def _watchdog(self):
+        threshold = self.stall_ms / 1000
+        while not self.closing:
+            time.sleep(self.beat_interval())
+            now = time.perf_counter()
+            alive = sys._current_frames()
+            for watch in list(self.watches):
+                if watch.thread_id not in alive:  # 线程已结束（如引擎循环被关闭），不再监视
+                    with self.lock:
+                        self.watches.remove(watch)
+                    continue
+                if watch.stall is None and now - watch.last_beat > threshold:
+                    # 卡住时抓一次调用栈：正在执行的就是罪魁
+                    watch.stall = {
+                        "thread": watch.name,
+                        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+                        "since": watch.last_beat,
+                        "stack": traceback.format_stack(alive[watch.thread_id]),
+                    }
+                elif watch.stall is not None and watch.last_beat > watch.stall["since"]:
+                    self._close_stall(watch, watch.last_beat)
+
+    def _close_stall(self, watch, until):
+        stall, watch.stall = watch.stall, None
+        record = {"thread": stall["thread"], "time": stall["time"],
+                  "ms": round((until - stall["since"]) * 1000, 1), "stack": stall["stack"]}
+        with self.lock:
+            self.stalls.append(record)
+        where = stall["stack"][-1].strip().splitlines()[0] if stall["stack"] else "?"
+        log_event(f"{stall['thread']} 卡顿 {record['ms']:.0f} ms，卡在 {where}", "WARNING", op="stall",
+                  thread=stall["thread"], elapsed=record["ms"] / 1000)
+
+    # --- 内存归属 ---
+    def owner(self, trace_frames):
+        """从分配处往外找，第一个落在某个操作入口函数里的栈帧决定归属"""
+        for frame in reversed(trace_frames):
+            for first, last, op in self.spans.get(frame.filename, ()):
+                if first <= frame.lineno <= last:
+                    return op
+        return None
+
+    def allocations_by_op(self, snapshot):
+        """{op: Counter(分配位置 -> 字节)}，只统计退出时仍占用的内存"""
+        by_op = defaultdict(Counter)
+        for trace in snapshot.traces:
+            site = trace.traceback[-1]  # 最近的一帧即分配处
+            if _own_allocation(site):
+                continue
+            op = self.owner(trace.traceback)
+            if op is not None:
+                by_op[op][f"{site.filename}:{site.lineno}"] += trace.size
+        return by_op
+
+    # --- 输出 ---
+    def summary_rows(self):
+        with self.lock:
+            return [(op, self.calls[op], self.profiled[op], self.wall[op], self.worst[op])
+                    for op in sorted(self.calls, key=lambda op: -self.wall[op])]
+
+    def dump(self):
+        """写出全部结果，返回输出目录"""
+        os.makedirs(self.out_dir, exist_ok=True)
+        self.closing = True  # 写结果本身也占 GIL，不再检测卡顿
+        for watch in list(self.watches):
+            if watch.stall is not None:  # 到退出时还没恢复的卡顿
+                self._close_stall(watch, time.perf_counter())
+        with self.lock:
+            stats = dict(self.stats)
+            stalls = list(self.stalls)
+
+        for op, stat in stats.items():
+            path = os.path.join(self.out_dir, f"{_safe_name(op)}.prof")
+            stat.dump_stats(path)
+            buf = io.StringIO()
+            pstats.Stats(path, stream=buf).sort_stats("cumulative").print_stats(PROFILE_TOP)
+            with open(os.path.join(self.out_dir, f"{_safe_name(op)}.txt"), "w", encoding="utf-8") as f:
+                f.write(buf.getvalue())
+
+        if self.tracing and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            for op, counter in self.allocations_by_op(snapshot).items():
+                with open(os.path.join(self.out_dir, f"{_safe_name(op)}.alloc.txt"), "w", encoding="utf-8") as f:
+                    f.write(f"# {op}：退出时仍占用、在该操作中分配的内存 (KB)，共 {sum(counter.values()) / 1024:.1f} KB\n")
+                    for where, size in counter.most_common(PROFILE_TOP):
+                        f.write(f"{size / 1024:>10.1f}  {where}\n")
+            with open(os.path.join(self.out_dir, "allocations.txt"), "w", encoding="utf-8") as f:
+                f.write(f"# 开始跟踪以来：当前 {current / 1024 / 1024:.1f} MB，峰值 {peak / 1024 / 1024:.1f} MB\n")
+                f.write("# 当前占用最多的分配位置 (KB)\n")
+                top = [s for s in snapshot.statistics("lineno") if not _own_allocation(s.traceback[0])]
+                for stat in top[:PROFILE_TOP]:
+                    f.write(f"{stat.size / 1024:>10.1f}  {stat.traceback[0]}\n")
+
+        with open(os.path.join(self.out_dir, "stalls.jsonl"), "w", encoding="utf-8") as f:
+            for record in stalls:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        with open(os.path.join(self.out_dir, "summary.txt"), "w", encoding="utf-8") as f:
+            f.write(f"{'操作':<48}{'调用':>8}{'剖析':>8}{'累计(s)':>10}{'最长(s)':>10}\n")
+            for op, calls, profiled, wall, worst in self.summary_rows():
+                f.write(f"{op:<48}{calls:>8}{profiled:>8}{wall:>10.3f}{worst:>10.3f}\n")
+            f.write(f"\n卡顿（>{self.stall_ms} ms）{len(stalls)} 次")
+            if stalls:
+                f.write(f"，最长 {max(s['ms'] for s in stalls):.0f} ms，详见 stalls.jsonl")
+            f.write("\n")
+        return self.out_dir
+
+
+_profiler = None
+
+
+def get_profiler():
+    """开启剖析时返回 Profiler，否则 None"""
+    return _profiler
+
+
+def enable_profiling(out_dir=None, stall_ms=STALL_MS, memory=True):
+    """开启剖析，退出时自动写出结果"""
+    global _profiler
+    if _profiler is None:
+        out_dir = out_dir or os.path.join(PROFILE_DIR, time.strftime("%Y%m%d-%H%M%S"))
+        _profiler = Profiler(out_dir, stall_ms=stall_ms, memory=memory)
+        atexit.register(_dump_at_exit)
+    return _profiler
+
+
+def _dump_at_exit():
+    try:
+        print(f"剖析结果已写入: {_profiler.dump()}", file=sys.stderr)
+    except OSError as e:
+        print(f"剖析结果写入失败: {e}", file=sys.stderr)
+
+
+def profiled(op, func):
+    """开启剖析时返回包装后的 func，否则原样返回"""
+    return func if _profiler is None else _profiler.wrap(op, func)
+
+
+def configure(argv):
+    """从命令行取出 --profile [目录] 与 --stall-ms N，需要时开启剖析；返回剩余参数"""
+    argv = list(argv)
+    stall_ms = STALL_MS
+    if "--stall-ms" in argv:
+        index = argv.index("--stall-ms")
+        stall_ms = int(argv[index + 1])
+        del argv[index:index + 2]
+    if "--profile" in argv:
+        index = argv.index("--profile")
+        out_dir = None
+        if index + 1 < len(argv) and not argv[index + 1].startswith("-") and argv[index + 1] not in (
+                "synth", "enroll", "bench"):
+            out_dir = argv.pop(index + 1)
+        del argv[index]
+        enable_profiling(out_dir, stall_ms=stall_ms)
+    return argv
@@ -0,0 +1,236 @@
+# ===========================
+# 限流与重试 (所有云端调用共用)
+# ===========================
+# 每个 (api_key, 接口类别) 一个令牌桶，所有线程共享：并发再高，发出的请求也不超过设定的 QPS。
+# 被服务端限流时整个桶暂停（优先按服务端给的等待时间）并临时降速，之后随成功调用逐步恢复。
+# RetryPolicy 负责区分可重试 / 不可重试的错误，按指数退避加抖动重试。
+import re
+import time
+import random
+import threading
+
+from .metrics import get_metrics
+from .runtime import OperationCancelled
+
+# 各接口类别的 (每秒请求数, 突发容量)；None 表示不限。
+# 服务端按秒计数，突发容量 + 速率不能超过配额，所以突发容量取得很小
+ENDPOINT_LIMITS = {
+    "synth": (10.0, 1),
+    "list": (10.0, 1),
+    "enroll": (5.0, 1),
+    "delete": (10.0, 1),
+}
+# 操作名 -> 接口类别
+OP_ENDPOINTS = {
+    "synth": "synth",
+    "list_voices": "list",
+    "create_voice": "enroll",
+    "query_voice": "enroll",
+    "delete_voice": "delete",
+}
+MIN_RATE_FACTOR = 0.1   # 被限流后最多降到设定速率的 10%
+RECOVER_STEPS = 20      # 连续成功约 20 次恢复到设定速率
+
+# 错误分类：限流、可重试、不可重试
+THROTTLED = "throttled"
+RETRYABLE = "retryable"
+FATAL = "fatal"
+THROTTLE_CODES = ("Throttling", "RateQuota", "TooManyRequests", "rate limit")
+RETRYABLE_CODES = ("InternalError", "ServiceUnavailable", "RequestTimeOut", "Timeout", "SystemError")
+FATAL_CODES = ("InvalidApiKey", "Arrearage", "AccessDenied", "InvalidParameter", "DataInspectionFailed",
+               "NotFound", "BadRequest")
+RETRY_AFTER_RE = re.compile(r"retry[ _-]?after\D{0,5}(\d+(?:\.\d+)?)", re.IGNORECASE)
+
+
+def error_status(e):
+    # dashscope 各异常的状态码字段不统一：status_code / _status_code（复刻接口）/ http_code（合成）
+    for attr in ('status_code', '_status_code', 'http_code'):
+        value = getattr(e, attr, None)
+        if value is not None:
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+def classify_error(e):
+    """返回 THROTTLED / RETRYABLE / FATAL"""
+    text = str(e)
+    if any(code in text for code in FATAL_CODES):
+        return FATAL
+    status = error_status(e)
+    if status == 429 or any(code in text for code in THROTTLE_CODES):
+        return THROTTLED
+    if isinstance(e, (ConnectionError, TimeoutError)) or any(code in text for code in RETRYABLE_CODES):
+        return RETRYABLE
+    if isinstance(e, (ValueError, TypeError, KeyError)):
+        return FATAL
+    if status is None or status >= 500:
+        return RETRYABLE  # 网络异常等没有状态码的错误按可重试处理
+    return FATAL if 400 <= status < 500 else RETRYABLE
+
+
+def retry_hint(e):
+    """服务端建议的等待秒数（retry_after 属性或错误信息中的 Retry-After），没有则返回 None"""
+    value = getattr(e, 'retry_after', None)
+    if value is None:
+        match = RETRY_AFTER_RE.search(str(e))
+        value = match.group(1) if match else None
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+
+    def __init__(self, rate, burst):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def _reserve(self):
+        """预订一个令牌，返回需要等待的秒数（调用方需持有 self.lock）"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(wait, self.paused_until - now)
+
+    def acquire(self, cancel=None):
+        """取一个令牌，必要时等待；返回等待的秒数。
+        cancel（threading.Event）置位时退还令牌并抛出 OperationCancelled，调用方不得再发请求"""
+        with self.lock:
+            wait = self._reserve()
+        if cancel is not None:
+            if cancel.is_set() or (wait > 0 and cancel.wait(wait)):
+                with self.lock:
+                    self.tokens = min(self.burst, self.tokens + 1)
+                raise OperationCancelled("rate limit")
+        elif wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def throttled(self, pause):
+        """被服务端限流：暂停 pause 秒，并把速率减半"""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + pause)
+            self.rate = max(self.max_rate * MIN_RATE_FACTOR, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+
+    def succeeded(self):
+        if self.rate < self.max_rate:
+            with self.lock:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / RECOVER_STEPS)
+
+
+class RateLimiter:
+
+    def __init__(self, limits=None):
+        self.limits = dict(ENDPOINT_LIMITS if limits is None else limits)
+        self.lock = threading.Lock()
+        self.buckets = {}  # (api_key, endpoint) -> TokenBucket
+
+    def reset(self, limits=None):
+        """恢复为 limits（默认 ENDPOINT_LIMITS），丢弃已有的桶"""
+        with self.lock:
+            self.limits = dict(ENDPOINT_LIMITS if limits is None else limits)
+            self.buckets.clear()
+
+    def configure(self, endpoint, rate, burst=None):
+        """修改某类接口的速率（rate 为 None 表示不限），已有的桶一并替换"""
+        with self.lock:
+            self.limits[endpoint] = None if rate is None else (rate, burst or 1)
+            for key in [k for k in self.buckets if k[1] == endpoint]:
+                del self.buckets[key]
+
+    def bucket(self, api_key, endpoint):
+        key = (api_key, endpoint)
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None and key not in self.buckets:
+                limit = self.limits.get(endpoint)
+                bucket = self.buckets[key] = TokenBucket(*limit) if limit else None
+            return bucket
+
+    def acquire(self, api_key, endpoint, cancel=None):
+        bucket = self.bucket(api_key, endpoint)
+        return bucket.acquire(cancel) if bucket else 0.0
+
+
+class RetryPolicy:
+    """max_attempts 含第一次调用；第 n 次重试前等待 base_delay * 2^(n-1)（不超过 max_delay），
+    再乘以 [1 - jitter, 1] 的随机系数；服务端给出等待时间时以其为准"""
+
+    def __init__(self, max_attempts=4, base_delay=1.0, max_delay=30.0, jitter=0.5):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def backoff(self, attempt, error=None):
+        hint = retry_hint(error) if error is not None else None
+        if hint is not None:
+            return min(hint, self.max_delay)
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay * random.uniform(1 - self.jitter, 1)
+
+    def call(self, func, api_key, op, model=None, idempotent=True, cancel=None, on_retry=None):
+        """限流后调用 func()，失败时按策略重试；返回 func() 的结果，最终失败时抛出最后一次的异常
+
+        idempotent=False 的操作（如创建音色）只在被限流时重试：限流说明请求未被受理，重发不会重复创建。
+        on_retry(attempt, error, delay) 在每次重试等待前回调；cancel 置位后不再发出请求，
+        还没发出时抛出 OperationCancelled。
+        """
+        endpoint = OP_ENDPOINTS.get(op, op)
+        limiter = get_limiter()
+        for attempt in range(1, self.max_attempts + 1):
+            if cancel is not None and cancel.is_set():
+                raise OperationCancelled(op)
+            limiter.acquire(api_key, endpoint, cancel)
+            if cancel is not None and cancel.is_set():
+                raise OperationCancelled(op)  # 等令牌期间被取消
+            bucket = limiter.bucket(api_key, endpoint)
+            try:
+                result = func()
+            except Exception as e:
+                kind = classify_error(e)
+                delay = self.backoff(attempt, e)
+                if kind == THROTTLED and bucket:
+                    bucket.throttled(delay)  # 其它线程也一起等，而不是各自撞上限流
+                if (kind == FATAL or (kind == RETRYABLE and not idempotent)
+                        or attempt == self.max_attempts or (cancel is not None and cancel.is_set())):
+                    raise
+                get_metrics().record_retry(op, model)
+                if on_retry:
+                    on_retry(attempt, e, delay)
+                if cancel is not None:
+                    if cancel.wait(delay):
+                        raise
+                else:
+                    time.sleep(delay)
+                continue
+            if bucket:
+                bucket.succeeded()
+            return result
+
+
+DEFAULT_RETRY = RetryPolicy()
+NO_RETRY = RetryPolicy(max_attempts=1)
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter():
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter()
+        return _limiter
@@ -0,0 +1,295 @@
+# ===========================
+# 引擎事件循环 (所有云端操作共用)
+# ===========================
+# 一个后台线程跑 asyncio 事件循环，合成 / 列表 / 删除 / 复刻轮询都作为循环里的任务提交。
+# dashscope SDK 是阻塞接口，实际调用放进共享线程池执行；排队、定时等待（如复刻轮询的间隔）只是循环里的协程，不占线程。
+# 调度按优先级：交互合成 > 列表刷新 > 批量任务 > 复刻轮询。排队的任务按 (优先级, 提交顺序) 放行，
+# 同时受三道限制：每类操作的并发上限、每个优先级的并发上限、后台任务最多占 threads - INTERACTIVE_RESERVE 个线程，
+# 后台再忙，用户正在等的那条合成也有线程可用。
+# 取消是协作式的：cancel 传 CancelToken，排队 / 定时等待中的任务立即以 OperationCancelled 结束，
+# 执行中的任务由调用方登记的回调中止（如流式合成的 streaming_cancel），或在下一个检查点自行退出。
+# 结果通过 on_done 回调交出（在引擎线程中调用），界面再经 gui.py 的 EngineBridge 转回主线程。
+# asyncio 导入较慢（几十毫秒），放到第一次提交任务时再导入，不拖慢界面冷启动。
+import heapq
+import itertools
+import functools
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+
+from .profiling import get_profiler
+
+# 各类操作的最大并发数；None 表示不限
+OPERATION_LIMITS = {
+    "synth": 4,
+    "preview": 2,
+    "list": 2,
+    "page": 2,       # 列表翻页预取，由进行中的 "list" 任务提交
+    "delete": 8,
+    "enroll": 4,
+    "speculate": 1,  # 推测合成，同一时间只有一条
+    "batch": 4,      # 后台合成（恢复的任务），与交互合成分开计数
+    "segment": 8,    # 长文本的分段合成，所有长文本任务共享
+}
+ENGINE_THREADS = 16  # 执行阻塞调用的线程数，各类操作共享
+
+# 优先级：数值越小越先放行
+PRIORITY_INTERACTIVE = 0  # 用户正在等的合成 / 试听
+PRIORITY_LIST = 1         # 列表刷新、预合成
+PRIORITY_BULK = 2         # 批量删除、后台合成
+PRIORITY_POLL = 3         # 复刻提交与轮询
+OPERATION_PRIORITIES = {
+    "synth": PRIORITY_INTERACTIVE,
+    "preview": PRIORITY_INTERACTIVE,
+    "list": PRIORITY_LIST,
+    "page": PRIORITY_LIST,
+    "speculate": PRIORITY_LIST,
+    "delete": PRIORITY_BULK,
+    "batch": PRIORITY_BULK,
+    "segment": PRIORITY_BULK,
+    "enroll": PRIORITY_POLL,
+}
+# 各优先级同时执行的上限；交互类只受操作上限和线程总数约束
+# 任务占着名额等自己提交的子任务时（列表刷新等翻页预取、后台长文本等分段），父任务的上限之和
+# 必须小于该优先级的上限，否则会互相卡死："list" + "speculate" < 列表优先级，"batch" < 批量优先级
+CLASS_LIMITS = {
+    PRIORITY_LIST: 4,
+    PRIORITY_BULK: 8,
+    PRIORITY_POLL: 4,
+}
+INTERACTIVE_RESERVE = 4  # 只留给交互类的线程数
+
+
+class OperationCancelled(CancelledError):
+    """cancel 在操作开始前已置位，操作没有执行（或执行中按 cancel 主动退出）"""
+
+
+def _noop():
+    pass
+
+
+class CancelToken(threading.Event):
+    """协作式取消令牌：就是一个 threading.Event（RetryPolicy / 限流器的 cancel 参数都认），
+    另外可以登记回调，cancel() 时立即在调用方线程中执行，用于中止进行中的调用、唤醒等待中的任务"""
+
+    def __init__(self):
+        super().__init__()
+        self._callbacks = []
+        self._callback_lock = threading.Lock()
+
+    def cancel(self):
+        self.set()
+
+    def set(self):
+        with self._callback_lock:
+            if self.is_set():
+                return
+            super().set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def subscribe(self, callback):
+        """取消时调用 callback()，已取消则立即调用；返回注销函数"""
+        with self._callback_lock:
+            if not self.is_set():
+                self._callbacks.append(callback)
+                return functools.partial(self._unsubscribe, callback)
+        callback()
+        return _noop
+
+    def _unsubscribe(self, callback):
+        with self._callback_lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+
+class EngineLoop:
+
+    def __init__(self, limits=None, threads=ENGINE_THREADS, class_limits=None, reserve=INTERACTIVE_RESERVE):
+        self.limits = dict(OPERATION_LIMITS if limits is None else limits)
+        self.class_limits = dict(CLASS_LIMITS if class_limits is None else class_limits)
+        self.threads = threads
+        self.reserve = min(reserve, threads - 1)
+        self.lock = threading.Lock()
+        self.loop = None
+        self.thread = None
+        self.executor = None
+        # 以下只在循环线程中访问
+        self.waiters = []        # 堆：(优先级, 序号, op, asyncio.Future)
+        self.sequence = itertools.count()
+        self.queued = Counter()  # op -> 等待并发名额的任务数
+        self.running = Counter()  # op -> 正在执行的任务数
+        self.class_running = Counter()  # 优先级 -> 正在执行的任务数
+
+    def start(self):
+        with self.lock:
+            if self.loop is None:
+                import asyncio
+                self.loop = asyncio.new_event_loop()
+                self.executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="engine")
+                self.loop.set_default_executor(self.executor)
+                self.thread = threading.Thread(target=self._run, args=(self.loop,), name="engine-loop", daemon=True)
+                self.thread.start()
+                if get_profiler() is not None:
+                    get_profiler().watch_loop(self.loop)
+            return self.loop
+
+    @staticmethod
+    def _run(loop):
+        import asyncio
+        loop.run_forever()
+        # 停止后取消剩余任务，让等待中的 Future 都能结束
+        tasks = asyncio.all_tasks(loop)
+        for task in tasks:
+            task.cancel()
+        loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        loop.close()
+
+    def shutdown(self):
+        """停止事件循环；未完成的任务被取消，正在执行的阻塞调用照常结束"""
+        with self.lock:
+            loop, self.loop = self.loop, None
+        if loop is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        self.thread.join()
+        self.executor.shutdown(wait=False)
+        self.waiters.clear()
+        self.queued.clear()
+        self.running.clear()
+        self.class_running.clear()
+
+    def admissible(self, op, priority):
+        limit = self.limits.get(op)
+        if limit and self.running[op] >= limit:
+            return False
+        limit = self.class_limits.get(priority)
+        if limit and self.class_running[priority] >= limit:
+            return False
+        busy = sum(self.class_running.values())
+        if priority > PRIORITY_INTERACTIVE:
+            return busy - self.class_running[PRIORITY_INTERACTIVE] < self.threads - self.reserve
+        return busy < self.threads
+
+    def pump(self):
+        """按 (优先级, 提交顺序) 放行排队的任务；排在前面的被自己的上限卡住时，后面的照样可以放行"""
+        blocked = []
+        while self.waiters and sum(self.class_running.values()) < self.threads:
+            entry = heapq.heappop(self.waiters)
+            priority, _, op, waiter = entry
+            if waiter.done():  # 排队时被取消
+                continue
+            if self.admissible(op, priority):
+                self.running[op] += 1
+                self.class_running[priority] += 1
+                waiter.set_result(None)
+            else:
+                blocked.append(entry)
+        for entry in blocked:
+            heapq.heappush(self.waiters, entry)
+
+    def release(self, op, priority):
+        self.running[op] -= 1
+        self.class_running[priority] -= 1
+        self.pump()
+
+    async def admit(self, op, priority):
+        import asyncio
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (priority, next(self.sequence), op, waiter))
+        self.queued[op] += 1
+        try:
+            self.pump()
+            await waiter
+        except BaseException:
+            # 已放行但任务在恢复前被取消：名额要还回去
+            if waiter.done() and not waiter.cancelled():
+                self.release(op, priority)
+            raise
+        finally:
+            self.queued[op] -= 1
+
+    async def execute(self, op, func, args, delay, cancel, priority):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        task = asyncio.current_task()
+        waiting = [True]
+
+        def interrupt():
+            # 只打断排队和定时等待；已经在线程里执行的调用由调用方自己响应 cancel
+            if waiting[0]:
+                task.cancel()
+
+        def wake():
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(interrupt)
+
+        unsubscribe = cancel.subscribe(wake) if isinstance(cancel, CancelToken) else _noop
+        try:
+            try:
+                if delay > 0 and not (cancel is not None and cancel.is_set()):
+                    await asyncio.sleep(delay)
+                if cancel is not None and cancel.is_set():
+                    raise OperationCancelled(op)
+                await self.admit(op, priority)
+            except asyncio.CancelledError:
+                if cancel is not None and cancel.is_set():
+                    raise OperationCancelled(op) from None
+                raise
+            waiting[0] = False
+            try:
+                if cancel is not None and cancel.is_set():
+                    raise OperationCancelled(op)
+                if asyncio.iscoroutinefunction(func):
+                    return await func(*args)
+                call = functools.partial(func, *args)
+                profiler = get_profiler()
+                if profiler is not None:
+                    call = functools.partial(profiler.call, f"{op}:{getattr(func, '__qualname__', op)}", func, *args)
+                return await loop.run_in_executor(None, call)
+            finally:
+                self.release(op, priority)
+        finally:
+            unsubscribe()
+
+    def submit(self, op, func, *args, delay=0, cancel=None, priority=None, on_done=None):
+        """把 func(*args) 作为 op 类操作排入引擎，返回 concurrent.futures.Future
+
+        delay 秒后才开始排队；priority 默认取 OPERATION_PRIORITIES[op]。
+        cancel（threading.Event 或 CancelToken）在开始执行前置位则不执行，以 OperationCancelled 结束；
+        CancelToken 还能立即打断排队和定时等待。
+        on_done(result, error) 在完成时回调，成功时 error 为 None。func 可以是普通函数或协程函数。
+        """
+        import asyncio
+        if priority is None:
+            priority = OPERATION_PRIORITIES.get(op, PRIORITY_BULK)
+        future = asyncio.run_coroutine_threadsafe(self.execute(op, func, args, delay, cancel, priority),
+                                                  self.start())
+        if on_done is not None:
+            future.add_done_callback(functools.partial(self._done, on_done))
+        return future
+
+    @staticmethod
+    def _done(on_done, future):
+        try:
+            result, error = future.result(), None
+        except BaseException as e:  # CancelledError 不是 Exception 的子类
+            result, error = None, e
+        on_done(result, error)
+
+    def stats(self):
+        """{op: (排队数, 执行中)}"""
+        return {op: (self.queued[op], self.running[op]) for op in set(self.queued) | set(self.running)}
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = EngineLoop()
+        return _engine
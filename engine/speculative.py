@@ -0,0 +1,126 @@
+# ===========================
+# 推测合成 (输入停顿后预先合成)
+# ===========================
+# 调参时文本、音色、音量、语速往往早就定下来了，点“开始合成”才发请求白白多等一轮。
+# 界面在输入停顿一段时间后调用 request()，后台先按当前参数合成一份写进合成缓存；
+# 之后正式合成的参数一致时直接命中缓存，立刻写出。正式合成赶上预合成还没结束时，wait() 等它结束再查缓存，
+# 不会重复请求。
+# 预合成消耗真实调用额度，每次运行（会话）按字数设上限，用完不再预合成。
+# 同一时间只有一条预合成：新的请求取代旧请求，还在排队的直接结束，已经发出的流式调用随即中止。
+# 正式合成最多等预合成 SPECULATIVE_WAIT_SEC 秒，超时或正式合成被取消时不再等，照常自己合成。
+import os
+import tempfile
+import threading
+
+from .cache import SynthesisCache
+from .synthesis import CANCELLED_MESSAGE
+from .formats import AUDIO_FORMAT, format_ext
+from .jobqueue import make_synthesis_job
+from .runtime import CancelToken, OperationCancelled, get_engine
+
+SPECULATIVE_IDLE_MS = 1500         # 输入停顿多久后开始预合成
+SPECULATIVE_BUDGET_CHARS = 2000    # 每次运行预合成的字数上限
+SPECULATIVE_WAIT_SEC = 15          # 正式合成等预合成的最长时间
+SPECULATIVE_DIR = os.path.join(tempfile.gettempdir(), "cosyvoice_speculative")
+
+# request() 的返回值
+SPEC_STARTED = "started"
+SPEC_CACHED = "cached"      # 缓存里已有，无需预合成
+SPEC_PENDING = "pending"    # 同样参数的预合成已在进行
+SPEC_BUDGET = "budget"      # 超出本次运行的字数上限
+SPEC_DISABLED = "disabled"  # 缓存已关闭（上限为 0），预合成的结果无处存放
+
+
+def speculation_key(params):
+    """与 SynthesisJob.cache_key 相同的算法，params 为 jobqueue.synthesis_params 的格式"""
+    return SynthesisCache.make_key(params["model"], params["voice_id"], params["volume"], params["speech_rate"],
+                                   params.get("audio_format") or AUDIO_FORMAT, params["text"])
+
+
+class Speculator:
+
+    def __init__(self, cache, budget_chars=SPECULATIVE_BUDGET_CHARS, engine=None):
+        self.cache = cache
+        self.budget_chars = budget_chars
+        self.engine = engine
+        self.lock = threading.Lock()
+        self.spent_chars = 0
+        self.current = None  # (key, cancel, future)，最近一次预合成
+
+    def remaining(self):
+        with self.lock:
+            return max(0, self.budget_chars - self.spent_chars)
+
+    def set_budget(self, budget_chars):
+        with self.lock:
+            self.budget_chars = budget_chars
+
+    def request(self, api_key, params, on_done=None):
+        """按 params 预合成一份进缓存；on_done(key, success, message) 在引擎线程中回调，返回 SPEC_* 之一"""
+        if self.cache is None or self.cache.max_bytes <= 0:
+            return SPEC_DISABLED
+        key = speculation_key(params)
+        if self.cache.contains(key):
+            return SPEC_CACHED
+        chars = len(params["text"])
+        with self.lock:
+            if self.current is not None and self.current[0] == key and not self.current[2].done():
+                return SPEC_PENDING
+            if self.spent_chars + chars > self.budget_chars:
+                return SPEC_BUDGET
+            self.spent_chars += chars
+            if self.current is not None:
+                self.current[1].cancel()  # 取代旧请求
+            cancel = CancelToken()
+            # 输出到临时文件，成功后由 SynthesisJob 存进缓存，临时文件随即删除
+            os.makedirs(SPECULATIVE_DIR, exist_ok=True)
+            output_path = os.path.join(SPECULATIVE_DIR, f"{key}.{format_ext(params.get('audio_format') or AUDIO_FORMAT)}")
+            job = make_synthesis_job(api_key, dict(params, output_path=output_path), cache=self.cache, cancel=cancel)
+            future = (self.engine or get_engine()).submit(
+                "speculate", self._run, job, cancel=cancel,
+                on_done=lambda result, error: self._done(key, chars, result, error, on_done))
+            self.current = (key, cancel, future)
+        return SPEC_STARTED
+
+    @staticmethod
+    def _run(job):
+        try:
+            return job.run()
+        finally:
+            for path in (job.output_path, job.output_path + '.part'):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _done(self, key, chars, result, error, on_done):
+        if isinstance(error, OperationCancelled):
+            # 还没发出就被取代，不计入额度
+            with self.lock:
+                self.spent_chars -= chars
+            return
+        success, message = result if error is None else (False, str(error))
+        if on_done is not None and message != CANCELLED_MESSAGE:  # 发出后被取代的不必提示
+            on_done(key, success, message)
+
+    def cancel(self):
+        """取消进行中的预合成"""
+        with self.lock:
+            if self.current is not None:
+                self.current[1].cancel()
+
+    def wait(self, params, timeout=SPECULATIVE_WAIT_SEC, cancel=None):
+        """同样参数的预合成正在进行时等它结束（之后查缓存即可命中），最多等 timeout 秒；
+        cancel（CancelToken）置位时立即返回。返回是否等过"""
+        key = speculation_key(params)
+        with self.lock:
+            current = self.current
+        if current is None or current[0] != key or current[2].done():
+            return False
+        woken = threading.Event()
+        current[2].add_done_callback(lambda f: woken.set())
+        unsubscribe = cancel.subscribe(woken.set) if cancel is not None else None
+        try:
+            woken.wait(timeout)  # 失败 / 超时 / 取消都照常走正式合成
+        finally:
+            if unsubscribe is not None:
+                unsubscribe()
+        return True
@@ -0,0 +1,299 @@
+# ===========================
+# 语音合成任务
+# ===========================
+import os
+import time
+import threading
+
+from .cache import SynthesisCache
+from .formats import AUDIO_FORMAT, bytes_per_sec, commit_file, open_audio_file, request_format
+from .metrics import get_metrics
+from .pool import get_pool
+from .ratelimit import DEFAULT_RETRY
+from .runtime import OperationCancelled
+
+# 流式进度估算：按输出格式的码率折算字节数，中文正常语速约 4 字/秒
+CHARS_PER_SEC = 4.0
+PROGRESS_INTERVAL = 0.25  # 流式进度信号的最小发送间隔（秒）
+CANCELLED_MESSAGE = "已取消"
+
+
+class StreamingFileWriter:
+    """SDK 回调（实现 ResultCallback 的全部方法）：音频分片到达即追加写入文件，不在内存中拼接整段音频"""
+
+    def __init__(self, fp, on_chunk=None, tee=None):
+        self.fp = fp
+        self.on_chunk = on_chunk
+        self.tee = tee  # 分片同时交给 tee(data)，如试听播放器
+        self.started_at = time.time()
+        self.first_byte_at = None
+        self.bytes_received = 0
+        self.error = None
+        self.done = threading.Event()
+
+    @property
+    def ttfb(self):
+        if self.first_byte_at is None:
+            return None
+        return self.first_byte_at - self.started_at
+
+    def on_open(self):
+        pass
+
+    def on_close(self):
+        pass
+
+    def on_event(self, message):
+        pass
+
+    def on_data(self, data):
+        if self.first_byte_at is None:
+            self.first_byte_at = time.time()
+        self.fp.write(data)
+        if self.tee:
+            self.tee(data)
+        self.bytes_received += len(data)
+        if self.on_chunk:
+            self.on_chunk(self)
+
+    def on_complete(self):
+        self.done.set()
+
+    def on_error(self, message):
+        self.error = message
+        self.done.set()
+
+
+class TaskFailed(Exception):
+    """流式合成时服务端通过 on_error 报告的失败（SDK 不抛异常），转成异常以便按重试策略处理"""
+
+
+class SynthesisJob:
+    """单条合成任务（不依赖 Qt）：GUI 线程与命令行批量合成共用同一套逻辑
+
+    progress(percent, message) 用于汇报进度，run() 返回 (是否成功, 输出路径或错误信息)
+    cancel 为 runtime.CancelToken：取消后不再重试，进行中的流式调用经 streaming_cancel 中止，返回 (False, CANCELLED_MESSAGE)
+    """
+    tee = None  # 流式分片的旁路接收者（见 playback.PreviewJob）
+
+    def __init__(self, api_key, text, output_path, voice_id, model, volume, speech_rate, stream=True, cache=None,
+                 progress=None, retry=DEFAULT_RETRY, audio_format=AUDIO_FORMAT, cancel=None):
+        self.api_key = api_key
+        self.text = text
+        self.output_path = output_path
+        self.voice_id = voice_id
+        self.model = model
+        self.volume = volume
+        self.speech_rate = speech_rate
+        self.stream = stream
+        self.cache = cache
+        self.progress = progress or (lambda percent, message: None)
+        self.retry = retry
+        self.audio_format = audio_format
+        self.cancel = cancel
+        self._last_emit = 0
+
+    def run(self):
+        try:
+            # 确保保存目录存在
+            output_dir = os.path.dirname(self.output_path)
+            if output_dir and not os.path.exists(output_dir):
+                os.makedirs(output_dir)
+
+            # 先查缓存，命中则直接从磁盘写出，不再请求 API
+            if self.serve_from_cache():
+                return True, self.output_path
+
+            self.check_cancelled()
+            self.progress(10, f"初始化模型: {self.model}")
+
+            # 经共享限流器发出请求；限流 / 服务端错误 / 网络异常按策略退避重试，取消后不再重试
+            attempt = self.run_streaming if self.stream else self.run_blocking
+            return self.retry.call(attempt, self.api_key, "synth", self.model, cancel=self.cancel,
+                                   on_retry=self.on_retry)
+
+        except OperationCancelled:
+            return self.cancelled_result()
+        except TaskFailed as e:
+            if self.cancelled():
+                return self.cancelled_result()
+            self.progress(0, "❌ 发生错误")
+            return False, f"API 返回错误: {str(e)}"
+        except Exception as e:
+            if self.cancelled():
+                return self.cancelled_result()
+            # 捕获 SDK 抛出的所有错误（如 API Key 错误、欠费、网络超时等）
+            error_msg = str(e)
+            self.progress(0, "❌ 发生错误")
+            return False, f"执行异常: {error_msg}"
+
+    def run_blocking(self):
+        # 2. 从会话池取 Synthesizer（同一 Key/模型/音色复用已建立的连接）
+        with get_pool().session(self.api_key, self.model, self.voice_id, self.volume,
+                                self.speech_rate, request_format(self.audio_format)) as synthesizer:
+            self.progress(40, "正在向阿里云发送请求...")
+
+            # 3. 调用 API
+            # 文档说明：call 方法直接返回二进制音频数据 (bytes)
+            with get_metrics().track("synth", self.model, chars=len(self.text)) as call:
+                audio_data = synthesizer.call(self.text)
+                if isinstance(audio_data, bytes):
+                    call.bytes = len(audio_data)
+                else:
+                    call.error = "BadResponse"
+                    get_pool().discard(synthesizer)
+        
+        self.progress(80, "接收数据完成，正在保存...")
+
+        # 4. 直接处理 bytes 数据
+        if isinstance(audio_data, bytes) and len(audio_data) > 0:
+            # 先写临时文件再改名，中途退出不会留下半截的输出
+            part_path = self.output_path + '.part'
+            with open_audio_file(part_path, self.audio_format) as f:
+                f.write(audio_data)
+            commit_file(part_path, self.output_path)
+            self.store_to_cache()
+                
+            self.progress(100, "✅ 合成成功")
+            return True, self.output_path
+        
+        # 处理可能的异常返回 (虽然通常会直接抛出异常)
+        elif hasattr(audio_data, 'output'): 
+            # 如果返回的是错误对象
+            msg = getattr(audio_data.output, 'message', '未知错误')
+            return False, f"API 返回错误: {msg}"
+        else:
+            # 其他情况
+            return False, f"合成失败: 返回了非音频数据 ({type(audio_data)})"
+
+    def run_streaming(self):
+        # 分片先写入 .part 文件，成功后再改名；失败时保留已接收的部分（服务端不支持断点续传，只供检查）。
+        # 已经收到音频后出错不再重试：重发会清空 .part，试听也会把收到的分片再放一遍
+        part_path = self.output_path + '.part'
+        writer = None
+        self.expected_bytes = (max(1.0, len(self.text) / (CHARS_PER_SEC * self.speech_rate))
+                               * bytes_per_sec(self.audio_format))
+
+        try:
+            # WAV 边写边落盘，关闭时回填文件头
+            with open_audio_file(part_path, self.audio_format) as fp:
+                writer = StreamingFileWriter(fp, on_chunk=self.on_chunk, tee=self.tee)
+                with get_pool().session(self.api_key, self.model, self.voice_id, self.volume,
+                                        self.speech_rate, request_format(self.audio_format),
+                                        callback=writer) as synthesizer, \
+                        get_metrics().track("synth", self.model, chars=len(self.text)) as call:
+                    # 取消时中止进行中的流式调用，streaming_complete 随即返回
+                    unsubscribe = (self.cancel.subscribe(lambda: self.abort_stream(synthesizer, writer))
+                                   if self.cancel is not None else None)
+                    try:
+                        self.check_cancelled()
+                        self.progress(20, "正在向阿里云发送请求 (流式)...")
+                        writer.started_at = time.time()
+                        synthesizer.streaming_call(self.text)
+                        # 阻塞直到服务端返回全部音频（分片已在回调中落盘）
+                        synthesizer.streaming_complete()
+                        # 任务失败时 SDK 先放行 streaming_complete，再回调 on_error
+                        writer.done.wait(5)
+                    finally:
+                        if unsubscribe is not None:
+                            unsubscribe()
+                    call.bytes, call.ttfb = writer.bytes_received, writer.ttfb
+                    if self.cancelled():
+                        # 中止后连接状态不确定，不放回会话池
+                        call.error = "Cancelled"
+                        get_pool().discard(synthesizer)
+                    elif writer.error:
+                        call.error = "TaskFailed"
+                        get_pool().discard(synthesizer)
+        except OperationCancelled:
+            os.remove(part_path)
+            raise
+        except Exception as e:
+            if writer is None or writer.bytes_received == 0:
+                self.report_partial(part_path)
+                raise
+            self.report_partial(part_path)
+            self.progress(0, "❌ 发生错误")
+            return False, f"执行异常: {str(e)}"
+
+        if self.cancelled():
+            os.remove(part_path)
+            raise OperationCancelled("synth")
+
+        if writer.error:
+            if writer.bytes_received == 0:
+                # 一个字节都没收到（多为限流 / 服务端错误），交给重试策略决定是否重发
+                os.remove(part_path)
+                raise TaskFailed(writer.error)
+            self.report_partial(part_path)
+            self.progress(0, "❌ 发生错误")
+            return False, f"API 返回错误: {writer.error}"
+        if writer.bytes_received == 0:
+            os.remove(part_path)
+            return False, "合成失败: 未收到任何音频数据"
+
+        commit_file(part_path, self.output_path)
+        self.store_to_cache()
+        cost = time.time() - writer.started_at
+        self.progress(100, f"✅ 合成成功 (首包 {writer.ttfb * 1000:.0f} ms, "
+                           f"共 {writer.bytes_received / 1024:.1f} KB, 耗时 {cost:.2f} s)")
+        return True, self.output_path
+
+    def abort_stream(self, synthesizer, writer):
+        # 在取消方的线程中调用；调用还没开始或已经结束时 SDK 会报错，忽略即可
+        try:
+            synthesizer.streaming_cancel()
+        except Exception:
+            pass
+        writer.done.set()
+
+    def cancelled(self):
+        return self.cancel is not None and self.cancel.is_set()
+
+    def check_cancelled(self):
+        if self.cancelled():
+            raise OperationCancelled("synth")
+
+    def cancelled_result(self):
+        self.progress(0, "⏹ 已取消")
+        return False, CANCELLED_MESSAGE
+
+    def on_retry(self, attempt, error, delay):
+        self._last_emit = 0
+        self.progress(10, f"第 {attempt} 次请求失败: {str(error)}，{delay:.1f} 秒后重试...")
+
+    def on_chunk(self, writer):
+        # 在 SDK 的接收线程中回调，按 PROGRESS_INTERVAL 节流
+        now = time.time()
+        if self._last_emit == 0:
+            self._last_emit = now
+            self.progress(25, f"首包到达，TTFB {writer.ttfb * 1000:.0f} ms")
+            return
+        if now - self._last_emit < PROGRESS_INTERVAL:
+            return
+        self._last_emit = now
+        percent = 25 + int(min(writer.bytes_received / self.expected_bytes, 1.0) * 70)
+        self.progress(percent, f"已接收 {writer.bytes_received / 1024:.1f} KB "
+                               f"(TTFB {writer.ttfb * 1000:.0f} ms)")
+
+    def cache_key(self):
+        return SynthesisCache.make_key(self.model, self.voice_id, self.volume, self.speech_rate,
+                                       self.audio_format, self.text)
+
+    def serve_from_cache(self):
+        if self.cache is None:
+            return False
+        if self.cache.fetch(self.cache_key(), self.output_path):
+            self.progress(100, f"✅ 命中缓存，已直接写出 ({self.cache.stats()})")
+            return True
+        self.progress(5, f"缓存未命中 ({self.cache.stats()})")
+        return False
+
+    def store_to_cache(self):
+        if self.cache is not None:
+            self.cache.store(self.cache_key(), self.voice_id, self.output_path)
+
+    def report_partial(self, part_path):
+        if os.path.exists(part_path) and os.path.getsize(part_path) > 0:
+            self.progress(0, f"已保留未完成的部分文件: {part_path} "
+                             f"({os.path.getsize(part_path) / 1024:.1f} KB，不能续传，重新合成会覆盖)")
@@ -0,0 +1,161 @@
+# ===========================
+# 音色列表 / 状态 / 删除
+# ===========================
+from . import client
+from .ratelimit import RetryPolicy
+from .runtime import OperationCancelled, get_engine
+
+PAGE_SIZE = 50
+PREFETCH_PAGES = 4  # 并行预取的最大页数
+DELETE_MAX_RETRY = 3
+DELETE_RETRY = RetryPolicy(max_attempts=DELETE_MAX_RETRY, base_delay=2.0)
+
+# [修改点] 完善状态映射表
+STATUS_MAP = {
+    "OK": "训练完成",
+    "SUCCEEDED": "训练完成",
+    "RUNNING": "训练中",
+    "DEPLOYING": "模型部署中",  # 加上这个
+    "FAILED": "训练失败",
+    "UNDEPLOYED": "音频质量不达标",
+    "UNKNOWN": "状态未知"
+}
+SUCCESS_STATUSES = ("OK", "SUCCEEDED")
+FAILED_STATUSES = ("FAILED", "UNDEPLOYED")
+
+# 按 voice_id 中的子串猜测模型，越具体的放越前面
+MODEL_HINTS = [
+    ("v3.5-plus", "cosyvoice-v3.5-plus"),
+    ("v3.5-flash", "cosyvoice-v3.5-flash"),
+    ("v3-plus", "cosyvoice-v3-plus"),
+    ("v3-flash", "cosyvoice-v3-flash"),
+    ("v2", "cosyvoice-v2"),
+    ("v1", "cosyvoice-v1"),
+]
+
+
+def _noop(*args):
+    pass
+
+
+def parse_voice_list(resp):
+    # ========== 核心修复：优先处理列表格式 ==========
+    # 情况1：resp直接是列表（你的SDK返回格式）
+    if isinstance(resp, list):
+        return resp
+    # 情况2：resp是DashScopeResponse对象（官方标准格式）
+    if hasattr(resp, 'output'):
+        output = resp.output
+        if isinstance(output, dict):
+            return output.get('voice_list', [])
+        if hasattr(output, 'voice_list'):
+            return output.voice_list
+        return []
+    # 情况3：resp是字典（兼容其他格式）
+    if isinstance(resp, dict):
+        return resp.get('voice_list', [])
+    return []
+
+
+def voice_to_dict(voice):
+    return voice if isinstance(voice, dict) else voice.__dict__
+
+
+def guess_model(voice_id):
+    for hint, model in MODEL_HINTS:
+        if hint in str(voice_id):
+            return model
+    return "Unknown"
+
+
+def iter_voice_pages(api_key, page_size=PAGE_SIZE, prefetch=PREFETCH_PAGES, cancel=None):
+    """按页序产出 (page_index, voices)，拿到一页就交出一页
+
+    接口不返回总数：第 0 页满页后，后续页作为引擎的 "page" 任务（列表优先级）并行预取。
+    预取窗口从 1 页开始，每拿到一页满页加 1，最多 prefetch 页；看到不满的页后不再往后提交，
+    排队中的一并撤掉，账号音色不多时几乎没有白跑的请求。
+    cancel 置位后不再发起新的请求，以 OperationCancelled 结束。
+    """
+    def fetch(index):
+        if cancel is not None and cancel.is_set():
+            raise OperationCancelled("list")
+        return parse_voice_list(client.list_voices(api_key, page_index=index, page_size=page_size, cancel=cancel))
+
+    first = fetch(0)  # 改回0（你的SDK分页从0开始）
+    yield 0, first
+    if len(first) < page_size:
+        return
+
+    engine = get_engine()
+    pending = {}
+    next_index = 1
+    current = 1
+    last = None  # 已知不满的页中最小的页号，之后的页不必再请求
+    try:
+        while True:
+            for index, future in pending.items():
+                if future.done() and not future.exception() and len(future.result()) < page_size:
+                    last = index if last is None else min(last, index)
+            window = min(max(1, prefetch), current)
+            while len(pending) < window and (last is None or next_index <= last):
+                pending[next_index] = engine.submit("page", fetch, next_index, cancel=cancel)
+                next_index += 1
+            voices = pending.pop(current).result()
+            if cancel is not None and cancel.is_set():
+                raise OperationCancelled("list")
+            yield current, voices
+            if len(voices) < page_size:
+                return
+            current += 1
+    finally:
+        for future in pending.values():
+            future.cancel()
+
+
+def list_all_voices(api_key, page_size=PAGE_SIZE, log=_noop, on_page=None, on_error=None, cancel=None):
+    """拉取全部音色，返回列表；on_page(page_index, voices) 在每页到达时回调
+
+    中途出错或被 cancel 取消时返回已拉取到的部分，并调用 on_error(e)
+    """
+    all_voices = []
+    log("正在拉取列表 (Page 0)...")
+    try:
+        for page_index, current_page_voices in iter_voice_pages(api_key, page_size, cancel=cancel):
+            log(f"Page {page_index} 获取到 {len(current_page_voices)} 条音色数据")
+            if not current_page_voices:
+                if page_index == 0:  # 匹配你的分页起始值
+                    log("提示: 第 0 页返回为空，账号下可能没有音色。")
+                break
+            all_voices.extend(current_page_voices)
+            if on_page:
+                on_page(page_index, current_page_voices)
+    except (Exception, OperationCancelled) as e:
+        log("已取消拉取列表" if cancel is not None and cancel.is_set() else f"API 调用异常: {str(e)}")
+        if on_error:
+            on_error(e)
+    return all_voices
+
+
+def parse_voice_status(res):
+    status = "UNKNOWN"
+    output = getattr(res, 'output', None)
+    if output:
+        if isinstance(output, dict):
+            status = output.get('status', 'UNKNOWN')
+        else:
+            status = getattr(output, 'status', 'UNKNOWN')
+
+    if status == "UNKNOWN":
+        if isinstance(res, dict):
+            status = res.get('status', 'UNKNOWN')
+        else:
+            status = getattr(res, 'status', 'UNKNOWN')
+    return status
+
+
+def delete_voice(api_key, voice_id, cancel=None):
+    model = guess_model(voice_id)
+    resp = client.delete_voice(api_key, voice_id, retry=DELETE_RETRY, cancel=cancel,
+                               model=None if model == "Unknown" else model)
+    if hasattr(resp, 'status') and resp.status != 'OK':
+        raise ValueError(f"删除失败，官方返回状态: {resp.status}")
@@ -0,0 +1,1327 @@
+import os
+import sys
+import time
+from collections import deque, Counter
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
+                            QFormLayout, QLineEdit, QPushButton, QLabel, QFileDialog, 
+                            QMessageBox, QGroupBox, QTableView, QTableWidget, QTableWidgetItem, QTabWidget,
+                            QHeaderView, QProgressBar, QComboBox, QPlainTextEdit, QAbstractItemView,
+                            QSpinBox, QDoubleSpinBox, QSlider, QCheckBox)
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from PyQt5.QtGui import QFont
+
+from engine import (SynthesisCache, VoiceCatalog, list_all_voices, get_scheduler, get_engine, get_metrics,
+                    delete_voice, classify_error, FATAL, voice_to_dict, log_event, CACHE_MAX_MB, LONG_TEXT_WORKERS,
+                    AUDIO_FORMAT, OUTPUT_FORMATS, format_label, format_ext, file_filter, PreviewJob, StreamPlayer,
+                    NullSink, PREBUFFER_MS, JobQueue, synthesis_params, make_synthesis_job, JOB_DONE, JOB_FAILED,
+                    JOB_CANCELLED, BulkEnrollment, load_manifest, write_report, Speculator, SPECULATIVE_IDLE_MS,
+                    SPECULATIVE_BUDGET_CHARS, SPEC_STARTED, SPEC_BUDGET, get_profiler, CancelToken, OperationCancelled,
+                    CANCELLED_MESSAGE, get_postprocessor, postprocess_options, can_postprocess, numpy_available,
+                    describe_postprocess, voice_matches)
+from audio_output import create_sink
+from voice_table import VoiceTableModel, VoiceFilterProxy, COL_ID
+from startup import profile
+
+# ===========================
+# 样式表
+# ===========================
+STYLESHEET = """
+QMainWindow { background-color: #f5f7fa; }
+QGroupBox { border: 1px solid #e1e4e8; border-radius: 6px; margin-top: 10px; background-color: #ffffff; font-weight: bold; padding-top: 15px; }
+QGroupBox::title { subcontrol-origin: margin; left: 10px; padding: 0 5px; color: #24292e; }
+QLineEdit, QComboBox { border: 1px solid #d1d5da; border-radius: 4px; padding: 6px; }
+QLineEdit:focus { border: 1px solid #0366d6; }
+QPushButton { background-color: #0366d6; color: white; border: none; border-radius: 4px; padding: 6px 12px; font-weight: bold; }
+QPushButton:hover { background-color: #0256b9; }
+QPushButton:pressed { background-color: #024494; }
+QPushButton#DeleteBtn { background-color: #d73a49; }
+QPushButton#DeleteBtn:hover { background-color: #b92534; }
+QPushButton#RefreshBtn { background-color: #2ea44f; }
+QTableView { border: 1px solid #e1e4e8; selection-background-color: #f1f8ff; selection-color: #24292e; }
+QPlainTextEdit { background-color: #24292e; color: #e1e4e8; border-radius: 6px;
+                 font-family: Consolas; font-size: 12px; }
+QProgressBar { border: 1px solid #e1e4e8; background-color: #ffffff; text-align: center; border-radius: 3px; color: black; }
+QProgressBar::chunk { background-color: #2ea44f; border-radius: 3px; }
+"""
+
+# ===========================
+# 1. 引擎 -> 界面桥接
+# ===========================
+JOB_KIND_NAMES = {"synth": "合成", "enroll": "复刻", "delete": "删除"}
+DELETE_FLUSH_MS = 100  # 批量删除时合并表格更新的间隔
+
+
+class EngineBridge(QObject):
+    # 合成 / 试听 / 列表 / 删除 / 复刻都作为任务提交到 engine 的事件循环（见 engine/runtime.py），
+    # 引擎线程里的回调经 wrap() 包装后统一通过这一个信号，由 Qt 排队投递到主线程执行
+    call = pyqtSignal(object, object)  # 回调, 参数元组
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.call.connect(self.dispatch)
+
+    def dispatch(self, func, args):
+        profiler = get_profiler()
+        if profiler is not None and not hasattr(func, "profiled_op"):  # 槽函数本身已包装过的不再重复
+            profiler.call(f"gui.{getattr(func, '__qualname__', 'callback')}", func, *args)
+        else:
+            func(*args)
+
+    def wrap(self, func):
+        """返回可在任意线程调用的版本，func 实际在主线程执行"""
+        return lambda *args: self.call.emit(func, args)
+
+
+def task_result(result, error):
+    """把引擎任务的 (result, error) 转成 job.run() 风格的 (是否成功, 消息)"""
+    if isinstance(error, OperationCancelled):
+        return False, CANCELLED_MESSAGE
+    if error is not None:
+        return False, f"系统错误: {str(error)}"
+    return result
+
+# ===========================
+# 2. 日志控制台
+# ===========================
+LOG_MAX_LINES = 2000  # 界面上只保留最近这么多行，完整记录见事件日志文件
+LOG_FLUSH_MS = 100
+
+
+class LogConsole(QPlainTextEdit):
+    """环形缓冲的日志窗口：消息先进缓冲区，由定时器合并成一次追加"""
+
+    def __init__(self, max_lines=LOG_MAX_LINES, parent=None):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self.setMaximumBlockCount(max_lines)  # 超出后自动丢掉最早的行
+        self.pending = deque(maxlen=max_lines)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(LOG_FLUSH_MS)
+        self.timer.timeout.connect(self.flush)
+
+    def append_line(self, line):
+        self.pending.append(line)
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def flush(self):
+        if not self.pending:
+            return
+        sb = self.verticalScrollBar()
+        at_bottom = sb.value() >= sb.maximum() - 4
+        self.appendPlainText("\n".join(self.pending))
+        self.pending.clear()
+        # 用户往上翻看时不强行滚到底
+        if at_bottom:
+            sb.setValue(sb.maximum())
+
+# ===========================
+# 3. 性能指标面板
+# ===========================
+METRICS_REFRESH_MS = 2000
+METRICS_COLUMNS = [("op", "操作"), ("model", "模型"), ("count", "次数"), ("errors", "错误"), ("retries", "重试"),
+                   ("p50", "P50 (s)"), ("p95", "P95 (s)"), ("ttfb_p50", "首包 P50 (s)"),
+                   ("avg_bytes", "平均大小 (KB)"), ("chars_per_sec", "字/秒")]
+
+
+class MetricsPanel(QWidget):
+    """按 (操作, 模型) 汇总上游调用指标，定时刷新；可导出 Prometheus textfile / JSON"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.table = QTableWidget(0, len(METRICS_COLUMNS))
+        self.table.setHorizontalHeaderLabels([title for _, title in METRICS_COLUMNS])
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+
+        btns = QHBoxLayout()
+        btn_export = QPushButton("导出...")
+        btn_export.clicked.connect(self.action_export)
+        btn_reset = QPushButton("清零")
+        btn_reset.clicked.connect(self.action_reset)
+        btns.addStretch()
+        btns.addWidget(btn_reset)
+        btns.addWidget(btn_export)
+        layout.addWidget(self.table)
+        layout.addLayout(btns)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(METRICS_REFRESH_MS)
+        self.timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        # 只在面板可见时刷新
+        self.refresh()
+        self.timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
+
+    @staticmethod
+    def format_cell(key, value):
+        if value is None:
+            return "-"
+        if key == "avg_bytes":
+            return f"{value / 1024:.1f}"
+        if key in ("p50", "p95", "ttfb_p50"):
+            return f"{value:.3f}"
+        if key == "chars_per_sec":
+            return f"{value:.1f}"
+        return str(value)
+
+    def refresh(self):
+        rows = get_metrics().summary()
+        self.table.setRowCount(len(rows))
+        for i, row in enumerate(rows):
+            for j, (key, _) in enumerate(METRICS_COLUMNS):
+                self.table.setItem(i, j, QTableWidgetItem(self.format_cell(key, row[key])))
+
+    def action_export(self):
+        path, _ = QFileDialog.getSaveFileName(self, "导出指标", "cosyvoice_metrics.prom",
+                                              "Prometheus textfile (*.prom);;JSON (*.json)")
+        if not path:
+            return
+        try:
+            get_metrics().export(path)
+        except OSError as e:
+            QMessageBox.critical(self, "错误", f"导出失败: {str(e)}")
+            return
+        QMessageBox.information(self, "成功", f"指标已导出至:\n{path}")
+
+    def action_reset(self):
+        get_metrics().reset()
+        self.refresh()
+
+# ===========================
+# 4. 主窗口
+# ===========================
+class VoiceEnrollmentApp(QMainWindow):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("阿里云 CosyVoice 声音复刻工具  by Gao_xiaohai")
+        self.resize(1100, 850)
+        self.setStyleSheet(STYLESHEET)
+        
+        self.current_voice_id = None
+        self.current_model = None
+        self.cache = None              # 合成结果磁盘缓存
+        self.catalog = None            # 本地音色目录
+        self.enroll_progress = {}      # 进行中的复刻任务: 标签 -> 进度
+        self.jobs = None               # 持久化任务队列，崩溃 / 关闭后可继续
+        self.panels_ready = False
+        self.resume_checked = set()    # 已检查过未完成任务的 API Key
+        self.bridge = EngineBridge(self)  # 引擎回调回到主线程的唯一通道
+        self.tasks = {}                # 进行中的引擎任务: 名称 -> Future，同类任务不会互相覆盖
+        self.tokens = {}               # 可取消的任务: 名称 -> CancelToken（删除、复刻另有各自的取消入口）
+        self.delete_cancel = None
+        self.delete_removed = []       # 已删掉、还没从表格 / 目录中移除的音色，定时合并成一次移除
+        self.delete_flush = QTimer(self)
+        self.delete_flush.setSingleShot(True)
+        self.delete_flush.setInterval(DELETE_FLUSH_MS)
+        self.delete_flush.timeout.connect(self.flush_deleted)
+        self.bulk = None               # 进行中的清单批量复刻
+        self.preview_player = None
+        self.audio_sink = None         # 声卡输出，第一次试听时创建
+        self.speculator = None         # 推测合成：输入停顿后预先合成进缓存
+        self.spec_budget_warned = False
+        
+        if get_profiler() is not None:
+            self.install_profiling(get_profiler())
+
+        # 冷启动：这里只搭窗口外壳（API 配置 + 日志），先让窗口显示出来；
+        # 其余面板和本地数据（缓存索引、音色目录、任务队列）在首帧之后由 finish_startup 补上
+        with profile.phase("搭建窗口外壳"):
+            self.init_ui()
+
+    def install_profiling(self, profiler):
+        # 剖析模式：槽函数（按钮、信号、引擎回调）都换成剖析版本，必须在连接信号之前替换
+        for name in dir(type(self)):
+            if name.startswith(("action_", "on_")) and callable(getattr(type(self), name)):
+                setattr(self, name, profiler.wrap(f"gui.{name}", getattr(self, name), trim_args=True))
+
+    def finish_startup(self):
+        if self.panels_ready:
+            return
+        self.panels_ready = True
+        with profile.phase("构建其余面板"):
+            self.build_panels()
+        with profile.phase("载入本地数据"):
+            self.cache = SynthesisCache()
+            self.catalog = VoiceCatalog()
+            self.jobs = JobQueue()
+            self.speculator = Speculator(self.cache, budget_chars=self.spin_spec_budget.value())
+            self.update_spec_label()
+            self.spin_cache.valueChanged.connect(lambda v: self.cache.set_max_bytes(v * 1024 * 1024))
+            self.cache.set_max_bytes(self.spin_cache.value() * 1024 * 1024)
+            self.log("程序已就绪。")
+            self.log(f"合成缓存目录: {self.cache.cache_dir} ({len(self.cache.entries)} 条)")
+            self.load_catalog()
+
+    def load_catalog(self):
+        # 启动时先用本地目录填表，点"刷新列表"再与云端比对
+        rows = self.catalog.last_account_rows()
+        self.voice_model.reset((row['voice_id'], row['status'], row['target_model']) for row in rows)
+        if rows:
+            synced = time.strftime('%Y-%m-%d %H:%M', time.localtime(max(r['last_seen'] or 0 for r in rows)))
+            self.log(f"已从本地目录载入 {len(rows)} 个音色（上次同步 {synced}）")
+
+    def init_ui(self):
+        central = QWidget()
+        self.setCentralWidget(central)
+        layout = QHBoxLayout(central)
+        layout.setContentsMargins(15, 15, 15, 15)
+        
+        # --- 左侧面板 ---
+        self.left = QVBoxLayout()
+        
+        # 1. API 配置（新增：显示/隐藏API Key按钮）
+        group1 = QGroupBox("1. API 配置")
+        f1 = QFormLayout()
+        self.api_input = QLineEdit()
+        self.api_input.setPlaceholderText("填写你的API Key")
+        self.api_input.setEchoMode(QLineEdit.Password)
+        self.api_input.editingFinished.connect(self.resume_jobs)  # 填好 Key 后检查上次未完成的任务
+        
+        # 新增：显示/隐藏按钮
+        self.show_api_btn = QPushButton("显示")
+        self.show_api_btn.setCheckable(True)
+        self.show_api_btn.clicked.connect(self.toggle_api_visibility)
+        
+        # 新增：水平布局放输入框和按钮
+        api_layout = QHBoxLayout()
+        api_layout.addWidget(self.api_input)
+        api_layout.addWidget(self.show_api_btn)
+        
+        self.model_combo = QComboBox()
+        self.model_combo.addItems(["cosyvoice-v3.5-plus", "cosyvoice-v3.5-flash", "cosyvoice-v3-plus", "cosyvoice-v3-flash", "cosyvoice-v2", "cosyvoice-v1"])
+        self.model_combo.setCurrentText("cosyvoice-v3.5-plus")
+        f1.addRow("API Key:", api_layout)  # 替换原有行
+        f1.addRow("使用模型:", self.model_combo)
+        
+        # 合成缓存容量上限，0 表示不再写入缓存
+        self.spin_cache = QSpinBox()
+        self.spin_cache.setRange(0, 100000)
+        self.spin_cache.setSuffix(" MB")
+        self.spin_cache.setValue(CACHE_MAX_MB)
+        f1.addRow("缓存上限:", self.spin_cache)
+        group1.setLayout(f1)
+        self.left.addWidget(group1)
+
+        # --- 右侧日志 ---
+        right = QVBoxLayout()
+        self.logs = LogConsole()
+        self.pbar = QProgressBar()
+        self.pbar.setValue(0)
+        # 一键取消全部进行中的任务
+        self.btn_cancel = QPushButton("取消任务")
+        self.btn_cancel.setObjectName("DeleteBtn")
+        self.btn_cancel.clicked.connect(self.action_cancel)
+        bar = QHBoxLayout()
+        bar.addWidget(self.pbar)
+        bar.addWidget(self.btn_cancel)
+        
+        # 性能指标面板第一次切换过去时才创建
+        self.metrics_panel = None
+        self.tabs = QTabWidget()
+        self.tabs.addTab(self.logs, "运行日志")
+        self.tabs.addTab(QWidget(), "性能指标")
+        self.tabs.currentChanged.connect(self.on_tab_changed)
+        right.addWidget(self.tabs)
+        right.addLayout(bar)
+        
+        layout.addLayout(self.left, 6)
+        layout.addLayout(right, 4)
+
+    def build_panels(self):
+        # 2. 复刻操作
+        group2 = QGroupBox("2. 新建音色")
+        f2 = QFormLayout()
+        self.url_input = QLineEdit()
+        self.url_input.setPlaceholderText("http://... (wav/mp3)")
+        self.name_input = QLineEdit()
+        self.name_input.setPlaceholderText("英文/数字前缀 (如 myvoice)")
+        self.btn_enroll = QPushButton("开始复刻音色")
+        self.btn_enroll.setCursor(Qt.PointingHandCursor)
+        self.btn_enroll.clicked.connect(self.action_enroll)
+        f2.addRow("音频 URL:", self.url_input)
+        f2.addRow("音色名称:", self.name_input)
+        f2.addRow(self.btn_enroll)
+        self.btn_bulk_enroll = QPushButton("从清单批量复刻...")
+        self.btn_bulk_enroll.setToolTip("清单字段: audio_url, prefix, model, language_hints（.csv / .jsonl）")
+        self.btn_bulk_enroll.clicked.connect(self.action_bulk_enroll)
+        f2.addRow(self.btn_bulk_enroll)
+        group2.setLayout(f2)
+        
+        # 3. 音色列表
+        group3 = QGroupBox("3. 音色列表")
+        v3 = QVBoxLayout()
+        # 搜索 / 筛选
+        filters = QHBoxLayout()
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("搜索音色ID（以 ^ 开头为前缀匹配）")
+        self.search_input.textChanged.connect(self.apply_voice_filter)
+        self.status_filter = QComboBox()
+        self.status_filter.addItem("全部状态", "")
+        self.status_filter.currentIndexChanged.connect(self.apply_voice_filter)
+        self.model_filter = QComboBox()
+        self.model_filter.addItem("全部模型", "")
+        self.model_filter.currentIndexChanged.connect(self.apply_voice_filter)
+        self.lbl_count = QLabel("0 个")
+        filters.addWidget(self.search_input, 1)
+        filters.addWidget(self.status_filter)
+        filters.addWidget(self.model_filter)
+        filters.addWidget(self.lbl_count)
+
+        # 列表用 Model/View：按列存储 + 按需加载，数据量大时也不卡
+        self.voice_model = VoiceTableModel(self)
+        self.voice_model.names_changed.connect(self.update_filter_options)
+        self.voice_proxy = VoiceFilterProxy(self)
+        self.voice_proxy.setSourceModel(self.voice_model)
+        for model in (self.voice_model, self.voice_proxy):
+            for signal in (model.rowsInserted, model.rowsRemoved, model.modelReset, model.layoutChanged):
+                signal.connect(self.update_voice_count)
+        self.table = QTableView()
+        self.table.setModel(self.voice_proxy)
+        self.table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)  # 默认保持云端顺序
+        self.table.setSortingEnabled(True)
+        # 设置各列的宽度策略
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)  # 音色ID拉伸
+        self.table.setColumnWidth(1, 150)  # 模型列固定宽度
+        self.table.setColumnWidth(2, 80)   # 状态列固定宽度
+        self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeToContents)  # 第二列根据内容调整
+        self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeToContents)  # 第三列根据内容调整
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.table.verticalHeader().setVisible(False)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.clicked.connect(self.action_table_click)
+        self.table.horizontalHeader().setMinimumSectionSize(80)
+        
+        btns = QHBoxLayout()
+        self.btn_refresh = QPushButton("刷新列表")
+        self.btn_refresh.setObjectName("RefreshBtn")
+        self.btn_refresh.setCursor(Qt.PointingHandCursor)
+        self.btn_refresh.clicked.connect(self.action_refresh)
+        
+        self.btn_use = QPushButton("使用选中")
+        self.btn_use.clicked.connect(self.action_use)
+        
+        self.btn_del = QPushButton("删除选中")
+        self.btn_del.setObjectName("DeleteBtn")
+        self.btn_del.clicked.connect(self.action_delete)
+        
+        btns.addWidget(self.btn_refresh)
+        btns.addStretch()
+        btns.addWidget(self.btn_use)
+        btns.addWidget(self.btn_del)
+        v3.addLayout(filters)
+        v3.addWidget(self.table)
+        v3.addLayout(btns)
+        group3.setLayout(v3)
+        
+        # 4. 语音合成
+        group4 = QGroupBox("4. 语音合成")
+        v4 = QVBoxLayout()
+        
+        self.lbl_info = QLabel("当前状态: 未选择音色")
+        self.lbl_info.setStyleSheet("color: #666; font-weight: bold;")
+        v4.addWidget(self.lbl_info)
+        
+        # --- A. 音量调节 (0-100) ---
+        h_vol = QHBoxLayout()
+        h_vol.addWidget(QLabel("音量:"))
+        
+        # 1. 音量滑块
+        self.slider_vol = QSlider(Qt.Horizontal)
+        self.slider_vol.setRange(0, 100)
+        self.slider_vol.setValue(50)
+        
+        # 2. 音量数字框
+        self.spin_vol = QSpinBox()
+        self.spin_vol.setRange(0, 100)
+        self.spin_vol.setValue(50)
+        self.spin_vol.setFixedWidth(60)
+        
+        # 3. 双向绑定信号
+        # 滑块动 -> 数字变
+        self.slider_vol.valueChanged.connect(self.spin_vol.setValue)
+        # 数字变 -> 滑块动
+        self.spin_vol.valueChanged.connect(self.slider_vol.setValue)
+        
+        h_vol.addWidget(self.slider_vol)
+        h_vol.addWidget(self.spin_vol)
+        v4.addLayout(h_vol)
+        
+        # --- B. 语速调节 (0.5 - 2.0) ---
+        # 技巧: QSlider只支持整数，我们将范围设为 5-20 (代表 0.5-2.0)
+        h_speed = QHBoxLayout()
+        h_speed.addWidget(QLabel("语速:"))
+        
+        # 1. 语速滑块 (5 - 20)
+        self.slider_speed = QSlider(Qt.Horizontal)
+        self.slider_speed.setRange(5, 20) 
+        self.slider_speed.setValue(10) # 默认 1.0
+        
+        # 2. 语速数字框 (0.5 - 2.0)
+        self.spin_speed = QDoubleSpinBox()
+        self.spin_speed.setRange(0.5, 2.0)
+        self.spin_speed.setSingleStep(0.1)
+        self.spin_speed.setValue(1.0)
+        self.spin_speed.setFixedWidth(60)
+        
+        # 3. 双向绑定信号 (需要数值转换)
+        # 滑块(int) -> 除以10 -> 数字框(float)
+        self.slider_speed.valueChanged.connect(lambda v: self.spin_speed.setValue(v / 10.0))
+        # 数字框(float) -> 乘以10 -> 滑块(int)
+        self.spin_speed.valueChanged.connect(lambda v: self.slider_speed.setValue(int(v * 10)))
+        
+        h_speed.addWidget(self.slider_speed)
+        h_speed.addWidget(self.spin_speed)
+        v4.addLayout(h_speed)
+        
+        # --- C. 文本与路径输入 (保持不变) ---
+        self.txt_input = QLineEdit()
+        self.txt_input.setPlaceholderText("请输入要合成的文本...")
+        v4.addWidget(self.txt_input)
+        
+        # 输出格式：MP3 / WAV / PCM / Opus，WAV 由本地边写边生成文件头
+        self.format_combo = QComboBox()
+        for name in OUTPUT_FORMATS:
+            self.format_combo.addItem(format_label(name), name)
+        self.format_combo.setCurrentIndex(self.format_combo.findData(AUDIO_FORMAT))
+        self.format_combo.currentIndexChanged.connect(self.on_format_changed)
+        h_format = QHBoxLayout()
+        h_format.addWidget(QLabel("输出格式:"))
+        h_format.addWidget(self.format_combo, 1)
+        v4.addLayout(h_format)
+
+        h_path = QHBoxLayout()
+        self.path_input = QLineEdit()
+        self.path_input.setPlaceholderText("保存路径...")
+        btn_path = QPushButton("选择路径")
+        btn_path.clicked.connect(self.action_path)
+        h_path.addWidget(self.path_input)
+        h_path.addWidget(btn_path)
+        v4.addLayout(h_path)
+        
+        # 流式合成：边接收边写入，实时显示首包耗时与接收字节数
+        self.chk_stream = QCheckBox("流式合成 (边接收边写入)")
+        self.chk_stream.setChecked(True)
+        
+        # 长文本（超过单段长度）自动切分，按此并发数同时合成
+        self.spin_workers = QSpinBox()
+        self.spin_workers.setRange(1, 16)
+        self.spin_workers.setValue(LONG_TEXT_WORKERS)
+        self.spin_workers.setFixedWidth(60)
+        
+        h_opts = QHBoxLayout()
+        h_opts.addWidget(self.chk_stream)
+        h_opts.addStretch()
+        h_opts.addWidget(QLabel("长文本并发:"))
+        h_opts.addWidget(self.spin_workers)
+        v4.addLayout(h_opts)
+
+        # 后处理：去首尾静音 + 响度归一（NumPy，独立进程池），只支持 WAV / PCM
+        self.chk_post = QCheckBox("后处理 (去静音 / 响度归一)")
+        self.combo_norm = QComboBox()
+        self.combo_norm.addItem("峰值归一", "peak")
+        self.combo_norm.addItem("RMS 归一", "rms")
+        self.combo_norm.addItem("不归一", None)
+        self.post_ready = numpy_available()
+        h_post = QHBoxLayout()
+        h_post.addWidget(self.chk_post)
+        h_post.addStretch()
+        h_post.addWidget(self.combo_norm)
+        v4.addLayout(h_post)
+        self.update_post_options()
+
+        # 试听：攒够这么多音频再开始播放，网络抖动大时调高
+        self.spin_prebuffer = QSpinBox()
+        self.spin_prebuffer.setRange(0, 3000)
+        self.spin_prebuffer.setSingleStep(50)
+        self.spin_prebuffer.setSuffix(" ms")
+        self.spin_prebuffer.setValue(PREBUFFER_MS)
+        self.spin_prebuffer.setFixedWidth(90)
+        
+        self.btn_gen = QPushButton("开始合成音频")
+        self.btn_gen.setCursor(Qt.PointingHandCursor)
+        self.btn_gen.setStyleSheet("QPushButton { font-weight: bold; padding: 5px; }")
+        self.btn_gen.clicked.connect(self.action_gen)
+        self.btn_preview = QPushButton("试听")
+        self.btn_preview.setCursor(Qt.PointingHandCursor)
+        self.btn_preview.clicked.connect(self.action_preview)
+        h_gen = QHBoxLayout()
+        h_gen.addWidget(self.btn_gen, 1)
+        h_gen.addWidget(QLabel("预缓冲:"))
+        h_gen.addWidget(self.spin_prebuffer)
+        h_gen.addWidget(self.btn_preview)
+        v4.addLayout(h_gen)
+
+        # 推测合成：文本 / 音色 / 音量 / 语速停下来一段时间后先在后台合成进缓存，点“开始合成”时直接写出
+        self.chk_speculate = QCheckBox("输入停顿后预合成")
+        self.chk_speculate.setToolTip("预合成消耗调用额度，按本次运行的字数上限封顶")
+        self.chk_speculate.toggled.connect(self.schedule_speculation)
+        self.spin_spec_idle = QSpinBox()
+        self.spin_spec_idle.setRange(300, 10000)
+        self.spin_spec_idle.setSingleStep(100)
+        self.spin_spec_idle.setSuffix(" ms")
+        self.spin_spec_idle.setValue(SPECULATIVE_IDLE_MS)
+        self.spin_spec_idle.setFixedWidth(90)
+        self.spin_spec_budget = QSpinBox()
+        self.spin_spec_budget.setRange(0, 1000000)
+        self.spin_spec_budget.setSingleStep(500)
+        self.spin_spec_budget.setSuffix(" 字")
+        self.spin_spec_budget.setValue(SPECULATIVE_BUDGET_CHARS)
+        self.spin_spec_budget.setFixedWidth(100)
+        self.spin_spec_budget.valueChanged.connect(self.on_spec_budget_changed)
+        self.lbl_spec = QLabel("")
+        h_spec = QHBoxLayout()
+        h_spec.addWidget(self.chk_speculate)
+        h_spec.addWidget(QLabel("停顿:"))
+        h_spec.addWidget(self.spin_spec_idle)
+        h_spec.addWidget(QLabel("上限:"))
+        h_spec.addWidget(self.spin_spec_budget)
+        h_spec.addWidget(self.lbl_spec, 1)
+        v4.addLayout(h_spec)
+
+        # 任一参数变化都重新计时（去抖），停够 spin_spec_idle 才预合成
+        self.spec_timer = QTimer(self)
+        self.spec_timer.setSingleShot(True)
+        self.spec_timer.timeout.connect(self.speculate)
+        self.txt_input.textChanged.connect(self.schedule_speculation)
+        self.spin_vol.valueChanged.connect(self.schedule_speculation)
+        self.spin_speed.valueChanged.connect(self.schedule_speculation)
+        self.format_combo.currentIndexChanged.connect(self.schedule_speculation)
+        
+        group4.setLayout(v4)
+        
+        self.left.addWidget(group2)
+        self.left.addWidget(group3)
+        self.left.addWidget(group4)
+
+    def on_tab_changed(self, index):
+        if index != 1 or self.metrics_panel is not None:
+            return
+        with profile.phase("构建指标面板"):
+            self.metrics_panel = MetricsPanel()
+            self.tabs.blockSignals(True)
+            self.tabs.removeTab(1)
+            self.tabs.insertTab(1, self.metrics_panel, "性能指标")
+            self.tabs.setCurrentIndex(1)
+            self.tabs.blockSignals(False)
+
+    # 新增：API Key显示/隐藏切换
+    def toggle_api_visibility(self):
+        if self.show_api_btn.isChecked():
+            self.api_input.setEchoMode(QLineEdit.Normal)
+            self.show_api_btn.setText("隐藏")
+        else:
+            self.api_input.setEchoMode(QLineEdit.Password)
+            self.show_api_btn.setText("显示")
+
+    # --- 辅助方法 ---
+    def log(self, m, level="INFO", op=None, voice_id=None, **fields):
+        t = time.strftime('%H:%M:%S')
+        self.logs.append_line(f"[{t}] {m}")
+        log_event(m, level, op=op, voice_id=voice_id, **fields)
+
+    # --- 槽函数 ---
+    def resume_jobs(self):
+        """该账号上次有未完成的任务（程序关闭或崩溃）时询问是否继续"""
+        key = self.api_input.text().strip()
+        if not key or key in self.resume_checked:
+            return
+        self.finish_startup()  # 极少数情况下面板还没建好就填完了 Key
+        self.resume_checked.add(key)
+        jobs = self.jobs.unfinished(key)
+        if not jobs:
+            return
+        counts = Counter(job['kind'] for job in jobs)
+        summary = "、".join(f"{JOB_KIND_NAMES.get(kind, kind)} {n} 个" for kind, n in counts.items())
+        if QMessageBox.question(self, "恢复任务", f"上次有未完成的任务：{summary}\n是否继续执行？") != QMessageBox.Yes:
+            for job in jobs:
+                self.jobs.finish(job['id'], JOB_CANCELLED)
+            self.log(f"已放弃上次未完成的任务：{summary}", op="resume")
+            return
+
+        self.log(f"继续上次未完成的任务：{summary}", op="resume", **counts)
+        deletes, enrolls = [], []
+        for job in jobs:
+            params = job['params']
+            if job['kind'] == "synth":
+                # 输出是原子改名的，重新合成即可；结果只记日志，不逐个弹窗。
+                # 按后台任务排队（"batch"），不占交互合成的名额
+                name = f"resume-{job['id']}"
+                self.tokens[name] = CancelToken()
+                self.submit_synth_job(
+                    key, job['id'], params, progress=lambda v, m: None,
+                    finished=self.bridge.wrap(
+                        lambda success, msg, name=name: self.on_resumed_synth_finished(name, success, msg)),
+                    cancel=self.tokens[name], op="batch")
+            elif job['kind'] == "enroll" and job['voice_id']:
+                # 已拿到 voice_id 的接着轮询
+                self.enroll_progress[job['voice_id']] = 0
+                self.submit_enroll_job(key, job['id'], params, voice_id=job['voice_id'])
+            elif job['kind'] == "enroll":
+                enrolls.append(job)
+            elif job['kind'] == "delete":
+                deletes.append((job['id'], params["voice_id"]))
+        if enrolls:
+            # 没记下 voice_id 的复刻可能已被云端受理（记录前崩溃），先按前缀 + 模型查账号里的音色，
+            # 与清单批量复刻的去重规则相同；查不到才重新提交
+            get_engine().submit("list", self.fetch_all_voices, key,
+                                on_done=self.bridge.wrap(
+                                    lambda voices, error: self.on_resume_enrolls(key, enrolls, voices, error)))
+        if deletes:
+            if self.delete_cancel is not None:
+                self.log(f"有删除正在进行，{len(deletes)} 个待删除的音色留到下次", "WARNING", op="resume")
+            else:
+                self.submit_delete_jobs(key, deletes)
+
+    @staticmethod
+    def fetch_all_voices(key):
+        # 拉取不完整时报错：宁可不提交，也不重复复刻
+        errors = []
+        voices = list_all_voices(key, on_error=errors.append)
+        if errors:
+            raise errors[0]
+        return voices
+
+    def on_resume_enrolls(self, key, jobs, voices, error):
+        for job in jobs:
+            params = job['params']
+            if error is not None:
+                msg = f"获取已有音色失败，未重新提交: {error}"
+                self.jobs.finish(job['id'], JOB_FAILED, msg)
+                self.log(f"[恢复] 复刻 {params['voice_name']} {msg}", "ERROR", op="enroll")
+                continue
+            existing = next((voice_to_dict(v)['voice_id'] for v in voices
+                             if voice_matches(v, params["voice_name"], params["model"])), None)
+            if existing:
+                self.jobs.attach(job['id'], existing)
+                self.log(f"[恢复] 账号中已有 {existing}，接着跟踪，不再重新提交", op="enroll", voice_id=existing)
+            self.enroll_progress[existing or params["voice_name"]] = 0
+            self.submit_enroll_job(key, job['id'], params, voice_id=existing)
+
+    def on_resumed_synth_finished(self, name, success, msg):
+        self.tokens.pop(name, None)
+        level = "INFO" if success else "WARNING" if msg == CANCELLED_MESSAGE else "ERROR"
+        self.log(f"[恢复] 合成{'完成' if success else '未完成'}: {msg}", level, op="synth")
+
+    def action_cancel(self):
+        """取消全部进行中的任务：合成 / 试听 / 刷新 / 删除 / 复刻轮询 / 批量复刻 / 预合成"""
+        if not self.panels_ready:
+            # 按钮在窗口外壳里，面板还没建好时就能点到；这时还不可能有任务
+            self.log("没有进行中的任务", op="cancel")
+            return
+        names = list(self.tokens)
+        for name in names:
+            self.tokens[name].cancel()
+        if self.delete_cancel is not None:
+            self.delete_cancel.cancel()
+            self.btn_del.setEnabled(False)
+            names.append("delete")
+        if self.bulk is not None:
+            self.bulk.cancel()
+            names.append("bulk")
+        polls = get_scheduler().cancel_all()
+        if self.speculator is not None:
+            self.speculator.cancel()
+        self.stop_preview()
+        if not names and not polls:
+            self.log("没有进行中的任务", op="cancel")
+            return
+        self.log(f"已请求取消: {', '.join(names) or '-'}，停止跟踪 {polls} 个复刻任务；进行中的请求中止后结束",
+                 "WARNING", op="cancel", tasks=len(names), polls=polls)
+
+    def action_refresh(self):
+        key = self.api_input.text().strip()
+        if not key:
+            QMessageBox.warning(self, "提示", "请先填写 API Key")
+            return
+            
+        if "refresh" in self.tasks:
+            return
+        self.btn_refresh.setEnabled(False)
+        self.btn_refresh.setText("刷新中...")
+        # 不清空表格：已有行原地更新、新音色追加，刷新期间选中项保持不变
+        self.refresh_seen = set()
+        self.refresh_started = time.time()
+
+        cancel = self.tokens["refresh"] = CancelToken()
+
+        def fetch():
+            errors = []
+            voices = list_all_voices(key, log=self.bridge.wrap(lambda m: self.log(m, op="refresh")),
+                                     on_page=self.bridge.wrap(self.on_refresh_page), on_error=errors.append,
+                                     cancel=cancel)
+            return voices, not errors
+
+        self.tasks["refresh"] = get_engine().submit(
+            "list", fetch, cancel=cancel,
+            on_done=self.bridge.wrap(lambda result, error: self.on_refresh_done(key, result, error)))
+
+    def on_refresh_page(self, page_index, voices):
+        items = []
+        for v in voices:
+            v_dict = voice_to_dict(v)
+            v_id = str(v_dict.get('voice_id', 'Unknown'))
+            self.refresh_seen.add(v_id)
+            items.append((v_id, v_dict.get('status', 'Unknown'), v_dict.get('target_model')))
+        self.voice_model.upsert_many(items)
+        self.update_voice_count()  # 新行可能还没交付给视图，总数要单独刷新
+
+    def apply_voice_filter(self):
+        self.voice_proxy.set_filters(self.search_input.text(), self.status_filter.currentData(),
+                                     self.model_filter.currentData())
+        # 筛选要覆盖全部音色，而不只是已加载的部分
+        self.voice_model.set_eager(self.voice_proxy.is_filtering())
+        self.update_voice_count()
+
+    def update_filter_options(self):
+        for combo, names in ((self.status_filter, self.voice_model.status_names),
+                             (self.model_filter, self.voice_model.model_names)):
+            known = {combo.itemData(i) for i in range(combo.count())}
+            for name in sorted(set(names) - known):
+                combo.addItem(name, name)
+
+    def update_voice_count(self, *args):
+        total = self.voice_model.count()
+        shown = self.voice_proxy.rowCount()
+        if self.voice_proxy.is_filtering():
+            self.lbl_count.setText(f"{shown} / {total} 个")
+        else:
+            self.lbl_count.setText(f"{total} 个")
+
+    def selected_voices(self):
+        """当前选中的 (voice_id, 模型, 状态) 列表"""
+        rows = self.table.selectionModel().selectedRows(COL_ID)
+        return [self.voice_model.record(self.voice_proxy.mapToSource(index).row()) for index in rows]
+
+    def on_refresh_done(self, api_key, result, error):
+        self.tasks.pop("refresh", None)
+        self.tokens.pop("refresh", None)
+        self.btn_refresh.setEnabled(True)
+        self.btn_refresh.setText("刷新列表")
+        voices, complete = result if error is None else ([], False)
+
+        # 拉取全部成功后才同步目录、删掉已不存在的行；中途出错则保留旧行，避免误删
+        if complete:
+            inserted, updated, removed = self.catalog.sync(api_key, voices)
+            self.voice_model.upsert_many((row['voice_id'], row['status'], row['target_model'])
+                                         for row in inserted + updated)
+            # 表里可能还有别的账号的行（启动时载入的），一并按本次列表清掉
+            self.voice_model.remove([v_id for v_id in self.voice_model.ids if v_id not in self.refresh_seen])
+            self.log(f"刷新完成，共 {len(voices)} 条记录（新增 {len(inserted)}，变更 {len(updated)}，移除 {len(removed)}）。",
+                     op="refresh", elapsed=time.time() - self.refresh_started, count=len(voices),
+                     inserted=len(inserted), updated=len(updated), removed=len(removed))
+        else:
+            self.log(f"刷新未完成，已获取 {len(voices)} 条记录，未同步的行保留原样。", "WARNING",
+                     op="refresh", elapsed=time.time() - self.refresh_started, count=len(voices))
+
+    def action_enroll(self):
+        key = self.api_input.text().strip()
+        url = self.url_input.text().strip()
+        name = self.name_input.text().strip()
+        
+        if not key:
+            QMessageBox.warning(self, "参数缺失", "请填写 API Key")
+            return
+        if not url:
+            QMessageBox.warning(self, "参数缺失", "请填写音频 URL")
+            return
+        if not name:
+            QMessageBox.warning(self, "参数缺失", "请填写音色名称 (prefix)")
+            return
+
+        # 可以连续提交多个复刻任务，由同一个调度器并行跟踪
+        self.enroll_progress[name] = 0
+        params = {"audio_url": url, "voice_name": name, "model": self.model_combo.currentText()}
+        self.submit_enroll_job(key, self.jobs.add(key, "enroll", params), params)
+        self.log(f"[{name}] 已加入复刻队列，当前进行中 {len(self.enroll_progress)} 个", op="enroll", label=name)
+
+    def action_bulk_enroll(self):
+        key = self.api_input.text().strip()
+        if not key:
+            QMessageBox.warning(self, "参数缺失", "请填写 API Key")
+            return
+        path, _ = QFileDialog.getOpenFileName(self, "选择复刻清单", "", "清单 (*.csv *.jsonl)")
+        if not path:
+            return
+        try:
+            rows = load_manifest(path)
+        except (OSError, ValueError) as e:
+            QMessageBox.critical(self, "失败", f"读取清单失败: {e}")
+            return
+
+        # 去重与并发控制都在 engine 中完成；报告与命令行 enroll 子命令格式相同
+        report_path = os.path.splitext(path)[0] + '.enroll.jsonl'
+        finished = self.bridge.wrap(self.on_bulk_enroll_finished)
+
+        def on_finished(results):
+            write_report(results, report_path)
+            finished(results, report_path)
+
+        self.btn_bulk_enroll.setEnabled(False)
+        self.bulk_started = time.time()
+        self.log(f"--- 批量复刻 {os.path.basename(path)}，共 {len(rows)} 行 ---", op="enroll", count=len(rows))
+        self.bulk = BulkEnrollment(
+            key, rows, self.jobs, default_model=self.model_combo.currentText(),
+            on_row=self.bridge.wrap(lambda result: self.on_bulk_enroll_row(key, result)),
+            on_progress=self.bridge.wrap(
+                lambda result, percent, msg: self.log(f"[{result['prefix']}] {msg}", "DEBUG", op="enroll")),
+            on_finished=on_finished).start()
+
+    def on_bulk_enroll_row(self, api_key, result):
+        if result['status'] == 'enrolled':
+            row = self.catalog.upsert(api_key, result['voice_id'], "OK", result['model'])
+            self.voice_model.upsert(row['voice_id'], row['status'], row['target_model'])
+        level = "ERROR" if result['status'] in ('failed', 'invalid') else "INFO"
+        self.log(f"清单第 {result['row']} 行 [{result['prefix']}] {result['status']} {result['voice_id'] or ''} "
+                 f"{result['message']}", level, op="enroll", voice_id=result['voice_id'], row=result['row'],
+                 status=result['status'])
+
+    def on_bulk_enroll_finished(self, results, report_path):
+        self.bulk = None
+        self.btn_bulk_enroll.setEnabled(True)
+        counts = Counter(result['status'] for result in results)
+        summary = "，".join(f"{status} {n}" for status, n in sorted(counts.items()))
+        self.log(f"--- 批量复刻结束：{summary}，报告已写入 {report_path} ---", op="enroll",
+                 elapsed=time.time() - self.bulk_started, **counts)
+        QMessageBox.information(self, "批量复刻完成", f"{summary}\n报告: {report_path}")
+
+    def submit_enroll_job(self, key, job_id, params, voice_id=None):
+        # 受理后立即记下 voice_id（引擎线程中直接写库，不经主线程），重启后按它继续轮询
+        finished = self.bridge.wrap(self.on_enroll_finished)
+
+        def on_finished(ticket, success, msg):
+            state = JOB_DONE if success else JOB_CANCELLED if ticket.cancel.is_set() else JOB_FAILED
+            self.jobs.finish(job_id, state, msg)
+            finished(ticket, success, msg)
+
+        self.jobs.start(job_id)
+        callbacks = dict(on_progress=self.bridge.wrap(self.on_enroll_progress), on_finished=on_finished)
+        if voice_id:
+            return get_scheduler().track(key, voice_id, params["model"], **callbacks)
+        return get_scheduler().enroll(key, params["audio_url"], params["voice_name"], params["model"],
+                                      language_hints=params.get("language_hints"),
+                                      on_submitted=lambda ticket: self.jobs.attach(job_id, ticket.voice_id),
+                                      **callbacks)
+
+    def on_enroll_progress(self, ticket, percent, msg):
+        label = ticket.voice_name or ticket.voice_id
+        self.enroll_progress[label] = percent
+        # 多个任务并行时，进度条显示最慢的那个
+        self.pbar.setValue(min(self.enroll_progress.values()))
+        self.log(f"[{label}] {msg}", op="enroll", label=label, percent=percent)
+
+    def on_enroll_finished(self, ticket, success, msg):
+        self.enroll_progress.pop(ticket.voice_name or ticket.voice_id, None)
+        if ticket.voice_id:
+            # 直接写入本地目录和表格，不再整表刷新（训练失败的音色云端同样存在）
+            row = self.catalog.upsert(ticket.api_key, ticket.voice_id, ticket.status, ticket.model)
+            self.voice_model.upsert(row['voice_id'], row['status'], row['target_model'])
+        self.pbar.setValue(min(self.enroll_progress.values()) if self.enroll_progress else (100 if success else 0))
+        if success:
+            self.log(f"复刻成功! ID: {msg}", op="enroll", voice_id=ticket.voice_id,
+                     elapsed=time.time() - ticket.started_at, model=ticket.model)
+            QMessageBox.information(self, "成功", f"音色创建成功\nID: {msg}")
+        elif ticket.cancel.is_set():
+            self.log(f"[{ticket.label}] 复刻{msg}", "WARNING", op="enroll", voice_id=ticket.voice_id)
+        else:
+            self.log(f"复刻失败: {msg}", "ERROR", op="enroll", voice_id=ticket.voice_id,
+                     elapsed=time.time() - ticket.started_at, model=ticket.model, status=ticket.status)
+            QMessageBox.critical(self, "失败", msg)
+
+    def action_table_click(self):
+        pass
+
+    def action_use(self):
+        # [修改] 获取所有选中的行
+        selected_rows = self.selected_voices()
+        
+        if len(selected_rows) == 0:
+            QMessageBox.warning(self, "提示", "请先在列表中选中一行")
+            return
+        
+        # [新增] 检查是否多选
+        if len(selected_rows) > 1:
+            QMessageBox.warning(self, "不可用", "当前选择了多个音色。\n合成时只能选择一个音色，请取消多选。")
+            return
+            
+        # [修改] 取第一行（也是唯一一行）
+        v_id, model_guess, status = selected_rows[0]
+
+        if status != "OK":
+            QMessageBox.warning(self, "不可用", "该音色状态不是 OK，无法使用。")
+            return
+    
+        if model_guess == "Unknown":
+            model_guess = self.model_combo.currentText()
+            
+        self.current_voice_id = v_id
+        self.current_model = model_guess
+        
+        self.lbl_info.setText(f"已选中: {v_id}\n模型: {model_guess}")
+        self.lbl_info.setStyleSheet("color: #0366d6; font-weight: bold;")
+        self.log(f"已激活音色: {v_id}", op="use", voice_id=v_id, model=model_guess)
+        self.schedule_speculation()
+
+    def current_format(self):
+        return self.format_combo.currentData()
+
+    def action_path(self):
+        fmt = self.current_format()
+        path, _ = QFileDialog.getSaveFileName(self, "保存文件", f"output.{format_ext(fmt)}", file_filter(fmt))
+        if path:
+            self.path_input.setText(path)
+
+    def on_format_changed(self):
+        # 已填写的保存路径跟着换扩展名
+        path = self.path_input.text().strip()
+        if path:
+            self.path_input.setText(f"{os.path.splitext(path)[0]}.{format_ext(self.current_format())}")
+        self.update_post_options()
+
+    def update_post_options(self):
+        enabled = self.post_ready and can_postprocess(self.current_format())
+        self.chk_post.setEnabled(enabled)
+        self.combo_norm.setEnabled(enabled)
+        if not self.post_ready:
+            self.chk_post.setToolTip("需要安装 NumPy：pip install numpy")
+        else:
+            self.chk_post.setToolTip("" if enabled else "只支持 WAV / PCM 输出")
+
+    def current_postprocess(self):
+        if not (self.chk_post.isEnabled() and self.chk_post.isChecked()):
+            return None
+        return postprocess_options(normalize=self.combo_norm.currentData())
+
+    def action_gen(self):
+        key = self.api_input.text().strip()
+        txt = self.txt_input.text().strip()
+        out = self.path_input.text().strip()
+        
+        # --- 获取界面上的音量和语速参数 ---
+        vol = self.spin_vol.value()
+        speed = self.spin_speed.value()
+        # -----------------------
+        
+        if not key:
+            QMessageBox.warning(self, "提示", "缺少 API Key")
+            return
+        if not self.current_voice_id:
+            QMessageBox.warning(self, "提示", "请先选择一个音色并点击'使用选中'")
+            return
+        if not txt:
+            QMessageBox.warning(self, "提示", "请输入要合成的文本")
+            return
+        if not out:
+            QMessageBox.warning(self, "提示", "请选择保存路径")
+            return
+
+        self.spec_timer.stop()
+        self.btn_gen.setEnabled(False)
+        self.pbar.setValue(0)  # 重置进度条
+        self.gen_started = time.time()
+        # 这里传入 vol 和 speed；超长文本自动走分段并发合成
+        params = synthesis_params(txt, out, self.current_voice_id, self.current_model, vol, speed,
+                                  stream=self.chk_stream.isChecked(), audio_format=self.current_format(),
+                                  workers=self.spin_workers.value(), postprocess=self.current_postprocess())
+        self.tokens["synth"] = CancelToken()
+        self.tasks["synth"] = self.submit_synth_job(
+            key, self.jobs.add(key, "synth", params), params,
+            progress=self.bridge.wrap(lambda v, m: [self.pbar.setValue(v), self.log(m, op="synth")]),
+            finished=self.bridge.wrap(self.on_gen_finished), cancel=self.tokens["synth"])
+
+    def submit_synth_job(self, key, job_id, params, progress, finished, cancel=None, op="synth"):
+        # 结果先写回任务队列再通知界面：界面还没来得及处理就退出，任务也不会被重复执行
+        job = make_synthesis_job(key, params, cache=self.cache, progress=progress, cancel=cancel)
+
+        def run():
+            # 同样参数的预合成还没结束时等它，随后直接命中缓存，不再重复请求
+            if self.speculator.wait(params, cancel=cancel):
+                progress(5, "等待预合成结果...")
+            return job.run()
+
+        def on_done(result, error):
+            success, msg = task_result(result, error)
+            if not success and cancel is not None and cancel.is_set():
+                self.jobs.finish(job_id, JOB_CANCELLED, CANCELLED_MESSAGE)
+                finished(False, CANCELLED_MESSAGE)
+                return
+            if success and params.get("postprocess"):
+                # 后处理在进程池中进行，不占引擎线程；失败时保留未处理的输出，合成仍算成功
+                progress(97, "后处理中 (去静音 / 响度归一)...")
+                try:
+                    get_postprocessor().submit(
+                        msg, params.get("audio_format") or AUDIO_FORMAT, params["postprocess"],
+                        boundaries=getattr(job, "boundaries", None),
+                        on_done=lambda stats, post_error: on_postprocessed(msg, stats, post_error))
+                    return
+                except (ValueError, RuntimeError) as e:
+                    progress(97, f"⚠ 未做后处理: {e}")
+            complete(success, msg)
+
+        def on_postprocessed(path, stats, error):
+            if error is None:
+                progress(99, f"后处理完成: {describe_postprocess(stats)}")
+            else:
+                progress(99, f"⚠ 后处理失败，保留原始输出: {error}")
+            complete(True, path)
+
+        def complete(success, msg):
+            self.jobs.finish(job_id, JOB_DONE if success else JOB_FAILED, msg)
+            finished(success, msg)
+
+        self.jobs.start(job_id)
+        return get_engine().submit(op, run, cancel=cancel, on_done=on_done)
+
+    def on_gen_finished(self, success, msg):
+        self.tasks.pop("synth", None)
+        self.tokens.pop("synth", None)
+        self.btn_gen.setEnabled(True)
+        self.pbar.setValue(100 if success else 0)
+        if msg == CANCELLED_MESSAGE:
+            self.log("合成已取消", "WARNING", op="synth", voice_id=self.current_voice_id,
+                     elapsed=time.time() - self.gen_started)
+            return
+        self.log(f"合成{'完成' if success else '失败'}: {msg}", "INFO" if success else "ERROR", op="synth",
+                 voice_id=self.current_voice_id, elapsed=time.time() - self.gen_started)
+        if success:
+            QMessageBox.information(self, "成功", f"文件已保存至:\n{msg}")
+        else:
+            QMessageBox.warning(self, "失败", msg)
+
+    def schedule_speculation(self, *args):
+        # 参数变了，还在排队的预合成已经过时
+        if self.speculator is not None:
+            self.speculator.cancel()
+        if self.chk_speculate.isChecked():
+            self.spec_timer.start(self.spin_spec_idle.value())
+        else:
+            self.spec_timer.stop()
+
+    def speculate(self):
+        key = self.api_input.text().strip()
+        txt = self.txt_input.text().strip()
+        if not self.chk_speculate.isChecked() or not key or not self.current_voice_id or not txt:
+            return
+        params = synthesis_params(txt, None, self.current_voice_id, self.current_model, self.spin_vol.value(),
+                                  self.spin_speed.value(), audio_format=self.current_format(),
+                                  workers=self.spin_workers.value())
+        state = self.speculator.request(key, params, on_done=self.bridge.wrap(self.on_speculation_done))
+        if state == SPEC_STARTED:
+            self.log(f"输入已停顿，后台预合成 {len(txt)} 字...", op="speculate", voice_id=self.current_voice_id,
+                     chars=len(txt))
+        elif state == SPEC_BUDGET and not self.spec_budget_warned:
+            self.spec_budget_warned = True
+            self.log(f"本次运行的预合成字数已达上限（剩余 {self.speculator.remaining()} 字），不再预合成",
+                     "WARNING", op="speculate")
+        self.update_spec_label()
+
+    def on_speculation_done(self, key, success, msg):
+        if success:
+            self.log("预合成完成，参数不变时点击“开始合成”将直接写出", op="speculate", voice_id=self.current_voice_id)
+        else:
+            self.log(f"预合成失败: {msg}", "WARNING", op="speculate")
+        self.update_spec_label()
+
+    def on_spec_budget_changed(self, value):
+        if self.speculator is not None:
+            self.speculator.set_budget(value)
+            self.spec_budget_warned = False
+            self.update_spec_label()
+
+    def update_spec_label(self):
+        self.lbl_spec.setText(f"剩余 {self.speculator.remaining()} 字")
+
+    def action_preview(self):
+        # 试听进行中再点一次 = 停止
+        if self.preview_player is not None:
+            self.stop_preview()
+            return
+        if "preview" in self.tasks:
+            self.log("上一条试听仍在合成，请稍候", "WARNING", op="preview")
+            return
+        key = self.api_input.text().strip()
+        txt = self.txt_input.text().strip()
+        if not key or not self.current_voice_id or not txt:
+            QMessageBox.warning(self, "提示", "试听需要 API Key、选中的音色和文本")
+            return
+
+        sink = self.audio_sink
+        if sink is None:
+            sink = self.audio_sink = create_sink(self)
+            if sink is None:
+                self.log("声卡输出不可用 (QtMultimedia 加载失败)，试听只生成临时 WAV 文件", "WARNING", op="preview")
+        # 播放由 StreamPlayer 自己的线程负责，回调同样经 bridge 回到主线程
+        self.preview_player = StreamPlayer(
+            sink or NullSink(realtime=True), prebuffer_ms=self.spin_prebuffer.value(),
+            on_started=self.bridge.wrap(
+                lambda t: self.log(f"▶ 开始播放，time-to-audio {t * 1000:.0f} ms", op="preview",
+                                   voice_id=self.current_voice_id, time_to_audio=round(t, 3))),
+            on_finished=self.bridge.wrap(self.on_playback_done))
+        cancel = self.tokens["preview"] = CancelToken()
+        job = PreviewJob(key, txt, self.current_voice_id, self.current_model, self.spin_vol.value(),
+                         self.spin_speed.value(), self.preview_player, cache=self.cache,
+                         progress=self.bridge.wrap(lambda v, m: self.log(m, "DEBUG", op="preview")), cancel=cancel)
+        self.btn_preview.setText("停止试听")
+        self.tasks["preview"] = get_engine().submit("preview", job.run, cancel=cancel,
+                                                    on_done=self.bridge.wrap(self.on_preview_finished))
+
+    def stop_preview(self):
+        # 停止播放的同时中止还在进行的试听合成，不再白白消耗额度
+        if "preview" in self.tokens:
+            self.tokens["preview"].cancel()
+        if self.preview_player is not None:
+            self.preview_player.stop()
+            self.preview_player = None
+        if self.panels_ready:  # 试听按钮在延迟构建的面板里
+            self.btn_preview.setText("试听")
+
+    def on_preview_finished(self, result, error):
+        # 合成结束时缓冲里的音频可能还在播放，按钮在 on_playback_done 中复原
+        self.tasks.pop("preview", None)
+        self.tokens.pop("preview", None)
+        success, msg = task_result(result, error)
+        if success:
+            self.log(f"试听合成完成，音频另存于 {msg}", op="preview", voice_id=self.current_voice_id)
+        elif msg == CANCELLED_MESSAGE:
+            self.log("试听合成已中止", op="preview", voice_id=self.current_voice_id)
+        else:
+            self.log(f"试听失败: {msg}", "ERROR", op="preview", voice_id=self.current_voice_id)
+
+    def on_playback_done(self, player):
+        stats = player.stats()
+        self.log(f"试听播放结束 (卡顿 {stats['underruns']} 次，共 {stats['bytes_played'] / 1024:.0f} KB)",
+                 op="preview", **stats)
+        if player is self.preview_player:
+            self.preview_player = None
+            self.btn_preview.setText("试听")
+
+    def action_delete(self):
+        # 删除进行中再点一次按钮 = 取消
+        if self.delete_cancel is not None:
+            self.delete_cancel.set()
+            self.btn_del.setEnabled(False)
+            self.log("正在取消删除，等待进行中的请求结束...")
+            return
+
+        # [修改] 获取所有选中的行
+        voice_ids = [v_id for v_id, _, _ in self.selected_voices()]
+        if not voice_ids: 
+            return
+        
+        count = len(voice_ids)
+        if QMessageBox.question(self, "确认", f"确定要删除选中的 {count} 个音色吗？\n此操作不可恢复！") != QMessageBox.Yes:
+            return
+
+        key = self.api_input.text().strip()
+        self.log(f"--- 开始批量删除 {count} 个音色 ---", op="delete", count=count)
+        self.submit_delete_jobs(key, [(self.jobs.add(key, "delete", {"voice_id": v_id}, voice_id=v_id), v_id)
+                                      for v_id in voice_ids])
+
+    def submit_delete_jobs(self, key, items):
+        """items 为 [(任务 id, voice_id)]"""
+        self.delete_started = time.time()
+        self.delete_total = len(items)
+        self.delete_done = 0
+        self.delete_ok = 0
+        self.delete_failed = 0
+        self.pbar.setValue(0)
+        self.btn_del.setText("取消删除")
+
+        # 每个音色一个引擎任务，并发数由引擎的 "delete" 上限控制，界面不卡；每删掉一个就地更新表格
+        self.delete_cancel = cancel = CancelToken()  # 取消时排队中的删除立即结束
+        engine = get_engine()
+        for job_id, v_id in items:
+            self.jobs.start(job_id)
+            engine.submit("delete", delete_voice, key, v_id, cancel, cancel=cancel,
+                          on_done=self.bridge.wrap(
+                              lambda result, error, job_id=job_id, v_id=v_id:
+                              self.on_delete_done(key, job_id, v_id, cancel, error)))
+
+    def on_delete_done(self, api_key, job_id, v_id, cancel, error):
+        self.delete_done += 1
+        self.pbar.setValue(int(self.delete_done * 100 / self.delete_total))
+        # 取消后未发出的、以及退避等待中被打断的不算失败
+        if error is None or not cancel.is_set() or classify_error(error) == FATAL:
+            self.jobs.finish(job_id, JOB_FAILED if error else JOB_DONE, str(error) if error else None)
+            self.on_delete_item(api_key, v_id, error)
+        else:
+            self.jobs.finish(job_id, JOB_CANCELLED)
+        if self.delete_done == self.delete_total:
+            self.on_delete_finished()
+
+    def on_delete_item(self, api_key, v_id, error):
+        if error:
+            self.delete_failed += 1
+            self.log(f"删除 {v_id} 失败: {error}", "ERROR", op="delete", voice_id=v_id)
+            return
+        self.delete_ok += 1
+        # 逐个移除时每次都要重建行号索引，十万级音色会卡住界面，攒一批再移除
+        self.delete_removed.append((api_key, v_id))
+        if not self.delete_flush.isActive():
+            self.delete_flush.start()
+        self.log(f"已删除: {v_id} ({self.delete_done}/{self.delete_total})", op="delete", voice_id=v_id)
+        # 该音色的合成缓存一并失效
+        removed = self.cache.invalidate_voice(v_id)
+        if removed:
+            self.log(f"已清除 {v_id} 的 {removed} 条合成缓存", op="delete", voice_id=v_id)
+
+    def flush_deleted(self):
+        self.delete_flush.stop()
+        removed, self.delete_removed = self.delete_removed, []
+        by_key = {}
+        for api_key, v_id in removed:
+            by_key.setdefault(api_key, []).append(v_id)
+        for api_key, voice_ids in by_key.items():
+            self.voice_model.remove(voice_ids)
+            self.catalog.remove(api_key, voice_ids)
+
+    def on_delete_finished(self):
+        self.flush_deleted()
+        success_count, failed_count = self.delete_ok, self.delete_failed
+        skipped = self.delete_total - success_count - failed_count
+        note = f"，已取消 {skipped} 个" if skipped else ""
+        self.log(f"--- 批量删除结束，成功 {success_count}/{self.delete_total}{note} ---", op="delete",
+                 elapsed=time.time() - self.delete_started, succeeded=success_count, failed=failed_count,
+                 cancelled=skipped)
+        self.delete_cancel = None
+        self.btn_del.setText("删除选中")
+        self.btn_del.setEnabled(True)
+
+def main(argv):
+    if hasattr(Qt, 'AA_EnableHighDpiScaling'):
+        QApplication.setAttribute(Qt.AA_EnableHighDpiScaling, True)
+    with profile.phase("创建 QApplication"):
+        app = QApplication(argv)
+    font = QFont("Microsoft YaHei", 9)
+    app.setFont(font)
+    win = VoiceEnrollmentApp()
+    with profile.phase("显示窗口"):
+        win.show()
+    # 事件循环跑起来、窗口画出第一帧后再补建其余部分
+    QTimer.singleShot(0, lambda: profile.mark("窗口首次可见"))
+    QTimer.singleShot(0, win.finish_startup)
+    if profile.enabled:
+        QTimer.singleShot(0, lambda: (profile.report(), app.quit()))
+    if get_profiler() is not None:
+        # 主线程心跳：事件循环被某个槽函数卡住时，看门狗记下卡顿时长和卡住的调用栈
+        heartbeat = QTimer(app)
+        heartbeat.timeout.connect(get_profiler().watch("gui"))
+        heartbeat.start(int(get_profiler().beat_interval() * 1000))
+    return app.exec_()
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
\ No newline at end of file
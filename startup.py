@@ -0,0 +1,91 @@
+# ===========================
+# 启动耗时分析
+# ===========================
+# python main.py --profile-startup [报告.json]
+# 按阶段记录冷启动耗时（导入 / 建窗口 / 首帧 / 延迟构建的面板），以及每个阶段新导入的模块数，
+# 启动完成后打印表格并退出；给了路径时另存一份 JSON，便于对比优化前后。
+# 只依赖标准库，main.py 第一时间导入，不会拖慢启动本身。
+import sys
+import json
+import time
+import unicodedata
+from contextlib import contextmanager
+
+PROFILE_FLAG = "--profile-startup"
+WATCHED_MODULES = ("PyQt5.QtWidgets", "dashscope", "asyncio", "sqlite3")  # 报告里注明是否已加载
+
+
+class StartupProfile:
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.enabled = False
+        self.path = None
+        self.phases = []  # (名称, 开始于 ms, 耗时 ms, 新导入模块数)
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        modules = len(sys.modules)
+        try:
+            yield
+        finally:
+            self.phases.append((name, (started - self.t0) * 1000, (time.perf_counter() - started) * 1000,
+                                len(sys.modules) - modules))
+
+    def mark(self, name):
+        """记录一个时间点（如窗口首次可见），耗时为距上一阶段结束的时间"""
+        now = (time.perf_counter() - self.t0) * 1000
+        last = self.phases[-1][1] + self.phases[-1][2] if self.phases else 0
+        self.phases.append((name, last, now - last, 0))
+
+    def total_ms(self):
+        return (time.perf_counter() - self.t0) * 1000
+
+    def to_dict(self):
+        return {
+            "total_ms": round(self.total_ms(), 1),
+            "modules": len(sys.modules),
+            "phases": [{"name": name, "start_ms": round(start, 1), "ms": round(ms, 1), "imports": imports}
+                       for name, start, ms, imports in self.phases],
+            "loaded": {name: name in sys.modules for name in WATCHED_MODULES},
+        }
+
+    def report(self, out=None):
+        out = out or sys.stderr
+        data = self.to_dict()
+        print(_pad("阶段", 20) + _pad("开始 (ms)", 12, True) + _pad("耗时 (ms)", 12, True) + _pad("新模块", 8, True),
+              file=out)
+        for phase in data["phases"]:
+            print(_pad(phase['name'], 20) + f"{phase['start_ms']:>12.1f}{phase['ms']:>12.1f}{phase['imports']:>8}",
+                  file=out)
+        print(f"合计 {data['total_ms']:.1f} ms，已加载模块 {data['modules']} 个", file=out)
+        print("  ".join(f"{name}: {'已加载' if loaded else '未加载'}" for name, loaded in data["loaded"].items()),
+              file=out)
+        if self.path:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            print(f"报告已保存至: {self.path}", file=out)
+
+
+def _pad(text, width, right=False):
+    # 中文按两个字符宽对齐
+    shown = sum(2 if unicodedata.east_asian_width(c) in "WF" else 1 for c in str(text))
+    fill = " " * max(0, width - shown)
+    return fill + str(text) if right else str(text) + fill
+
+
+profile = StartupProfile()
+
+
+def configure(argv):
+    """从命令行取出 --profile-startup [路径]，返回剩余参数"""
+    if PROFILE_FLAG not in argv:
+        return argv
+    index = argv.index(PROFILE_FLAG)
+    profile.enabled = True
+    rest = argv[:index]
+    following = argv[index + 1:]
+    if following and not following[0].startswith("-"):
+        profile.path = following.pop(0)
+    return rest + following
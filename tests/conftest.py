@@ -0,0 +1,28 @@
+# ===========================
+# 测试公共夹具
+# ===========================
+# 所有云端调用都换成 engine/mock.py 的模拟实现，不需要 API Key，也不消耗额度。
+# python -m pytest -q（在仓库根目录运行）
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import client, get_limiter, get_metrics, get_pool  # noqa: E402
+from engine.mock import MockBackend  # noqa: E402
+
+
+@pytest.fixture
+def backend():
+    """延迟压到最低的模拟云端；限流器、会话池、指标每个用例重新开始"""
+    mock = MockBackend(connect_latency=0, latency=0.01, chunks=4, chunk_interval=0, api_latency=0, jitter=0,
+                       seed=1)
+    client.use_backend(mock)
+    get_limiter().reset({})
+    get_metrics().reset()
+    yield mock
+    get_pool().close_idle()
+    get_limiter().reset()
+    client.use_backend(None)
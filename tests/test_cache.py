@@ -0,0 +1,88 @@
+import os
+
+from engine import SynthesisCache
+
+
+def write_audio(path, size):
+    with open(path, 'wb') as f:
+        f.write(b'\xff' * size)
+    return path
+
+
+def make_cache(tmp_path, max_bytes=1000):
+    return SynthesisCache(str(tmp_path / "cache"), max_bytes)
+
+
+def test_make_key_normalizes_whitespace():
+    key = SynthesisCache.make_key("m", "v", 50, 1.0, "MP3", "你好\n  世界")
+    assert key == SynthesisCache.make_key("m", "v", 50, 1.0, "MP3", "你好 世界")
+    assert key != SynthesisCache.make_key("m", "v", 60, 1.0, "MP3", "你好 世界")
+    assert key != SynthesisCache.make_key("m", "v", 50, 1.0, "WAV", "你好 世界")
+
+
+def test_store_and_fetch(tmp_path):
+    cache = make_cache(tmp_path)
+    source = write_audio(tmp_path / "a.mp3", 100)
+    assert cache.store("k1", "v1", str(source))
+    assert cache.contains("k1")
+
+    output = tmp_path / "out.mp3"
+    assert cache.fetch("k1", str(output))
+    assert output.read_bytes() == source.read_bytes()
+    assert not cache.fetch("missing", str(tmp_path / "none.mp3"))
+    assert (cache.hits, cache.misses) == (1, 1)
+    # 复制用的临时文件不留在输出目录
+    assert sorted(os.listdir(tmp_path)) == ["a.mp3", "cache", "out.mp3"]
+
+
+def test_lru_eviction(tmp_path):
+    cache = make_cache(tmp_path, max_bytes=250)
+    for name in ("k1", "k2"):
+        cache.store(name, "v", str(write_audio(tmp_path / f"{name}.mp3", 100)))
+    # 读一次 k1，k2 变成最久未使用
+    assert cache.fetch("k1", str(tmp_path / "out.mp3"))
+    cache.store("k3", "v", str(write_audio(tmp_path / "k3.mp3", 100)))
+
+    assert list(cache.entries) == ["k1", "k3"]
+    assert not os.path.exists(cache.path_for("k2"))
+    assert cache.total_bytes() == 200
+
+    cache.set_max_bytes(100)
+    assert list(cache.entries) == ["k3"]
+
+
+def test_index_survives_restart(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.store("k1", "v1", str(write_audio(tmp_path / "a.mp3", 100)))
+    cache.store("k2", "v1", str(write_audio(tmp_path / "b.mp3", 100)))
+    cache.fetch("k1", str(tmp_path / "out.mp3"))
+    cache.flush()
+
+    reloaded = make_cache(tmp_path)
+    assert list(reloaded.entries) == ["k2", "k1"]  # 访问顺序随索引保存
+    os.remove(reloaded.path_for("k2"))
+    assert list(make_cache(tmp_path).entries) == ["k1"]  # 文件已丢失的条目不载入
+
+
+def test_missing_file_counts_as_miss(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.store("k1", "v1", str(write_audio(tmp_path / "a.mp3", 100)))
+    os.remove(cache.path_for("k1"))
+    assert not cache.fetch("k1", str(tmp_path / "out.mp3"))
+    assert not cache.contains("k1")
+    assert not os.path.exists(tmp_path / "out.mp3")
+
+
+def test_invalidate_voice(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.store("k1", "v1", str(write_audio(tmp_path / "a.mp3", 100)))
+    cache.store("k2", "v2", str(write_audio(tmp_path / "b.mp3", 100)))
+    cache.invalidate_voice("v1")
+    assert list(cache.entries) == ["k2"]
+    assert not os.path.exists(cache.path_for("k1"))
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = make_cache(tmp_path, max_bytes=0)
+    assert not cache.store("k1", "v1", str(write_audio(tmp_path / "a.mp3", 100)))
+    assert not cache.contains("k1")
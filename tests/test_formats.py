@@ -0,0 +1,72 @@
+import io
+import struct
+import wave
+
+import pytest
+
+from engine import OUTPUT_FORMATS, WavStreamWriter, format_for_path, open_audio_file
+from engine.formats import validate_format, wav_header
+
+
+def test_wav_header_layout():
+    header = wav_header(16000, 100)
+    assert len(header) == 44
+    assert header[:4] == b'RIFF' and header[8:16] == b'WAVEfmt '
+    assert struct.unpack('<I', header[4:8])[0] == 36 + 100
+    assert struct.unpack('<I', header[24:28])[0] == 16000
+    assert struct.unpack('<I', header[40:44])[0] == 100
+
+
+class KeepOpen(io.BytesIO):
+    def close(self):
+        pass
+
+
+def test_stream_writer_patches_lengths():
+    buf = KeepOpen()
+    with WavStreamWriter(buf, 22050) as writer:
+        # 写入期间头部是占位的 0 长度
+        writer.write(b'\x01\x00' * 10)
+        assert struct.unpack('<I', buf.getvalue()[40:44])[0] == 0
+        writer.write(b'\x02\x00' * 5)
+
+    data = buf.getvalue()
+    assert struct.unpack('<I', data[4:8])[0] == len(data) - 8
+    assert struct.unpack('<I', data[40:44])[0] == 30
+    with wave.open(io.BytesIO(data)) as w:
+        assert (w.getframerate(), w.getnchannels(), w.getsampwidth(), w.getnframes()) == (22050, 1, 2, 15)
+
+
+def test_stream_writer_pads_odd_data_chunk():
+    buf = KeepOpen()
+    writer = WavStreamWriter(buf, 16000)
+    writer.write(b'\x00' * 3)
+    writer.close()
+    writer.close()  # 重复关闭不再回填
+
+    data = buf.getvalue()
+    assert len(data) == 44 + 4
+    assert struct.unpack('<I', data[40:44])[0] == 3  # data 块长度不含补齐字节
+    assert struct.unpack('<I', data[4:8])[0] == len(data) - 8
+
+
+def test_open_audio_file_by_format(tmp_path):
+    wav_format = next(name for name in OUTPUT_FORMATS if name.startswith("WAV"))
+    path = tmp_path / "a.wav"
+    with open_audio_file(str(path), wav_format) as fp:
+        fp.write(b'\x00\x00' * 8)
+    with wave.open(str(path)) as w:
+        assert w.getnframes() == 8
+
+    mp3_format = format_for_path("a.mp3")
+    path = tmp_path / "a.mp3"
+    with open_audio_file(str(path), mp3_format) as fp:
+        fp.write(b'\xff\xf3')
+    assert path.read_bytes() == b'\xff\xf3'
+
+
+def test_validate_format():
+    for name in OUTPUT_FORMATS:
+        assert validate_format(name) == name
+    with pytest.raises(ValueError):
+        validate_format("NOT_A_FORMAT")
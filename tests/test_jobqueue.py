@@ -0,0 +1,74 @@
+import pytest
+
+from engine import (JobQueue, LongTextSynthesisJob, SynthesisJob, make_synthesis_job, synthesis_params, JOB_QUEUED,
+                    JOB_RUNNING, JOB_DONE, JOB_FAILED)
+
+
+@pytest.fixture
+def jobs(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    yield queue
+    queue.close()
+
+
+def test_state_transitions(jobs):
+    job_id = jobs.add("key", "enroll", {"prefix": "demo"})
+    [job] = jobs.unfinished("key")
+    assert (job["id"], job["state"], job["attempts"], job["params"]) == (job_id, JOB_QUEUED, 0, {"prefix": "demo"})
+
+    jobs.start(job_id)
+    jobs.attach(job_id, "voice-1")
+    [job] = jobs.unfinished("key")
+    assert (job["state"], job["attempts"], job["voice_id"]) == (JOB_RUNNING, 1, "voice-1")
+
+    jobs.start(job_id)  # 重启后恢复，再执行一次
+    jobs.finish(job_id, JOB_DONE, "voice-1")
+    assert jobs.unfinished("key") == []
+    [job] = jobs.list("key")
+    assert (job["state"], job["attempts"], job["result"]) == (JOB_DONE, 2, "voice-1")
+
+
+def test_list_filters_by_account_kind_and_state(jobs):
+    synth = jobs.add("key", "synth", {})
+    enroll = jobs.add("key", "enroll", {})
+    jobs.add("other", "synth", {})
+    jobs.finish(enroll, JOB_FAILED, "boom")
+
+    assert [j["id"] for j in jobs.list("key")] == [synth, enroll]
+    assert [j["id"] for j in jobs.list("key", kind="synth")] == [synth]
+    assert [j["id"] for j in jobs.list("key", states=(JOB_FAILED,))] == [enroll]
+    assert len(jobs.unfinished("other")) == 1
+
+
+def test_prune_keeps_unfinished(jobs):
+    done = jobs.add("key", "synth", {})
+    pending = jobs.add("key", "synth", {})
+    jobs.finish(done, JOB_DONE)
+    jobs.prune(days=-1)
+    assert [j["id"] for j in jobs.list("key")] == [pending]
+
+
+def test_survives_reopen(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    queue = JobQueue(path)
+    job_id = queue.add("key", "delete", {"voice_id": "v"})
+    queue.close()
+    queue = JobQueue(path)
+    assert [j["id"] for j in queue.unfinished("key")] == [job_id]
+    queue.close()
+
+
+def test_make_synthesis_job_picks_long_text():
+    params = synthesis_params("短文本", "/tmp/out.mp3", "voice", "cosyvoice-v3.5-flash", 50, 1.0, stream=False)
+    job = make_synthesis_job("key", params)
+    assert type(job) is SynthesisJob and not job.stream
+
+    params["text"] = "长" * 1000
+    assert isinstance(make_synthesis_job("key", params), LongTextSynthesisJob)
+
+
+def test_memory_queue():
+    queue = JobQueue(":memory:")
+    queue.add("key", "synth", {})
+    assert len(queue.unfinished("key")) == 1
+    queue.close()
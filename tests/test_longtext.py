@@ -0,0 +1,75 @@
+import struct
+
+from engine import LongTextSynthesisJob, split_text, mp3_payload, segment_payload
+from engine.formats import AUDIO_FORMAT
+
+MODEL = "cosyvoice-v3.5-flash"
+
+
+def test_split_text_prefers_sentence_boundaries():
+    text = "第一句话。第二句话！第三句话？"
+    assert split_text(text, MODEL, segment_chars=6) == ["第一句话。", "第二句话！", "第三句话？"]
+    # 目标长度足够时相邻句子合并
+    assert split_text(text, MODEL, segment_chars=10) == ["第一句话。第二句话！", "第三句话？"]
+
+
+def test_split_text_keeps_decimals():
+    assert split_text("价格是 3.14 元. 好的", MODEL, segment_chars=11) == ["价格是 3.14 元.", "好的"]
+
+
+def test_split_text_falls_back_to_clauses_and_hard_cuts():
+    assert split_text("一二三，四五六，七八九", MODEL, segment_chars=4) == ["一二三，", "四五六，", "七八九"]
+    segments = split_text("一" * 25, MODEL, segment_chars=10)
+    assert [len(s) for s in segments] == [10, 10, 5]
+
+
+def test_split_text_respects_model_limit_and_drops_blanks():
+    segments = split_text("字" * 4500, "unknown-model", segment_chars=10000)
+    assert max(len(s) for s in segments) <= 2000
+    assert "".join(segments) == "字" * 4500
+    assert split_text("  \n\n  ", MODEL) == []
+
+
+def mp3_frame(payload, xing=False):
+    # MPEG1 Layer III，128 kbps，44.1 kHz，无填充：帧长 417 字节
+    header = b'\xff\xfb\x90\x64'
+    body = (b'\0' * 32 + b'Xing' if xing else b'') + payload
+    return (header + body).ljust(417, b'\0')
+
+
+def test_mp3_payload_strips_id3_tag_and_xing_frame():
+    audio = mp3_frame(b'A') + mp3_frame(b'B')
+    id3_body = b'x' * 200
+    id3 = b'ID3\x04\x00\x00' + bytes([0, 0, 200 >> 7, 200 & 0x7F]) + id3_body
+    tag = b'TAG' + b'\0' * 125
+    data = id3 + mp3_frame(b'', xing=True) + audio + tag
+    assert mp3_payload(data) == audio
+
+
+def test_mp3_payload_keeps_plain_frames():
+    audio = mp3_frame(b'A') + mp3_frame(b'B')
+    assert mp3_payload(audio) == audio
+    assert mp3_payload(b'') == b''
+
+
+def test_segment_payload_only_touches_mp3():
+    data = b'ID3\x04\x00\x00\x00\x00\x00\x02ab' + mp3_frame(b'A')
+    assert segment_payload(data, AUDIO_FORMAT) == mp3_frame(b'A')
+    pcm = struct.pack('<4h', 1, 2, 3, 4)
+    assert segment_payload(pcm, "PCM_22050HZ_MONO_16BIT") == pcm
+
+
+def test_long_text_job_writes_segments_in_order(backend, tmp_path):
+    sentences = [f"第{i}句" + "字" * 60 + "。" for i in range(12)]
+    text = "".join(sentences)
+    output = tmp_path / "long.mp3"
+    job = LongTextSynthesisJob("key", text, str(output), "voice", MODEL, 50, 1.0, workers=3)
+    ok, result = job.run()
+    assert ok, result
+
+    segments = split_text(text, MODEL)
+    assert len(segments) > 1
+    expected = b"".join(mp3_payload(backend.audio(seg)) for seg in segments)
+    assert output.read_bytes() == expected
+    assert len(job.boundaries) == len(segments) - 1
+    assert not (tmp_path / "long.mp3.part").exists()
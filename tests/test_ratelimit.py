@@ -0,0 +1,140 @@
+import time
+import threading
+
+import pytest
+
+from engine import OperationCancelled
+from engine.ratelimit import (FATAL, RETRYABLE, THROTTLED, RetryPolicy, TokenBucket, classify_error, get_limiter,
+                              retry_hint)
+
+
+class StatusError(Exception):
+    def __init__(self, status_code, message=""):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@pytest.mark.parametrize("error, kind", [
+    (StatusError(429, "too many"), THROTTLED),
+    (Exception("Throttling.RateQuota exceeded"), THROTTLED),
+    (StatusError(503, "ServiceUnavailable"), RETRYABLE),
+    (ConnectionError("reset"), RETRYABLE),
+    (Exception("socket closed"), RETRYABLE),  # 没有状态码按可重试
+    (StatusError(401, "InvalidApiKey"), FATAL),
+    (StatusError(404, "voice not found"), FATAL),
+    (ValueError("bad"), FATAL),
+    # 不可重试的错误码优先于状态码
+    (StatusError(503, "Arrearage"), FATAL),
+])
+def test_classify_error(error, kind):
+    assert classify_error(error) == kind
+
+
+def test_retry_hint():
+    assert retry_hint(Exception("Retry-After: 2.5")) == 2.5
+    error = Exception("throttled")
+    error.retry_after = "3"
+    assert retry_hint(error) == 3.0
+    assert retry_hint(Exception("no hint")) is None
+
+
+def test_token_bucket_spaces_requests():
+    bucket = TokenBucket(rate=20.0, burst=1)
+    started = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    # 第一个令牌立即可用，其余每 50 ms 一个
+    assert time.monotonic() - started == pytest.approx(0.2, abs=0.08)
+
+
+def test_token_bucket_throttled_halves_rate_and_recovers():
+    bucket = TokenBucket(rate=10.0, burst=1)
+    bucket.throttled(0.0)
+    assert bucket.rate == 5.0
+    for _ in range(100):
+        bucket.succeeded()
+    assert bucket.rate == 10.0
+
+
+def test_token_bucket_cancel_refunds_token():
+    bucket = TokenBucket(rate=1.0, burst=1)
+    bucket.acquire()
+    cancel = threading.Event()
+    threading.Timer(0.05, cancel.set).start()
+    started = time.monotonic()
+    with pytest.raises(OperationCancelled):
+        bucket.acquire(cancel)
+    assert time.monotonic() - started < 0.5
+    assert bucket.tokens > -1  # 取消的那次预订已退还
+
+
+def test_retry_policy_retries_retryable_errors():
+    get_limiter().reset({})
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise StatusError(503, "ServiceUnavailable")
+        return "ok"
+
+    policy = RetryPolicy(max_attempts=4, base_delay=0.001)
+    assert policy.call(flaky, "key", "synth") == "ok"
+    assert len(attempts) == 3
+
+
+def test_retry_policy_does_not_retry_fatal_or_non_idempotent():
+    get_limiter().reset({})
+    policy = RetryPolicy(max_attempts=4, base_delay=0.001)
+    calls = []
+
+    def fatal():
+        calls.append(1)
+        raise StatusError(401, "InvalidApiKey")
+
+    with pytest.raises(StatusError):
+        policy.call(fatal, "key", "synth")
+    assert len(calls) == 1
+
+    def server_error():
+        calls.append(1)
+        raise StatusError(500, "InternalError")
+
+    with pytest.raises(StatusError):
+        policy.call(server_error, "key", "create_voice", idempotent=False)
+    assert len(calls) == 2
+
+
+def test_retry_policy_cancelled_before_call():
+    get_limiter().reset({})
+    cancel = threading.Event()
+    cancel.set()
+    with pytest.raises(OperationCancelled):
+        RetryPolicy().call(lambda: pytest.fail("不应发出请求"), "key", "delete_voice", cancel=cancel)
+
+
+def test_cancel_while_rate_limited_sends_nothing():
+    # 等令牌期间取消：排队中的请求一个都不再发出
+    limiter = get_limiter()
+    limiter.reset({"delete": (2.0, 1)})
+    cancel = threading.Event()
+    sent = []
+    results = []
+
+    def worker():
+        try:
+            RetryPolicy(max_attempts=1).call(lambda: sent.append(1), "key", "delete_voice", cancel=cancel)
+            results.append("sent")
+        except OperationCancelled:
+            results.append("cancelled")
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    cancel.set()
+    for thread in threads:
+        thread.join(2)
+    limiter.reset()
+    assert len(sent) == 1
+    assert results.count("cancelled") == 5
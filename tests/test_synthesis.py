@@ -0,0 +1,60 @@
+import threading
+
+import pytest
+
+from engine import CANCELLED_MESSAGE, CancelToken, SynthesisCache, SynthesisJob
+
+MODEL = "cosyvoice-v3.5-flash"
+
+
+def make_job(tmp_path, text="你好，世界", stream=True, **kwargs):
+    return SynthesisJob("key", text, str(tmp_path / "out.mp3"), "voice", MODEL, 50, 1.0, stream=stream, **kwargs)
+
+
+@pytest.mark.parametrize("stream", [True, False])
+def test_synthesis_writes_output(backend, tmp_path, stream):
+    ok, result = make_job(tmp_path, stream=stream).run()
+    assert ok, result
+    assert (tmp_path / "out.mp3").read_bytes() == backend.audio("你好，世界")
+    assert not (tmp_path / "out.mp3.part").exists()
+
+
+def test_cache_hit_skips_request(backend, tmp_path):
+    cache = SynthesisCache(str(tmp_path / "cache"), 10 * 1024 * 1024)
+    assert make_job(tmp_path, cache=cache).run()[0]
+    calls = backend.calls
+
+    (tmp_path / "out.mp3").unlink()
+    assert make_job(tmp_path, cache=cache).run()[0]
+    assert backend.calls == calls
+    assert cache.hits == 1
+    assert (tmp_path / "out.mp3").read_bytes() == backend.audio("你好，世界")
+
+
+def test_server_error_is_retried(backend, tmp_path):
+    backend.error_rate = 1.0
+    threading.Timer(0.3, setattr, (backend, "error_rate", 0.0)).start()
+    retries = []
+    job = make_job(tmp_path)
+    job.on_retry = lambda attempt, error, delay: retries.append(attempt)
+    ok, result = job.run()
+    assert ok, result
+    assert retries
+
+
+def test_cancel_before_start(backend, tmp_path):
+    cancel = CancelToken()
+    cancel.cancel()
+    assert make_job(tmp_path, cancel=cancel).run() == (False, CANCELLED_MESSAGE)
+    assert backend.calls == 0
+    assert not (tmp_path / "out.mp3").exists()
+
+
+def test_cancel_aborts_stream(backend, tmp_path):
+    backend.chunks = 20
+    backend.chunk_interval = 0.05
+    cancel = CancelToken()
+    threading.Timer(0.2, cancel.cancel).start()
+    assert make_job(tmp_path, cancel=cancel).run() == (False, CANCELLED_MESSAGE)
+    assert not (tmp_path / "out.mp3").exists()
+    assert not (tmp_path / "out.mp3.part").exists()
@@ -0,0 +1,250 @@
+# ===========================
+# 音色列表的 Model / View
+# ===========================
+# 按列存储（音色ID 列表 + 模型/状态编码数组），十万级音色也不会为每个单元格建对象；
+# 视图按需分批加载行（canFetchMore / fetchMore），筛选与排序交给 VoiceFilterProxy。
+from array import array
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel, pyqtSignal
+from PyQt5.QtGui import QColor
+
+from engine import guess_model
+
+FETCH_BATCH = 1000  # 每次向视图交付的行数
+REMOVE_RESET_RUNS = 200  # 一次删除的不连续段超过这么多时整表重置，不再逐段通知视图
+COL_ID, COL_MODEL, COL_STATUS = range(3)
+
+
+class VoiceTableModel(QAbstractTableModel):
+    HEADERS = ["音色ID", "模型", "状态"]
+    names_changed = pyqtSignal()  # 出现了新的模型/状态取值，筛选下拉框需要更新
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.ids = []
+        self.models = array('H')    # 下标指向 self.model_names
+        self.statuses = array('H')  # 下标指向 self.status_names
+        self.model_names, self.model_codes = [], {}
+        self.status_names, self.status_codes = [], {}
+        self.rows = {}   # voice_id -> 行号
+        self.loaded = 0  # 已交付给视图的行数
+        self.eager = False  # 筛选时需要全部行参与，不再按需加载
+
+    def _code(self, value, names, codes):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(names)
+            names.append(value)
+            self.names_changed.emit()
+        return code
+
+    # --- Qt 接口 ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row, col = index.row(), index.column()
+        if role == Qt.DisplayRole:
+            if col == COL_ID:
+                return self.ids[row]
+            if col == COL_MODEL:
+                return self.model_names[self.models[row]]
+            return self.status_names[self.statuses[row]]
+        if role == Qt.ForegroundRole and col == COL_STATUS:
+            return QColor("#2ea44f") if self.status_at(row) == "OK" else QColor("#d73a49")
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.loaded < len(self.ids)
+
+    def fetchMore(self, parent=QModelIndex()):
+        count = min(FETCH_BATCH, len(self.ids) - self.loaded)
+        if parent.isValid() or count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self.loaded, self.loaded + count - 1)
+        self.loaded += count
+        self.endInsertRows()
+
+    def set_eager(self, eager):
+        self.eager = eager
+        if eager:
+            self._deliver(len(self.ids))
+
+    def _deliver(self, target):
+        if target > self.loaded:
+            self.beginInsertRows(QModelIndex(), self.loaded, target - 1)
+            self.loaded = target
+            self.endInsertRows()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        # 直接对列数组排序，比代理模型逐对调用 lessThan 快得多；-1 表示保持原顺序
+        if column < 0 or not self.ids:
+            return
+        if column == COL_ID:
+            keys = self.ids
+        elif column == COL_MODEL:
+            keys = [self.model_names[code] for code in self.models]
+        else:
+            keys = [self.status_names[code] for code in self.statuses]
+        perm = sorted(range(len(self.ids)), key=keys.__getitem__, reverse=order == Qt.DescendingOrder)
+
+        self.layoutAboutToBeChanged.emit()
+        new_pos = [0] * len(perm)
+        for new, old in enumerate(perm):
+            new_pos[old] = new
+        self.ids = [self.ids[i] for i in perm]
+        self.models = array('H', (self.models[i] for i in perm))
+        self.statuses = array('H', (self.statuses[i] for i in perm))
+        self.rows = {voice_id: row for row, voice_id in enumerate(self.ids)}
+        # 保持选中项：持久索引跟着行走
+        old = self.persistentIndexList()
+        self.changePersistentIndexList(old, [self.index(new_pos[i.row()], i.column()) for i in old])
+        self.layoutChanged.emit()
+
+    # --- 读取 ---
+    def count(self):
+        return len(self.ids)
+
+    def voice_ids(self):
+        return list(self.ids)
+
+    def model_at(self, row):
+        return self.model_names[self.models[row]]
+
+    def status_at(self, row):
+        return self.status_names[self.statuses[row]]
+
+    def record(self, row):
+        """返回 (voice_id, 模型, 状态)"""
+        return self.ids[row], self.model_at(row), self.status_at(row)
+
+    # --- 写入 ---
+    def reset(self, items):
+        """整表替换，items 为 (voice_id, 状态, 模型) 序列"""
+        self.beginResetModel()
+        self.ids = []
+        self.models, self.statuses = array('H'), array('H')
+        self.rows = {}
+        self._append(items)
+        self.loaded = len(self.ids) if self.eager else min(FETCH_BATCH, len(self.ids))
+        self.endResetModel()
+
+    def _append(self, items):
+        for voice_id, status, model in items:
+            self.rows[voice_id] = len(self.ids)
+            self.ids.append(voice_id)
+            self.models.append(self._code(model or guess_model(voice_id), self.model_names, self.model_codes))
+            self.statuses.append(self._code(str(status), self.status_names, self.status_codes))
+
+    def upsert(self, voice_id, status, model=None):
+        self.upsert_many([(voice_id, status, model)])
+
+    def upsert_many(self, items):
+        """按 voice_id 更新已有行或追加新行；model 为空时沿用已有值，新行按 ID 猜测"""
+        new = {}
+        for voice_id, status, model in items:
+            row = self.rows.get(voice_id)
+            if row is None:
+                new[voice_id] = (voice_id, status, model)
+                continue
+            status_code = self._code(str(status), self.status_names, self.status_codes)
+            model_code = self._code(model, self.model_names, self.model_codes) if model else self.models[row]
+            if status_code == self.statuses[row] and model_code == self.models[row]:
+                continue
+            self.statuses[row] = status_code
+            self.models[row] = model_code
+            if row < self.loaded:
+                self.dataChanged.emit(self.index(row, COL_MODEL), self.index(row, COL_STATUS))
+
+        if not new:
+            return
+        # 新行在首批范围内（或正在筛选）时直接显示；其余留给 fetchMore 按需加载
+        self._append(new.values())
+        self._deliver(len(self.ids) if self.eager else min(len(self.ids), max(self.loaded, FETCH_BATCH)))
+
+    def remove(self, voice_ids):
+        rows = sorted({self.rows[v] for v in voice_ids if v in self.rows}, reverse=True)
+        if not rows:
+            return
+        # 连续的行合并成一段删除，减少视图刷新次数
+        runs, start, end = [], rows[0], rows[0]
+        for row in rows[1:]:
+            if row == start - 1:
+                start = row
+            else:
+                runs.append((start, end))
+                start = end = row
+        runs.append((start, end))
+
+        if len(runs) > REMOVE_RESET_RUNS:
+            # 零散的行太多：代理模型逐段处理 rowsRemoved 远比整表重置慢
+            self.beginResetModel()
+            removed = set(rows)
+            keep = [row for row in range(len(self.ids)) if row not in removed]
+            self.ids = [self.ids[row] for row in keep]
+            self.models = array('H', (self.models[row] for row in keep))
+            self.statuses = array('H', (self.statuses[row] for row in keep))
+            self.loaded = len(self.ids) if self.eager else min(len(self.ids), max(self.loaded - len(rows), FETCH_BATCH))
+            self.endResetModel()
+        else:
+            for start, end in runs:
+                shown_end = min(end, self.loaded - 1)
+                if start <= shown_end:
+                    self.beginRemoveRows(QModelIndex(), start, shown_end)
+                del self.ids[start:end + 1]
+                del self.models[start:end + 1]
+                del self.statuses[start:end + 1]
+                if start <= shown_end:
+                    self.loaded -= shown_end - start + 1
+                    self.endRemoveRows()
+        # 只有最小的被删行之后的行号会变，从那里开始重建索引
+        for voice_id in voice_ids:
+            self.rows.pop(voice_id, None)
+        self.rows.update(zip(self.ids[rows[-1]:], range(rows[-1], len(self.ids))))
+
+
+class VoiceFilterProxy(QSortFilterProxyModel):
+    """按音色ID（子串，'^' 开头为前缀）、状态、模型筛选"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.text = ""
+        self.status = ""
+        self.model = ""
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        # 排序交给源模型，代理只负责筛选
+        self.sourceModel().sort(column, order)
+
+    def set_filters(self, text="", status="", model=""):
+        text = text.strip().lower()
+        if (text, status, model) == (self.text, self.status, self.model):
+            return
+        self.text, self.status, self.model = text, status, model
+        self.invalidateFilter()
+
+    def is_filtering(self):
+        return bool(self.text or self.status or self.model)
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        source = self.sourceModel()
+        if self.status and source.status_at(source_row) != self.status:
+            return False
+        if self.model and source.model_at(source_row) != self.model:
+            return False
+        if self.text:
+            voice_id = source.ids[source_row].lower()
+            if self.text.startswith('^'):
+                return voice_id.startswith(self.text[1:])
+            return self.text in voice_id
+        return True